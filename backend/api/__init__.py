@@ -8,6 +8,7 @@ __all__ = [
     "routes_characters",
     "routes_dungeon",
     "routes_llm",
+    "routes_metrics",
     "routes_presets",
     "routes_regex",
     "routes_settings",
@@ -0,0 +1,3 @@
+from ..modules.system.api.metrics_routes import router
+
+__all__ = ["router"]
@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Optional
 import importlib.util
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -8,6 +9,12 @@ class Settings(BaseSettings):
     """Global application settings."""
 
     database_url: str = "sqlite:///./data/db.sqlite"
+    embedding_warmup: bool = True
+    maintenance_in_background: bool = False
+    auto_migrate: Optional[bool] = None
+    vector_index_backend: str = "exact"
+    ann_nprobe: int = 32
+    embedding_sidecar_url: str = ""
 
     model_config = SettingsConfigDict(
         env_prefix="NOVEL_",
@@ -27,5 +34,12 @@ class Settings(BaseSettings):
             return database_url.replace("postgresql://", "postgresql+psycopg://", 1)
         return database_url
 
+    @property
+    def resolved_auto_migrate(self) -> bool:
+        """Unset: migrate at startup on SQLite (single host, migrations file-locked), never on a server database."""
+        if self.auto_migrate is not None:
+            return self.auto_migrate
+        return self.resolved_database_url.startswith("sqlite")
+
 
 settings = Settings()
@@ -1,6 +1,6 @@
 from ..modules.knowledge.services.embeddings_config import EmbeddingConfig, EmbeddingError, normalize_text as _normalize_text, text_hash as _text_hash
 from ..modules.knowledge.services.embeddings_engine import EmbeddingEngine
-from ..modules.knowledge.services.embeddings_similarity import cosine_similarity, top_k_similar
+from ..modules.knowledge.services.embeddings_similarity import cosine_similarity, similarity_matrix, top_k_similar
 from ..modules.knowledge.services.embeddings_tfidf import TFIDFVectorizer
 
 
@@ -13,7 +13,7 @@ def compute_text_similarity(text1: str, text2: str, engine: EmbeddingEngine) ->
 def batch_compute_similarities(query_texts, candidate_texts, engine):
     query_vecs = engine.compute_embeddings(query_texts)
     candidate_vecs = engine.compute_embeddings(candidate_texts)
-    return [[cosine_similarity(q_vec, c_vec) for c_vec in candidate_vecs] for q_vec in query_vecs]
+    return similarity_matrix(query_vecs, candidate_vecs)
 
 
 __all__ = [
@@ -26,5 +26,6 @@ __all__ = [
     "batch_compute_similarities",
     "compute_text_similarity",
     "cosine_similarity",
+    "similarity_matrix",
     "top_k_similar",
 ]
@@ -1,5 +1,5 @@
-from ..modules.system.services.llm_chat import chat_completion
+from ..modules.system.services.llm_chat import chat_completion, chat_completion_async
 from ..modules.system.services.llm_http import list_models
 from ..modules.system.services.llm_models import LLMApiConfig, LLMError
 
-__all__ = ["LLMApiConfig", "LLMError", "chat_completion", "list_models"]
+__all__ = ["LLMApiConfig", "LLMError", "chat_completion", "chat_completion_async", "list_models"]
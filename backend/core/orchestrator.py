@@ -1,16 +1,18 @@
 from ..modules.story.services.content_parser import extract_story_parts, is_valid_story_content
-from ..modules.story.services.generation import generate_story_text
+from ..modules.story.services.generation import generate_story_text, generate_story_text_async
 from ..modules.story.services.persistence import persist_story_segment
 from ..modules.story.services.runtime_context_extra import build_session_runtime_context
 from ..modules.story.services.types import GenerateMeta
-from ..modules.agent.services.runner import finalize_agent_turn
+from ..modules.agent.services.runner import finalize_agent_turn, finalize_agent_turn_async
 
 __all__ = [
     "GenerateMeta",
     "build_session_runtime_context",
     "extract_story_parts",
     "finalize_agent_turn",
+    "finalize_agent_turn_async",
     "generate_story_text",
+    "generate_story_text_async",
     "is_valid_story_content",
     "persist_story_segment",
 ]
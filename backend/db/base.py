@@ -1,14 +1,18 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
 from ..config import settings
+from ..modules.system.services.metrics import timed_pool_class
 
 SQLALCHEMY_DATABASE_URL = settings.resolved_database_url
+_url = make_url(SQLALCHEMY_DATABASE_URL)
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False}
     if SQLALCHEMY_DATABASE_URL.startswith("sqlite")
     else {},
+    poolclass=timed_pool_class(_url.get_dialect().get_pool_class(_url)),
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -2,32 +2,23 @@ from __future__ import annotations
 
 from typing import Optional
 
+from sqlalchemy import exists, or_
 from sqlalchemy.orm import Session
 
 from .. import models
 
 
 def cleanup_orphan_worldbook_embeddings(db: Session, user_id: Optional[str] = None) -> int:
-    embeddings = db.query(models.WorldbookEmbedding).all()
-    deleted = 0
-
-    for embedding in embeddings:
-        if user_id is not None and embedding.user_id not in {None, user_id}:
-            continue
-
-        matched_entry = (
-            db.query(models.WorldbookEntry)
-            .filter(models.WorldbookEntry.entry_id == embedding.entry_id)
-            .first()
-        )
-
-        if matched_entry and matched_entry.worldbook_id == embedding.worldbook_id:
-            continue
-
-        db.delete(embedding)
-        deleted += 1
-
+    """Delete embeddings whose (entry_id, worldbook_id) matches no entry, as one anti-join DELETE.
+
+    With ``user_id`` only public rows and that user's rows are considered. Vector payloads are never loaded.
+    """
+    embedding = models.WorldbookEmbedding
+    entry = models.WorldbookEntry
+    query = db.query(embedding).filter(~exists().where(entry.entry_id == embedding.entry_id, entry.worldbook_id == embedding.worldbook_id))
+    if user_id is not None:
+        query = query.filter(or_(embedding.user_id.is_(None), embedding.user_id == user_id))
+    deleted = query.delete(synchronize_session=False)
     if deleted:
         db.commit()
-
     return deleted
@@ -1,7 +1,7 @@
 from .agent import AgentRunLog, AgentSegmentLog, EventLedger, SessionBranch, StoryRecord, VariableStateSnapshot
 from .auth import User, UserRelationship
 from .common import UserRole, generate_worldbook_id
-from .configurations import DBLLMConfig, DBPreset, DBRegexProfile, WorldbookEmbedding
+from .configurations import DBLLMConfig, DBPreset, DBRegexProfile, EmbeddingContentCache, WorldbookEmbedding, WorldbookEmbeddingJob, WorldbookTfidfIndex
 from .narrative import Character, CharacterTemplate, Dungeon, DungeonNode, GlobalSetting, WorldbookEntry
 from .story import Script, SessionState, StorySegment
 
@@ -15,6 +15,7 @@ __all__ = [
     "DBRegexProfile",
     "Dungeon",
     "DungeonNode",
+    "EmbeddingContentCache",
     "EventLedger",
     "GlobalSetting",
     "Script",
@@ -27,6 +28,8 @@ __all__ = [
     "UserRole",
     "VariableStateSnapshot",
     "WorldbookEmbedding",
+    "WorldbookEmbeddingJob",
     "WorldbookEntry",
+    "WorldbookTfidfIndex",
     "generate_worldbook_id",
 ]
@@ -1,13 +1,29 @@
 from __future__ import annotations
 
 import enum
+import json
 import uuid
+from typing import Optional
 
 
 def generate_worldbook_id() -> str:
     return f"W{uuid.uuid4().hex[:7]}"
 
 
+def worldbook_meta_enabled(meta_json: Optional[str]) -> bool:
+    try:
+        meta = json.loads(meta_json) if meta_json else {}
+    except (TypeError, ValueError):
+        meta = {}
+    if not isinstance(meta, dict):
+        return True
+    return meta.get("enabled", True) is not False and not bool(meta.get("disable") or meta.get("disabled"))
+
+
+def worldbook_category_key(category: Optional[str]) -> str:
+    return (category or "").strip()
+
+
 class UserRole(enum.Enum):
     ADMIN = "admin"
     USER = "user"
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, LargeBinary, String, Text, UniqueConstraint
 
 from ..base import Base
 from .common import generate_worldbook_id
@@ -58,9 +58,57 @@ class WorldbookEmbedding(Base):
     user_id = Column(String(32), ForeignKey("users.user_id"), nullable=True, index=True)
     worldbook_id = Column(String(8), nullable=False, index=True, default=generate_worldbook_id)
     entry_id = Column(String, ForeignKey("worldbook.entry_id"), nullable=False, index=True)
-    embedding_json = Column(Text, nullable=False)
+    embedding_json = Column(Text, nullable=True)
+    embedding_blob = Column(LargeBinary, nullable=True)
+    embedding_dtype = Column(String(16), nullable=True)
     content_hash = Column(String, nullable=False, index=True)
     embedding_model = Column(String, nullable=False)
     dimension = Column(Integer, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class EmbeddingContentCache(Base):
+    __tablename__ = "embedding_content_cache"
+    __table_args__ = (UniqueConstraint("embedding_model", "text_hash", name="uq_embedding_content_cache_model_hash"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    embedding_model = Column(String, nullable=False)
+    text_hash = Column(String(32), nullable=False)
+    embedding_blob = Column(LargeBinary, nullable=False)
+    embedding_dtype = Column(String(16), nullable=False)
+    dimension = Column(Integer, nullable=False)
+    hit_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class WorldbookEmbeddingJob(Base):
+    __tablename__ = "worldbook_embedding_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String, unique=True, index=True, nullable=False)
+    user_id = Column(String(32), ForeignKey("users.user_id"), nullable=True, index=True)
+    worldbook_id = Column(String(8), nullable=True, index=True)
+    status = Column(String(16), nullable=False, default="pending", index=True)
+    entry_ids_json = Column(Text, nullable=False)
+    total = Column(Integer, nullable=False, default=0)
+    done = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    cursor = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class WorldbookTfidfIndex(Base):
+    __tablename__ = "worldbook_tfidf_indexes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    worldbook_id = Column(String(8), nullable=False, unique=True, index=True)
+    version = Column(Integer, nullable=False, default=1)
+    doc_count = Column(Integer, nullable=False, default=0)
+    payload = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
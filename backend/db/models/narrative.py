@@ -3,10 +3,10 @@ from __future__ import annotations
 from datetime import datetime
 
 from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Integer, String, Text, UniqueConstraint
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 
 from ..base import Base
-from .common import generate_worldbook_id
+from .common import generate_worldbook_id, worldbook_category_key, worldbook_meta_enabled
 
 
 class WorldbookEntry(Base):
@@ -23,9 +23,21 @@ class WorldbookEntry(Base):
     importance = Column(Float, default=0.5)
     canonical = Column(Boolean, default=False)
     meta_json = Column(Text, nullable=True)
+    is_enabled = Column(Boolean, nullable=False, default=True, index=True)
+    category_key = Column(String, nullable=False, default="", index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    @validates("meta_json")
+    def _sync_is_enabled(self, key, value):
+        self.is_enabled = worldbook_meta_enabled(value)
+        return value
+
+    @validates("category")
+    def _sync_category_key(self, key, value):
+        self.category_key = worldbook_category_key(value)
+        return value
+
 
 class Dungeon(Base):
     __tablename__ = "dungeons"
@@ -1,3 +1,4 @@
+import threading
 from pathlib import Path
 
 from fastapi import FastAPI, HTTPException
@@ -11,6 +12,7 @@ from .api import (
     routes_characters,
     routes_dungeon,
     routes_llm,
+    routes_metrics,
     routes_presets,
     routes_regex,
     routes_settings,
@@ -18,12 +20,18 @@ from .api import (
     routes_templates,
     routes_worldbook,
 )
+from .config import settings
 from .db.crud.worldbook import cleanup_orphan_worldbook_embeddings
-from .db.base import Base, engine
 from .db.base import SessionLocal
-from .scripts.rebuild_character_templates_table import rebuild_if_needed as rebuild_character_templates_table
-from .scripts.rebuild_characters_table import rebuild_if_needed as rebuild_characters_table
-from .scripts.migrate_worldbook_ids import run_migration
+from .modules.knowledge.services.embedding_jobs import resume_embedding_jobs, shutdown_embedding_worker, start_embedding_sweeper
+from .modules.knowledge.services.embedding_sidecar import close_sidecar_clients
+from .modules.knowledge.services.embedding_store import gc_embedding_store
+from .modules.knowledge.services.embeddings_config import DEFAULT_SENTENCE_TRANSFORMER_MODEL
+from .modules.knowledge.services.embeddings_openai import close_shared_client as close_embedding_client
+from .modules.knowledge.services.model_registry import warmup_in_background
+from .modules.system.services.llm_clients import close_llm_clients
+from .modules.system.services.metrics import RequestMetricsMiddleware
+from .scripts.migrate import ensure_schema
 
 
 class DebugHeadersMiddleware(BaseHTTPMiddleware):
@@ -48,20 +56,50 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(RequestMetricsMiddleware)
+
+
+def _run_startup_maintenance() -> None:
+    db = SessionLocal()
+    try:
+        deleted = cleanup_orphan_worldbook_embeddings(db)
+        collected = gc_embedding_store(db)
+        if deleted or collected:
+            print(f"[MAINTENANCE] removed {deleted} orphan embeddings, {collected} idle stored vectors")
+    except Exception as exc:
+        db.rollback()
+        print(f"[MAINTENANCE] startup maintenance failed: {exc}")
+    finally:
+        db.close()
 
 
 @app.on_event("startup")
 def on_startup() -> None:
-    Base.metadata.create_all(bind=engine)
-    rebuild_characters_table()
-    rebuild_character_templates_table()
-    run_migration()
-    Base.metadata.create_all(bind=engine)
+    ensure_schema(auto_migrate=settings.resolved_auto_migrate)
+    if settings.maintenance_in_background:
+        threading.Thread(target=_run_startup_maintenance, name="startup-maintenance", daemon=True).start()
+    else:
+        _run_startup_maintenance()
     db = SessionLocal()
     try:
-        cleanup_orphan_worldbook_embeddings(db)
+        resume_embedding_jobs(db)
     finally:
         db.close()
+    start_embedding_sweeper()
+    if settings.embedding_warmup and not settings.embedding_sidecar_url:
+        warmup_in_background([("sentence_transformers", DEFAULT_SENTENCE_TRANSFORMER_MODEL)])
+
+
+@app.on_event("shutdown")
+def on_shutdown() -> None:
+    shutdown_embedding_worker()
+    close_embedding_client()
+    close_sidecar_clients()
+
+
+@app.on_event("shutdown")
+async def on_shutdown_llm_clients() -> None:
+    await close_llm_clients()
 
 
 app.include_router(routes_story.router, prefix="/api", tags=["story"])
@@ -74,6 +112,7 @@ app.include_router(routes_llm.router, prefix="/api", tags=["llm"])
 app.include_router(routes_regex.router, tags=["regex"])
 app.include_router(routes_auth.router, tags=["auth"])
 app.include_router(routes_templates.router)
+app.include_router(routes_metrics.router, tags=["metrics"])
 
 
 BASE_DIR = Path(__file__).resolve().parents[1]
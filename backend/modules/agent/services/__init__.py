@@ -1,3 +1,3 @@
-from .runner import finalize_agent_turn, prepare_agent_turn
+from .runner import finalize_agent_turn, finalize_agent_turn_async, prepare_agent_turn, prepare_agent_turn_async
 
-__all__ = ["finalize_agent_turn", "prepare_agent_turn"]
+__all__ = ["finalize_agent_turn", "finalize_agent_turn_async", "prepare_agent_turn", "prepare_agent_turn_async"]
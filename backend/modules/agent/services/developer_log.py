@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Mapping, Optional
+
+from .profiling import SkillProfile
 
 
 class AgentDeveloperLog:
@@ -12,6 +14,7 @@ class AgentDeveloperLog:
         self.bindings: Dict[str, Any] = {}
         self.entries: List[Dict[str, Any]] = []
         self.sections: Dict[str, Any] = {}
+        self.profiles: Dict[str, SkillProfile] = {}
 
     def bind(self, **kwargs: Any) -> None:
         self.bindings.update({key: value for key, value in kwargs.items() if value not in (None, "", [], {})})
@@ -32,6 +35,25 @@ class AgentDeveloperLog:
     def set_section(self, name: str, value: Any) -> None:
         self.sections[name] = value
 
+    def record_profiles(self, profiles: Mapping[str, SkillProfile]) -> None:
+        """Attach per-skill timings and SQL counts; the skill's own log entry gets its wall time too."""
+        self.profiles.update(profiles)
+        for entry in self.entries:
+            if entry["title"] in profiles:
+                entry["durationMs"] = round(profiles[entry["title"]].wall_ms, 2)
+
+    def _profile_sections(self) -> Dict[str, Any]:
+        if not self.profiles:
+            return {}
+        totals = SkillProfile(
+            wall_ms=sum(profile.wall_ms for profile in self.profiles.values()),
+            cpu_ms=sum(profile.cpu_ms for profile in self.profiles.values()),
+            statements=sum(profile.statements for profile in self.profiles.values()),
+            rows=sum(profile.rows for profile in self.profiles.values()),
+        )
+        slowest = max(self.profiles, key=lambda name: self.profiles[name].wall_ms)
+        return {"skills": {name: profile.as_dict() for name, profile in self.profiles.items()}, "skillTotals": {**totals.as_dict(), "slowest": slowest}}
+
     def payload(self) -> Dict[str, Any]:
         return {
             "version": "agent_v2",
@@ -41,7 +63,7 @@ class AgentDeveloperLog:
             "bindings": self.bindings,
             "entries": self.entries,
             "publicLog": self._public_log(),
-            "developer": self.sections,
+            "developer": {**self.sections, **self._profile_sections()},
         }
 
     def _public_log(self) -> Dict[str, Any]:
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Mapper
+
+
+@dataclass
+class SkillProfile:
+    wall_ms: float = 0.0
+    cpu_ms: float = 0.0
+    statements: int = 0
+    rows: int = 0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {key: round(value, 2) if isinstance(value, float) else value for key, value in asdict(self).items()}
+
+
+_active = threading.local()
+_listeners_lock = threading.Lock()
+_listeners_installed = False
+
+
+def _current() -> Optional[SkillProfile]:
+    return getattr(_active, "profile", None)
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany) -> None:
+    profile = _current()
+    if profile is not None:
+        profile.statements += 1
+
+
+def _count_cursor_rows(conn, cursor, statement, parameters, context, executemany) -> None:
+    """Rows the driver reports for the statement (psycopg does for SELECT; sqlite3 reports -1)."""
+    profile = _current()
+    if profile is None:
+        return
+    rowcount = cursor.rowcount if cursor.description is not None else -1
+    _active.cursor_counts = rowcount >= 0
+    if rowcount > 0:
+        profile.rows += rowcount
+
+
+def _count_loaded_instance(target, context) -> None:
+    """Fallback for drivers without a SELECT rowcount: count ORM instances as the result is fetched, never buffering it."""
+    profile = _current()
+    if profile is not None and not getattr(_active, "cursor_counts", False):
+        profile.rows += 1
+
+
+def _install_listeners() -> None:
+    global _listeners_installed
+    with _listeners_lock:
+        if _listeners_installed:
+            return
+        event.listen(Engine, "before_cursor_execute", _count_statement)
+        event.listen(Engine, "after_cursor_execute", _count_cursor_rows)
+        event.listen(Mapper, "load", _count_loaded_instance)
+        _listeners_installed = True
+
+
+@contextmanager
+def profile_block() -> Iterator[SkillProfile]:
+    """Measure wall time, this thread's CPU time, SQL statements and rows fetched inside the block.
+
+    Counting is per thread, so skills running side by side each see only their own statements.
+    Statements in a nested block also count toward the enclosing block.
+    """
+    _install_listeners()
+    profile = SkillProfile()
+    outer = _current()
+    _active.profile = profile
+    wall_started, cpu_started = time.perf_counter(), time.thread_time()
+    try:
+        yield profile
+    finally:
+        profile.wall_ms = (time.perf_counter() - wall_started) * 1000
+        profile.cpu_ms = (time.thread_time() - cpu_started) * 1000
+        _active.profile = outer
+        if outer is not None:
+            outer.statements += profile.statements
+            outer.rows += profile.rows
+
+
+class SkillMetrics:
+    """Process-wide totals per skill across turns, for dashboards and the metrics endpoint."""
+
+    def __init__(self) -> None:
+        self._totals: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, profile: SkillProfile) -> None:
+        with self._lock:
+            totals = self._totals.setdefault(name, {"count": 0, "wall_ms": 0.0, "cpu_ms": 0.0, "statements": 0, "rows": 0, "max_wall_ms": 0.0})
+            totals["count"] += 1
+            totals["wall_ms"] += profile.wall_ms
+            totals["cpu_ms"] += profile.cpu_ms
+            totals["statements"] += profile.statements
+            totals["rows"] += profile.rows
+            totals["max_wall_ms"] = max(totals["max_wall_ms"], profile.wall_ms)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {name: {key: round(value, 2) if isinstance(value, float) else value for key, value in totals.items()} for name, totals in self._totals.items()}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._totals.clear()
+
+
+skill_metrics = SkillMetrics()
@@ -1,19 +1,148 @@
 from __future__ import annotations
 
-from typing import Any, Callable, Dict
+import asyncio
+from collections.abc import MutableMapping
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from fastapi.concurrency import run_in_threadpool
+
+from .profiling import SkillProfile, profile_block, skill_metrics
 
 SkillFn = Callable[[Dict[str, Any]], Dict[str, Any]]
+SessionFactory = Callable[[], Any]
+
+MAX_PARALLEL_SKILLS = 4
+_executor = ThreadPoolExecutor(max_workers=MAX_PARALLEL_SKILLS, thread_name_prefix="agent-skill")
+
+
+class _SkillState(MutableMapping):
+    """Shared turn state as one concurrent skill sees it: ``db`` is the skill's own session, every
+    other key reads and writes through to the shared dict."""
+
+    def __init__(self, state: Dict[str, Any], db: Any) -> None:
+        self._state = state
+        self._db = db
+
+    def __getitem__(self, key: str) -> Any:
+        return self._db if key == "db" else self._state[key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key == "db":
+            raise KeyError("db is owned by the skill runner")
+        self._state[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        del self._state[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._state)
+
+    def __len__(self) -> int:
+        return len(self._state)
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        # dict.setdefault is atomic, so two skills creating the same container share it.
+        return self._db if key == "db" else self._state.setdefault(key, default)
 
 
 class SkillRegistry:
     def __init__(self) -> None:
         self._skills: Dict[str, SkillFn] = {}
+        self._depends_on: Dict[str, List[str]] = {}
 
-    def register(self, name: str, fn: SkillFn) -> "SkillRegistry":
+    def register(self, name: str, fn: SkillFn, depends_on: Sequence[str] = ()) -> "SkillRegistry":
         self._skills[name] = fn
+        self._depends_on[name] = list(depends_on)
         return self
 
     def execute(self, name: str, state: Dict[str, Any]) -> Dict[str, Any]:
         if name not in self._skills:
             raise KeyError(f"skill '{name}' is not registered")
         return self._skills[name](state)
+
+    def execute_profiled(self, name: str, state: Dict[str, Any]) -> SkillProfile:
+        """``execute`` under ``profile_block``; the profile also feeds the process-wide ``skill_metrics``."""
+        with profile_block() as profile:
+            self.execute(name, state)
+        skill_metrics.record(name, profile)
+        return profile
+
+    def stages(self, names: Sequence[str]) -> List[List[str]]:
+        """Group ``names`` into stages whose skills only depend on earlier stages (or on skills outside ``names``)."""
+        for name in names:
+            if name not in self._skills:
+                raise KeyError(f"skill '{name}' is not registered")
+        done: set = set()
+        pending = list(names)
+        stages: List[List[str]] = []
+        while pending:
+            ready = [name for name in pending if all(dep in done or dep not in names for dep in self._depends_on[name])]
+            if not ready:
+                raise ValueError(f"skill dependencies form a cycle: {pending}")
+            stages.append(ready)
+            done.update(ready)
+            pending = [name for name in pending if name not in done]
+        return stages
+
+    def run(self, names: Sequence[str], state: Dict[str, Any], session_factory: Optional[SessionFactory] = None) -> Dict[str, SkillProfile]:
+        """Execute ``names`` in dependency order and return each skill's profile.
+
+        With ``session_factory`` each skill starts as soon as its own dependencies finish, so a skill never
+        waits on an unrelated peer; skills that overlap another run on their own sessions, and a skill that
+        would run alone uses ``state["db"]``. Without one every skill runs sequentially on ``state["db"]``.
+        """
+        stages = self.stages(names)
+        profiles: Dict[str, SkillProfile] = {}
+        if session_factory is None:
+            for name in (name for stage in stages for name in stage):
+                profiles[name] = self.execute_profiled(name, state)
+            return profiles
+        running: Dict[Future, str] = {}
+        while len(profiles) < len(names):
+            ready = self._ready(names, profiles, running.values())
+            if len(ready) == 1 and not running:
+                profiles[ready[0]] = self.execute_profiled(ready[0], state)
+                continue
+            running.update({_executor.submit(self._profiled_in_session, name, state, session_factory): name for name in ready})
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                if future.exception() is not None:
+                    wait(running)
+                    raise future.exception()
+                profiles[running.pop(future)] = future.result()
+        return {name: profiles[name] for name in names}
+
+    async def run_async(self, names: Sequence[str], state: Dict[str, Any], session_factory: Optional[SessionFactory] = None) -> Dict[str, SkillProfile]:
+        """``run`` for the event loop: every skill is a threadpool hop, started once its dependencies finish."""
+        stages = self.stages(names)
+        profiles: Dict[str, SkillProfile] = {}
+        if session_factory is None:
+            for name in (name for stage in stages for name in stage):
+                profiles[name] = await run_in_threadpool(self.execute_profiled, name, state)
+            return profiles
+        running: Dict[asyncio.Task, str] = {}
+        while len(profiles) < len(names):
+            ready = self._ready(names, profiles, running.values())
+            if len(ready) == 1 and not running:
+                profiles[ready[0]] = await run_in_threadpool(self.execute_profiled, ready[0], state)
+                continue
+            running.update({asyncio.ensure_future(run_in_threadpool(self._profiled_in_session, name, state, session_factory)): name for name in ready})
+            finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                if task.exception() is not None:
+                    await asyncio.wait(running)
+                    raise task.exception()
+                profiles[running.pop(task)] = task.result()
+        return {name: profiles[name] for name in names}
+
+    def _ready(self, names: Sequence[str], done: Dict[str, Any], running: Iterable[str]) -> List[str]:
+        started = set(done) | set(running)
+        return [name for name in names if name not in started and all(dep in done or dep not in names for dep in self._depends_on[name])]
+
+    def _profiled_in_session(self, name: str, state: Dict[str, Any], session_factory: SessionFactory) -> SkillProfile:
+        db = session_factory()
+        try:
+            return self.execute_profiled(name, _SkillState(state, db))
+        finally:
+            db.close()
@@ -3,11 +3,13 @@ from __future__ import annotations
 import json
 import uuid
 from time import perf_counter
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import SingletonThreadPool
 
-from ....core.llm_client import LLMError, chat_completion
+from ....core.llm_client import LLMError, chat_completion, chat_completion_async
 from ....db import models
 from ...characters.services.dynamic_sync import sync_characters_after_turn
 from ...story.services.content_parser import extract_story_parts, is_valid_story_content
@@ -16,8 +18,12 @@ from ...story.services.types import GenerateMeta
 from .developer_log import AgentDeveloperLog
 from .ledger import persist_turn_memory
 from .log_store import persist_segment_log
+from .profiling import SkillProfile, skill_metrics
 from .skills import create_registry
-from .types import AgentTurnStart
+from .types import AgentTurnStart, TextStream
+
+# Dependencies are declared in create_registry: history, memory and characters only need bind_session.
+PREPARE_SKILLS = ["bind_session", "load_history", "load_memory", "load_characters", "load_worldbook", "plan_turn"]
 
 
 def prepare_agent_turn(
@@ -29,8 +35,60 @@ def prepare_agent_turn(
     reasoning_strength: Optional[str],
 ) -> AgentTurnStart:
     started = perf_counter()
+    state = _new_turn_state(db, session_id, user_input, user_id, reasoning_strength)
+    state["log"].record_profiles(create_registry().run(PREPARE_SKILLS, state, session_factory=_skill_sessions(db)))
+    meta = _build_meta(state, started)
+    unrunnable = _unrunnable_turn(state, meta)
+    if unrunnable is not None:
+        return unrunnable
+    requested = perf_counter()
+    try:
+        full_text, stream_gen = chat_completion(**_chat_request(state, force_stream))
+    except LLMError as exc:
+        return _failed_turn(state, meta, exc)
+    return _dispatched_turn(state, meta, full_text, stream_gen, requested)
+
+
+async def prepare_agent_turn_async(
+    db: Session,
+    session_id: str,
+    user_input: str,
+    force_stream: Optional[bool],
+    user_id: Optional[str],
+    reasoning_strength: Optional[str],
+) -> AgentTurnStart:
+    """Same turn as ``prepare_agent_turn``; each skill's DB work is a separate threadpool hop (independent
+    skills hop together) and the model request runs on the event loop, so a streaming turn never pins a
+    worker thread while the LLM writes."""
+    started = perf_counter()
+    state = _new_turn_state(db, session_id, user_input, user_id, reasoning_strength)
+    state["log"].record_profiles(await create_registry().run_async(PREPARE_SKILLS, state, session_factory=_skill_sessions(db)))
+    meta = _build_meta(state, started)
+    unrunnable = _unrunnable_turn(state, meta)
+    if unrunnable is not None:
+        return unrunnable
+    requested = perf_counter()
+    try:
+        full_text, stream_gen = await chat_completion_async(**_chat_request(state, force_stream))
+    except LLMError as exc:
+        return _failed_turn(state, meta, exc)
+    return _dispatched_turn(state, meta, full_text, stream_gen, requested)
+
+
+def _skill_sessions(db: Optional[Session]) -> Optional[sessionmaker]:
+    """Sessions for skills that run side by side; None keeps them sequential on ``db``.
+
+    Per-thread SQLite pools (in-memory databases) would hand each skill an empty database.
+    """
+    bind = db.get_bind() if db is not None else None
+    if bind is None or isinstance(bind.pool, SingletonThreadPool):
+        return None
+    return sessionmaker(bind=bind, autocommit=False, autoflush=False)
+
+
+def _new_turn_state(db: Session, session_id: str, user_input: str, user_id: Optional[str], reasoning_strength: Optional[str]) -> Dict[str, Any]:
     log = AgentDeveloperLog(session_id=session_id, user_input=user_input, strength=str(reasoning_strength or "low"))
-    state: Dict[str, Any] = {
+    return {
         "db": db,
         "session_id": session_id,
         "user_input": user_input,
@@ -38,31 +96,43 @@ def prepare_agent_turn(
         "reasoning_strength": reasoning_strength,
         "log": log,
     }
-    registry = create_registry()
-    for skill_name in ["bind_session", "load_history", "load_memory", "load_characters", "load_worldbook", "plan_turn"]:
-        registry.execute(skill_name, state)
-    runtime = state["runtime"]
-    llm_cfg = runtime.get("llm_cfg")
-    model = str(runtime.get("model") or "")
-    meta = _build_meta(state, started)
-    if not llm_cfg:
-        return AgentTurnStart(text=f"[no model config]\n\nuser_input: {user_input}", meta=meta, stream_gen=None, dev_log_info=log.payload(), agent_state=state)
-    if not model:
+
+
+def _unrunnable_turn(state: Dict[str, Any], meta: GenerateMeta) -> Optional[AgentTurnStart]:
+    runtime, log = state["runtime"], state["log"]
+    if not runtime.get("llm_cfg"):
+        return AgentTurnStart(text=f"[no model config]\n\nuser_input: {state['user_input']}", meta=meta, stream_gen=None, dev_log_info=log.payload(), agent_state=state)
+    if not str(runtime.get("model") or ""):
         return AgentTurnStart(text="[no model selected]", meta=meta, stream_gen=None, dev_log_info=log.payload(), agent_state=state)
-    try:
-        full_text, stream_gen = chat_completion(
-            base_url=str(llm_cfg.get("base_url") or ""),
-            api_key=str(llm_cfg.get("api_key") or ""),
-            model=model,
-            messages=state["messages"],
-            temperature=0.8,
-            stream=bool(llm_cfg.get("stream", True)) if force_stream is None else bool(force_stream),
-            timeout_s=120,
-        )
-    except LLMError as exc:
-        log.add("error", "model_request_failed", str(exc))
-        return AgentTurnStart(text=f"[model request failed] {exc}", meta=meta, stream_gen=None, dev_log_info=log.payload(), agent_state=state)
+    return None
+
+
+def _chat_request(state: Dict[str, Any], force_stream: Optional[bool]) -> Dict[str, Any]:
+    llm_cfg = state["runtime"]["llm_cfg"]
+    return {
+        "base_url": str(llm_cfg.get("base_url") or ""),
+        "api_key": str(llm_cfg.get("api_key") or ""),
+        "model": str(state["runtime"].get("model") or ""),
+        "messages": state["messages"],
+        "temperature": 0.8,
+        "stream": bool(llm_cfg.get("stream", True)) if force_stream is None else bool(force_stream),
+        "timeout_s": 120,
+    }
+
+
+def _failed_turn(state: Dict[str, Any], meta: GenerateMeta, exc: LLMError) -> AgentTurnStart:
+    log = state["log"]
+    log.add("error", "model_request_failed", str(exc))
+    return AgentTurnStart(text=f"[model request failed] {exc}", meta=meta, stream_gen=None, dev_log_info=log.payload(), agent_state=state)
+
+
+def _dispatched_turn(state: Dict[str, Any], meta: GenerateMeta, full_text: str, stream_gen: Optional[TextStream], requested: float) -> AgentTurnStart:
+    log, model = state["log"], str(state["runtime"].get("model") or "")
     log.add("generation", "request_model", "Dispatched model request", {"message_count": len(state["messages"]), "stream": stream_gen is not None, "model": model}, public_label="调用模型生成", public_detail=f"模型 {model} 已开始生成本轮正文")
+    # Wall time only: a whole completion without streaming, time to open the stream otherwise.
+    request_profile = SkillProfile(wall_ms=(perf_counter() - requested) * 1000)
+    skill_metrics.record("request_model", request_profile)
+    log.record_profiles({"request_model": request_profile})
     if stream_gen is not None:
         return AgentTurnStart(text="", meta=meta, stream_gen=stream_gen, dev_log_info=log.payload(), agent_state=state)
     full_text = full_text if is_valid_story_content(full_text) else "[empty generation]"
@@ -80,6 +150,28 @@ def finalize_agent_turn(
     user_id: Optional[str],
     frontend_duration: float = 0.0,
 ) -> Dict[str, Any]:
+    segment_id, order_index, memory = _persist_turn(db, session_id, user_input, story_text, meta, agent_state, user_id, frontend_duration)
+    character_sync = _sync_turn_characters(db, agent_state, segment_id, story_text, user_id)
+    return _write_turn_log(db, session_id, segment_id, order_index, memory, character_sync, agent_state, user_id)
+
+
+async def finalize_agent_turn_async(
+    db: Session,
+    session_id: str,
+    user_input: str,
+    story_text: str,
+    meta: GenerateMeta,
+    agent_state: Dict[str, Any],
+    user_id: Optional[str],
+    frontend_duration: float = 0.0,
+) -> Dict[str, Any]:
+    """``finalize_agent_turn`` as three threadpool hops: segment and memory, character sync, run log."""
+    segment_id, order_index, memory = await run_in_threadpool(_persist_turn, db, session_id, user_input, story_text, meta, agent_state, user_id, frontend_duration)
+    character_sync = await run_in_threadpool(_sync_turn_characters, db, agent_state, segment_id, story_text, user_id)
+    return await run_in_threadpool(_write_turn_log, db, session_id, segment_id, order_index, memory, character_sync, agent_state, user_id)
+
+
+def _persist_turn(db: Session, session_id: str, user_input: str, story_text: str, meta: GenerateMeta, agent_state: Dict[str, Any], user_id: Optional[str], frontend_duration: float) -> Tuple[str, int, Dict[str, Any]]:
     log: AgentDeveloperLog = agent_state["log"]
     parts = extract_story_parts(story_text)
     paragraph_word_count = len(parts.get("story") or story_text)
@@ -98,12 +190,21 @@ def finalize_agent_turn(
         models.StorySegment.order_index == order_index,
     ).first()
     segment_id = segment.segment_id if segment else f"{session_id}_{order_index}"
-    branch = agent_state["branch"]
-    branch.last_segment_id = segment_id
+    agent_state["branch"].last_segment_id = segment_id
     memory = persist_turn_memory(db, agent_state["story"].story_id, session_id, segment_id, user_input, story_text, user_id)
     log.add("skill", "write_memory", "Persisted story segment, event ledger and variable snapshots", {"segment_id": segment_id, "event_count": len(memory["events"]), "snapshot_count": len(memory["snapshots"]), "events": memory["events"], "snapshots": memory["snapshots"]}, public_label="写回事件与状态", public_detail=f"已写回 {len(memory['events'])} 条事件和 {len(memory['snapshots'])} 个状态快照")
+    return segment_id, order_index, memory
+
+
+def _sync_turn_characters(db: Session, agent_state: Dict[str, Any], segment_id: str, story_text: str, user_id: Optional[str]) -> Dict[str, Any]:
     character_sync = sync_characters_after_turn(db, agent_state, segment_id, story_text, user_id)
-    log.add("skill", "sync_characters", "Synchronized character cards for newly introduced or changed characters", character_sync, public_label="同步角色档案", public_detail=f"新增 {len(character_sync.get('created', []))} 个角色，更新 {len(character_sync.get('updated', []))} 个角色")
+    agent_state["log"].add("skill", "sync_characters", "Synchronized character cards for newly introduced or changed characters", character_sync, public_label="同步角色档案", public_detail=f"新增 {len(character_sync.get('created', []))} 个角色，更新 {len(character_sync.get('updated', []))} 个角色")
+    return character_sync
+
+
+def _write_turn_log(db: Session, session_id: str, segment_id: str, order_index: int, memory: Dict[str, Any], character_sync: Dict[str, Any], agent_state: Dict[str, Any], user_id: Optional[str]) -> Dict[str, Any]:
+    log: AgentDeveloperLog = agent_state["log"]
+    branch = agent_state["branch"]
     log.set_section("writeback", {"memory": memory, "characters": character_sync})
     payload = log.payload()
     _save_run_log(db, agent_state["story"].story_id, session_id, segment_id, branch.reasoning_strength, payload, user_id)
@@ -13,7 +13,15 @@ from .strength import normalize_strength, strength_profile
 
 
 def create_registry() -> SkillRegistry:
-    return SkillRegistry().register("bind_session", _bind_session).register("load_history", _load_history).register("load_memory", _load_memory).register("load_characters", _load_characters).register("load_worldbook", _load_worldbook).register("plan_turn", _plan_turn)
+    return (
+        SkillRegistry()
+        .register("bind_session", _bind_session)
+        .register("load_history", _load_history, depends_on=["bind_session"])
+        .register("load_memory", _load_memory, depends_on=["bind_session"])
+        .register("load_characters", _load_characters, depends_on=["bind_session"])
+        .register("load_worldbook", _load_worldbook, depends_on=["load_history"])
+        .register("plan_turn", _plan_turn, depends_on=["load_history", "load_memory", "load_characters", "load_worldbook"])
+    )
 
 
 def _bind_session(state: Dict[str, Any]) -> Dict[str, Any]:
@@ -24,7 +32,7 @@ def _bind_session(state: Dict[str, Any]) -> Dict[str, Any]:
     log.strength = runtime["reasoning_strength"]
     update_branch_runtime(db, branch, runtime)
     session_runtime = build_session_runtime_context(db, state["session_id"], user_id=state["user_id"])
-    state.update({"session_state": session_state, "story": story, "branch": branch, "global_state": global_state, "runtime": runtime, "session_runtime": session_runtime, "profile": strength_profile(runtime["reasoning_strength"])})
+    state.update({"session_state": session_state, "story": story, "story_id": story.story_id, "branch": branch, "global_state": global_state, "runtime": runtime, "session_runtime": session_runtime, "profile": strength_profile(runtime["reasoning_strength"])})
     log.bind(storyId=story.story_id, storyTitle=story.title, branchId=branch.branch_id, sessionId=state["session_id"], presetId=(runtime.get("preset") or {}).get("id"), llmConfigId=(runtime.get("llm_cfg") or {}).get("id"), model=runtime.get("model"))
     log.add("skill", "bind_session", "Bound session, story, branch, preset and model", {"story_id": story.story_id, "story_title": story.title, "branch_id": branch.branch_id, "reasoning_strength": runtime["reasoning_strength"]}, public_label="读取会话状态", public_detail=f"故事 {story.title}，分支 {branch.branch_type}，强度 {runtime['reasoning_strength']}")
     return state
@@ -41,7 +49,7 @@ def _load_history(state: Dict[str, Any]) -> Dict[str, Any]:
 
 def _load_memory(state: Dict[str, Any]) -> Dict[str, Any]:
     profile = state["profile"]
-    events, variables = load_memory_context(state["db"], state["story"].story_id, state["session_id"], state["user_id"], int(profile["event_limit"]), int(profile["variable_limit"]))
+    events, variables = load_memory_context(state["db"], state["story_id"], state["session_id"], state["user_id"], int(profile["event_limit"]), int(profile["variable_limit"]))
     state["memory_events"] = events
     state["memory_variables"] = variables
     state["log"].add("skill", "load_memory", "Loaded structured events and variable snapshots", {"event_count": len(events), "variable_count": len(variables), "events": events, "variables": variables}, public_label="读取事件账本", public_detail=f"读取 {len(events)} 条事件，{len(variables)} 个状态变量")
@@ -1,15 +1,17 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any, Dict, Generator, Optional
+from typing import Any, AsyncGenerator, Dict, Generator, Optional, Union
 
 from ...story.services.types import GenerateMeta
 
+TextStream = Union[Generator[str, None, None], AsyncGenerator[str, None]]
+
 
 @dataclass
 class AgentTurnStart:
     text: str
     meta: GenerateMeta
-    stream_gen: Optional[Generator[str, None, None]]
+    stream_gen: Optional[TextStream]
     dev_log_info: Dict[str, Any]
     agent_state: Dict[str, Any]
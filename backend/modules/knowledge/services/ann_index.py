@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import threading
+from pathlib import Path
+from typing import List, Optional, Sequence, Set, Tuple
+
+from .embeddings_similarity import normalize_rows, np, top_k_indices
+from .vector_index import IndexKey, VectorIndex
+
+ANN_INDEX_DIR = Path(__file__).resolve().parents[4] / "data" / "ann_indexes"
+ANN_BACKENDS = {"exact", "ivf"}
+DEFAULT_NPROBE = 32
+IVF_MIN_ENTRIES = 4096
+IVF_RETRAIN_GROWTH = 4
+IVF_TRAIN_ITERATIONS = 10
+IVF_TRAIN_SAMPLE_PER_LIST = 64
+ASSIGN_CHUNK_SIZE = 16384
+# Scopes covering at most this share of the index are scored exactly; probing would mostly hit filtered rows.
+EXACT_SCOPE_RATIO = 0.1
+
+
+def ann_index_path(key: IndexKey) -> Path:
+    """The digest keeps keys apart; the worldbook id is only a readable label, reduced to ``[A-Za-z0-9_-]``."""
+    digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:16]
+    label = re.sub(r"[^A-Za-z0-9_-]", "_", key[1] or "all")[:32]
+    return ANN_INDEX_DIR / f"{label}-{digest}.npz"
+
+
+def train_centroids(matrix, nlist: int, iterations: int = IVF_TRAIN_ITERATIONS, seed: int = 0):
+    """Spherical k-means on a sample of L2-normalized rows."""
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(matrix), nlist * IVF_TRAIN_SAMPLE_PER_LIST)
+    sample = matrix[rng.choice(len(matrix), sample_size, replace=False)]
+    centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+    for _ in range(iterations):
+        labels = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        empty = np.bincount(labels, minlength=nlist) == 0
+        sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+        centroids = normalize_rows(sums)
+    return np.ascontiguousarray(centroids, dtype=np.float32)
+
+
+def assign_rows(matrix, centroids):
+    return np.concatenate([np.argmax(matrix[start : start + ASSIGN_CHUNK_SIZE] @ centroids.T, axis=1) for start in range(0, len(matrix), ASSIGN_CHUNK_SIZE)]).astype(np.int32) if len(matrix) else np.zeros(0, dtype=np.int32)
+
+
+class IvfIndex(VectorIndex):
+    """Inverted-file ANN index: rows are bucketed by their nearest k-means centroid and a query
+    scores only the ``nprobe`` closest buckets. Higher ``nprobe`` buys recall with latency.
+
+    Exact until ``IVF_MIN_ENTRIES`` rows are added. The trained centroids are saved to ``path``
+    so a restart only re-assigns rows instead of re-running k-means; vectors stay in the database.
+    """
+
+    def __init__(self, dimension: int, nprobe: int = DEFAULT_NPROBE, path: Optional[Path] = None):
+        super().__init__(dimension)
+        self.nprobe = nprobe
+        self.path = path
+        self.centroids = None
+        self.trained_size = 0
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._order = np.zeros(0, dtype=np.int64)
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._write_lock = threading.Lock()
+        self._load_centroids()
+
+    def _load_centroids(self) -> None:
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            with np.load(self.path) as stored:
+                centroids, trained_size = stored["centroids"], int(stored["trained_size"])
+        except (OSError, KeyError, ValueError):
+            return
+        if centroids.ndim == 2 and centroids.shape[1] == self.dimension:
+            self.centroids, self.trained_size = centroids.astype(np.float32), trained_size
+
+    def _save_centroids(self) -> None:
+        if self.path is None:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp_path, "wb") as handle:
+                np.savez(handle, centroids=self.centroids, trained_size=self.trained_size)
+            os.replace(tmp_path, self.path)
+        except OSError as exc:
+            print(f"[ANN] failed to persist centroids to {self.path}: {exc}")
+
+    def add(self, entry_ids: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        with self._write_lock:
+            super().add(entry_ids, vectors)
+            with self._lock:
+                matrix, rows = self.matrix, self.rows
+            size = len(matrix)
+            if size >= IVF_MIN_ENTRIES and (self.centroids is None or size > self.trained_size * IVF_RETRAIN_GROWTH):
+                self.centroids, self.trained_size = train_centroids(matrix, max(int(size**0.5), 1)), size
+                self._save_centroids()
+                assignments = assign_rows(matrix, self.centroids)
+            elif self.centroids is not None:
+                assignments = np.concatenate([self._assignments, np.zeros(size - len(self._assignments), dtype=np.int32)])
+                if len(self._assignments) == 0:
+                    changed = np.arange(size)
+                else:
+                    changed = np.unique(np.fromiter((rows[entry_id] for entry_id in entry_ids), dtype=np.int64, count=len(entry_ids)))
+                assignments[changed] = assign_rows(matrix[changed], self.centroids)
+            else:
+                return
+            order = np.argsort(assignments, kind="stable")
+            offsets = np.searchsorted(assignments[order], np.arange(len(self.centroids) + 1))
+            with self._lock:
+                self._assignments, self._order, self._offsets = assignments, order, offsets
+
+    def search(self, query_vec: Sequence[float], top_k: int, allowed: Optional[Set[str]] = None, min_similarity: float = 0.0, nprobe: Optional[int] = None) -> List[Tuple[str, float]]:
+        with self._lock:
+            matrix, entry_ids, rows = self.matrix, self.entry_ids, self.rows
+            centroids, order, offsets = self.centroids, self._order, self._offsets
+        if centroids is None or len(order) == 0 or (allowed is not None and len(allowed) <= len(entry_ids) * EXACT_SCOPE_RATIO):
+            return super().search(query_vec, top_k, allowed=allowed, min_similarity=min_similarity)
+        if top_k <= 0:
+            return []
+        query = np.asarray(query_vec, dtype=np.float32).reshape(-1)
+        if query.shape[0] != self.dimension:
+            raise ValueError("向量维度不匹配")
+        norm = float(np.linalg.norm(query))
+        if norm == 0:
+            return []
+        query = query / norm
+        probes = top_k_indices(centroids @ query, min(nprobe or self.nprobe, len(centroids)))
+        candidates = np.concatenate([order[offsets[probe] : offsets[probe + 1]] for probe in probes])
+        if allowed is not None:
+            candidates = candidates[np.isin(candidates, np.fromiter((rows[entry_id] for entry_id in allowed if entry_id in rows), dtype=np.int64))]
+        if candidates.size == 0:
+            return []
+        scores = matrix[candidates] @ query
+        return [(entry_ids[candidates[idx]], float(scores[idx])) for idx in top_k_indices(scores, top_k) if scores[idx] >= min_similarity]
+
+
+def new_vector_index(backend: str, dimension: int, key: IndexKey, nprobe: int = DEFAULT_NPROBE) -> VectorIndex:
+    if backend == "ivf":
+        return IvfIndex(dimension, nprobe=nprobe, path=ann_index_path(key))
+    return VectorIndex(dimension)
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import json
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Set
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from ....core.tenant import owner_only
+from ....db import models
+from ....db.base import SessionLocal
+from .retrieval_cache import invalidate_retrieval_cache
+from .retrieval_queries import create_retriever
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+EMBEDDING_JOB_BATCH = 64
+EMBEDDING_JOB_WORKERS = 1
+STALE_RUNNING_AFTER = timedelta(minutes=5)
+SWEEP_INTERVAL_SECONDS = 60.0
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_stopping = threading.Event()
+_queued: Set[str] = set()
+_sweeper: Optional[threading.Thread] = None
+
+
+def create_embedding_job(db: Session, entry_ids: List[str], user_id: Optional[str], worldbook_id: Optional[str]) -> models.WorldbookEmbeddingJob:
+    job = models.WorldbookEmbeddingJob(job_id=uuid.uuid4().hex, user_id=user_id, worldbook_id=worldbook_id, status=JOB_PENDING, entry_ids_json=json.dumps(entry_ids), total=len(entry_ids), done=0, failed=0, cursor=0)
+    db.add(job)
+    db.commit()
+    return job
+
+
+def _claimable():
+    """Pending jobs, and running jobs whose worker stopped heartbeating (each committed batch bumps ``updated_at``)."""
+    table = models.WorldbookEmbeddingJob
+    return or_(table.status == JOB_PENDING, and_(table.status == JOB_RUNNING, table.updated_at < datetime.utcnow() - STALE_RUNNING_AFTER))
+
+
+def _claim(db: Session, job_id: str) -> bool:
+    """Atomically move a claimable job to running so only one worker processes it."""
+    table = models.WorldbookEmbeddingJob
+    claimed = db.query(table).filter(table.job_id == job_id, _claimable()).update({table.status: JOB_RUNNING, table.updated_at: datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+    return claimed == 1
+
+
+def run_embedding_job(job_id: str, session_factory: Callable[[], Session] = SessionLocal, stop: Optional[threading.Event] = None) -> None:
+    """Embed the job's entries batch by batch, committing each batch's progress after its vectors.
+
+    Progress is stored as a cursor into the job's entry list, so a job interrupted by a
+    shutdown (``stop`` set) or crash resumes at the first unfinished batch (at worst redoing one).
+    ``done`` and ``failed`` count only entries that still existed; deleted ones are skipped.
+    """
+    db = session_factory()
+    try:
+        if not _claim(db, job_id):
+            return
+        job = db.query(models.WorldbookEmbeddingJob).filter(models.WorldbookEmbeddingJob.job_id == job_id).one()
+        entry_ids = json.loads(job.entry_ids_json)
+        retriever = create_retriever(db, user_id=job.user_id, load_model=True)
+        while job.cursor < len(entry_ids):
+            if stop is not None and stop.is_set():
+                job.status = JOB_PENDING
+                db.commit()
+                return
+            chunk = entry_ids[job.cursor : job.cursor + EMBEDDING_JOB_BATCH]
+            entries = owner_only(db.query(models.WorldbookEntry).filter(models.WorldbookEntry.entry_id.in_(chunk)), models.WorldbookEntry, job.user_id).all()
+            try:
+                retriever.compute_entry_embeddings(entries, use_cache=False)
+            except Exception as exc:
+                db.rollback()
+                job.cursor += len(chunk)
+                job.failed += len(entries)
+                job.error = str(exc)[:500]
+                db.commit()
+                continue
+            job.cursor += len(chunk)
+            job.done += len(entries)
+            db.commit()
+            invalidate_retrieval_cache(job.worldbook_id)
+        job.status = JOB_FAILED if job.failed and not job.done else JOB_DONE
+        job.finished_at = datetime.utcnow()
+        db.commit()
+    except Exception as exc:
+        db.rollback()
+        db.query(models.WorldbookEmbeddingJob).filter(models.WorldbookEmbeddingJob.job_id == job_id).update({models.WorldbookEmbeddingJob.status: JOB_FAILED, models.WorldbookEmbeddingJob.error: str(exc)[:500]}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _worker() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _stopping.clear()
+            _executor = ThreadPoolExecutor(max_workers=EMBEDDING_JOB_WORKERS, thread_name_prefix="embedding-job")
+        return _executor
+
+
+def submit_embedding_job(job_id: str) -> None:
+    with _executor_lock:
+        if job_id in _queued:
+            return
+        _queued.add(job_id)
+    future = _worker().submit(run_embedding_job, job_id, SessionLocal, _stopping)
+    future.add_done_callback(lambda _: _queued.discard(job_id))
+
+
+def resume_embedding_jobs(db: Session) -> int:
+    """Submit pending jobs and running jobs abandoned by a crashed worker; runs at startup and on every sweep."""
+    table = models.WorldbookEmbeddingJob
+    job_ids = [job_id for (job_id,) in db.query(table.job_id).filter(_claimable()).order_by(table.id).all()]
+    for job_id in job_ids:
+        submit_embedding_job(job_id)
+    return len(job_ids)
+
+
+def _sweep(interval: float) -> None:
+    while not _stopping.wait(interval):
+        db = SessionLocal()
+        try:
+            resume_embedding_jobs(db)
+        except Exception as exc:
+            db.rollback()
+            print(f"[EMBEDDING] job sweep failed: {exc}")
+        finally:
+            db.close()
+
+
+def start_embedding_sweeper(interval: float = SWEEP_INTERVAL_SECONDS) -> None:
+    """Periodically pick up jobs no live worker owns, e.g. one left running by a worker that crashed and restarted
+    before it went stale; stops with ``shutdown_embedding_worker``."""
+    global _sweeper
+    with _executor_lock:
+        if _sweeper is not None and _sweeper.is_alive():
+            return
+        _stopping.clear()
+        _sweeper = threading.Thread(target=_sweep, args=(interval,), name="embedding-job-sweeper", daemon=True)
+        _sweeper.start()
+
+
+def shutdown_embedding_worker() -> None:
+    """Stop after the current batch; the interrupted job goes back to pending for the next start."""
+    global _executor
+    _stopping.set()
+    if _sweeper is not None:
+        _sweeper.join()
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
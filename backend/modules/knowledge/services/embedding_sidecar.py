@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import base64
+import json
+import os
+import socket
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+from typing import Any, Callable, Dict, List, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from .embeddings_codec import decode_embedding, encode_embedding
+from .embeddings_config import EmbeddingError
+
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT_MS = 5.0
+REQUEST_TIMEOUT_S = 60.0
+
+Encoder = Callable[[str, List[str]], List[List[float]]]
+
+
+class MicroBatcher:
+    """Merge concurrent embed calls into one ``encode`` per model.
+
+    The worker takes the first waiting request, then keeps collecting requests for the same model
+    until ``max_batch_size`` texts are queued or ``max_wait_ms`` has passed, and encodes them together.
+    """
+
+    def __init__(self, encode: Encoder, max_batch_size: int = DEFAULT_MAX_BATCH_SIZE, max_wait_ms: float = DEFAULT_MAX_WAIT_MS):
+        self.encode = encode
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_ms / 1000.0
+        self.batches = 0
+        self._pending: List[Tuple[str, List[str], Future]] = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, model: str, texts: List[str]) -> Future:
+        future: Future = Future()
+        with self._cond:
+            if self._closed:
+                raise EmbeddingError("Embedding 服务已关闭")
+            self._pending.append((model, texts, future))
+            self._cond.notify()
+        return future
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._worker.join(5)
+
+    def _take_batch(self) -> List[Tuple[str, List[str], Future]]:
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if not self._pending:
+                return []
+            model = self._pending[0][0]
+            deadline = time.monotonic() + self.max_wait_s
+            while not self._closed:
+                queued = sum(len(texts) for name, texts, _ in self._pending if name == model)
+                remaining = deadline - time.monotonic()
+                if queued >= self.max_batch_size or remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch, size, rest = [], 0, []
+            for item in self._pending:
+                if item[0] == model and (not batch or size + len(item[1]) <= self.max_batch_size):
+                    batch.append(item)
+                    size += len(item[1])
+                else:
+                    rest.append(item)
+            self._pending = rest
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return
+            texts = [text for _, item_texts, _ in batch for text in item_texts]
+            try:
+                vectors = self.encode(batch[0][0], texts)
+            except Exception as exc:
+                for _, _, future in batch:
+                    future.set_exception(exc)
+                continue
+            self.batches += 1
+            start = 0
+            for _, item_texts, future in batch:
+                future.set_result(vectors[start : start + len(item_texts)])
+                start += len(item_texts)
+
+
+def _pack_vectors(vectors: List[List[float]]) -> Dict[str, Any]:
+    """Rows travel as one base64 float32 blob, several times smaller than JSON floats."""
+    return {"dimension": len(vectors[0]) if vectors else 0, "vectors": base64.b64encode(b"".join(encode_embedding(row, "float32") for row in vectors)).decode("ascii")}
+
+
+def _unpack_vectors(payload: Dict[str, Any], count: int) -> List[List[float]]:
+    dimension = int(payload.get("dimension") or 0)
+    blob = base64.b64decode(payload.get("vectors") or "")
+    row_size = dimension * 4
+    if len(blob) != row_size * count:
+        raise EmbeddingError("Embedding 服务返回的向量数量不匹配")
+    return [decode_embedding(blob[idx * row_size : (idx + 1) * row_size], "float32", dimension) for idx in range(count)]
+
+
+class _SidecarHandler(BaseHTTPRequestHandler):
+    server_version = "EmbeddingSidecar/1"
+    protocol_version = "HTTP/1.1"
+
+    def _reply(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        if self.path != "/health":
+            return self._reply(404, {"detail": "not found"})
+        self._reply(200, {"status": "ok", "models": self.server.dimensions()})
+
+    def do_POST(self) -> None:
+        if self.path != "/embed":
+            return self._reply(404, {"detail": "not found"})
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            model, texts = request["model"], [str(text) for text in request["texts"]]
+        except (KeyError, TypeError, ValueError):
+            return self._reply(400, {"detail": "请求需要 model 和 texts"})
+        if not texts:
+            return self._reply(200, {"model": model, "dimension": 0, "vectors": ""})
+        try:
+            vectors = self.server.batcher.submit(model, texts).result(REQUEST_TIMEOUT_S)
+        except Exception as exc:
+            return self._reply(503, {"detail": f"Embedding 计算失败：{exc}"})
+        self._reply(200, {"model": model, **_pack_vectors(vectors)})
+
+    def address_string(self) -> str:
+        return self.client_address[0] if isinstance(self.client_address, tuple) and self.client_address else "unix"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class _SidecarMixin:
+    daemon_threads = True
+    # socketserver's default backlog of 5 refuses bursts of callers, which are exactly what batching wants.
+    request_queue_size = socket.SOMAXCONN
+    batcher: MicroBatcher
+    dimensions: Callable[[], Dict[str, int]]
+
+
+class _TcpSidecarServer(_SidecarMixin, ThreadingHTTPServer):
+    pass
+
+
+class _UnixSidecarServer(_SidecarMixin, ThreadingMixIn, UnixStreamServer):
+    def server_bind(self) -> None:
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        super().server_bind()
+        self.server_name, self.server_port = "localhost", 0
+
+
+def create_sidecar_server(url: str, encode: Encoder, dimensions: Callable[[], Dict[str, int]], max_batch_size: int = DEFAULT_MAX_BATCH_SIZE, max_wait_ms: float = DEFAULT_MAX_WAIT_MS):
+    """Bind the sidecar to ``http://127.0.0.1:<port>`` or ``unix:///path/to.sock``; call ``serve_forever`` to run it."""
+    parts = urlsplit(url)
+    if parts.scheme == "unix":
+        server = _UnixSidecarServer(parts.path, _SidecarHandler)
+    elif parts.scheme == "http":
+        server = _TcpSidecarServer((parts.hostname or "127.0.0.1", parts.port or 0), _SidecarHandler)
+    else:
+        raise ValueError(f"不支持的 Embedding 服务地址：{url}")
+    server.batcher = MicroBatcher(encode, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    server.dimensions = dimensions
+    return server
+
+
+_clients: Dict[str, httpx.Client] = {}
+_dimensions: Dict[Tuple[str, str], int] = {}
+_clients_lock = threading.Lock()
+
+
+def _client(url: str) -> Tuple[httpx.Client, str]:
+    """Keep-alive client per sidecar address plus the base URL to send requests to."""
+    parts = urlsplit(url)
+    base_url = "http://embedding-sidecar" if parts.scheme == "unix" else url.rstrip("/")
+    with _clients_lock:
+        client = _clients.get(url)
+        if client is None or client.is_closed:
+            transport = httpx.HTTPTransport(uds=parts.path) if parts.scheme == "unix" else None
+            client = _clients[url] = httpx.Client(transport=transport, timeout=REQUEST_TIMEOUT_S)
+        return client, base_url
+
+
+def close_sidecar_clients() -> None:
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+        _dimensions.clear()
+
+
+def sidecar_dimension(url: str, model: str) -> int:
+    """Dimension of ``model`` in the sidecar; the health check runs until the sidecar reports the model once."""
+    key = (url, model)
+    if key in _dimensions:
+        return _dimensions[key]
+    client, base_url = _client(url)
+    try:
+        response = client.get(base_url + "/health", timeout=2.0)
+        response.raise_for_status()
+        dimension = response.json().get("models", {}).get(model)
+    except (httpx.HTTPError, socket.error, ValueError) as exc:
+        raise EmbeddingError(f"Embedding 服务不可用：{url}: {exc}") from exc
+    if not dimension:
+        raise EmbeddingError(f"Embedding 服务未加载模型：{model}")
+    _dimensions[key] = int(dimension)
+    return _dimensions[key]
+
+
+def sidecar_embeddings(url: str, model: str, texts: List[str]) -> List[List[float]]:
+    if not texts:
+        return []
+    client, base_url = _client(url)
+    try:
+        response = client.post(base_url + "/embed", json={"model": model, "texts": texts})
+    except (httpx.HTTPError, socket.error) as exc:
+        raise EmbeddingError(f"Embedding 服务请求失败：{url}: {exc}") from exc
+    if response.status_code >= 400:
+        raise EmbeddingError(f"Embedding 服务请求失败：HTTP {response.status_code}: {response.text}")
+    return _unpack_vectors(response.json(), len(texts))
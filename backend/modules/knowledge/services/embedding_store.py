@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List
+
+from sqlalchemy.orm import Session
+
+from ....db import models
+from .embeddings_codec import decode_embedding, encode_embedding
+from .embeddings_config import normalize_text, text_hash
+
+STORE_LOOKUP_CHUNK = 500
+STORE_MAX_IDLE_DAYS = 30
+
+
+def content_key(text: str) -> str:
+    """Content address of an embedding input; whitespace-only edits map to the same key."""
+    return text_hash(normalize_text(text))
+
+
+def lookup_embeddings(db: Session, model_key: str, keys: Iterable[str]) -> Dict[str, List[float]]:
+    """Fetch stored vectors for ``keys`` and mark them as used (caller commits)."""
+    unique_keys = list(dict.fromkeys(keys))
+    found: Dict[str, List[float]] = {}
+    hit_ids: List[int] = []
+    table = models.EmbeddingContentCache
+    for start in range(0, len(unique_keys), STORE_LOOKUP_CHUNK):
+        rows = db.query(table).filter(table.embedding_model == model_key, table.text_hash.in_(unique_keys[start : start + STORE_LOOKUP_CHUNK])).all()
+        for row in rows:
+            try:
+                found[row.text_hash] = decode_embedding(row.embedding_blob, row.embedding_dtype, row.dimension)
+            except Exception:
+                continue
+            hit_ids.append(row.id)
+    if hit_ids:
+        db.query(table).filter(table.id.in_(hit_ids)).update({table.hit_count: table.hit_count + 1, table.last_used_at: datetime.utcnow()}, synchronize_session=False)
+    return found
+
+
+def _insert_statement(db: Session):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert(models.EmbeddingContentCache.__table__)
+
+
+def save_embeddings(db: Session, model_key: str, vectors: Dict[str, List[float]], dtype: str) -> int:
+    """Stage newly computed vectors (caller commits); keys another writer stored first are kept as-is."""
+    if not vectors:
+        return 0
+    now = datetime.utcnow()
+    rows = [
+        {"embedding_model": model_key, "text_hash": key, "embedding_blob": encode_embedding(vector, dtype), "embedding_dtype": dtype, "dimension": len(vector), "hit_count": 0, "created_at": now, "last_used_at": now}
+        for key, vector in vectors.items()
+    ]
+    statement = _insert_statement(db)
+    if statement is None:
+        db.add_all([models.EmbeddingContentCache(**row) for row in rows])
+        return len(rows)
+    for start in range(0, len(rows), STORE_LOOKUP_CHUNK):
+        db.execute(statement.values(rows[start : start + STORE_LOOKUP_CHUNK]).on_conflict_do_nothing(index_elements=["embedding_model", "text_hash"]))
+    return len(rows)
+
+
+def gc_embedding_store(db: Session, max_idle_days: int = STORE_MAX_IDLE_DAYS) -> int:
+    """Delete vectors nobody has looked up for ``max_idle_days``."""
+    cutoff = datetime.utcnow() - timedelta(days=max_idle_days)
+    deleted = db.query(models.EmbeddingContentCache).filter(models.EmbeddingContentCache.last_used_at < cutoff).delete(synchronize_session=False)
+    db.commit()
+    return deleted
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import json
+import struct
+from typing import List, Optional, Sequence
+
+from .embeddings_config import EmbeddingError
+
+EMBEDDING_DTYPES = ("float32", "float16", "int8")
+
+_STRUCT_CODES = {"float32": "f", "float16": "e"}
+
+
+def encode_embedding(embedding: Sequence[float], dtype: str = "float32") -> bytes:
+    """Pack a vector as little-endian bytes; int8 blobs carry a float32 scale prefix."""
+    values = [float(value) for value in embedding]
+    if dtype in _STRUCT_CODES:
+        return struct.pack(f"<{len(values)}{_STRUCT_CODES[dtype]}", *values)
+    if dtype == "int8":
+        scale = max((abs(value) for value in values), default=0.0) / 127.0
+        quantized = [max(-127, min(127, round(value / scale))) for value in values] if scale > 0 else [0] * len(values)
+        return struct.pack("<f", scale) + struct.pack(f"<{len(values)}b", *quantized)
+    raise EmbeddingError(f"不支持的向量存储类型：{dtype}")
+
+
+def decode_embedding(blob: bytes, dtype: str, dimension: int) -> List[float]:
+    if dtype in _STRUCT_CODES:
+        return list(struct.unpack(f"<{dimension}{_STRUCT_CODES[dtype]}", blob))
+    if dtype == "int8":
+        (scale,) = struct.unpack_from("<f", blob)
+        return [value * scale for value in struct.unpack_from(f"<{dimension}b", blob, 4)]
+    raise EmbeddingError(f"不支持的向量存储类型：{dtype}")
+
+
+def load_stored_embedding(blob: Optional[bytes], dtype: Optional[str], dimension: int, embedding_json: Optional[str]) -> List[float]:
+    if blob is not None and dtype:
+        return decode_embedding(blob, dtype, dimension)
+    return json.loads(embedding_json or "[]")
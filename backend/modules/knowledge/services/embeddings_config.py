@@ -3,6 +3,8 @@ from __future__ import annotations
 import hashlib
 from dataclasses import dataclass
 
+DEFAULT_SENTENCE_TRANSFORMER_MODEL = "paraphrase-multilingual-MiniLM-L12-v2"
+
 
 @dataclass
 class EmbeddingConfig:
@@ -11,6 +13,11 @@ class EmbeddingConfig:
     base_url: str | None = None
     api_key: str | None = None
     dimension: int = 768
+    storage_dtype: str = "float32"
+    max_batch_tokens: int = 8000
+    max_in_flight: int = 4
+    max_retries: int = 3
+    sidecar_url: str | None = None
 
 
 class EmbeddingError(RuntimeError):
@@ -1,50 +1,89 @@
 from __future__ import annotations
 
-from typing import List, Optional
+from typing import List, Optional, Set, Tuple
 
-from .embeddings_config import EmbeddingConfig, EmbeddingError, normalize_text
-from .embeddings_openai import openai_embeddings
+from ...system.services.metrics import EMBEDDING_SECONDS
+from .embedding_sidecar import sidecar_dimension, sidecar_embeddings
+from .embeddings_config import DEFAULT_SENTENCE_TRANSFORMER_MODEL, EmbeddingConfig, EmbeddingError, normalize_text, text_hash
+from .embeddings_openai import DEFAULT_MAX_BATCH_SIZE, openai_embeddings_batched
 from .embeddings_tfidf import TFIDFVectorizer
+from .model_registry import get_model, loaded_model
+from .retrieval_cache import query_embedding_cache
+
+_degraded_models: Set[str] = set()
+
+
+def _log_degraded_once(model_name: str, reason: Exception) -> None:
+    if model_name not in _degraded_models:
+        _degraded_models.add(model_name)
+        print(f"[EMBEDDING] {model_name} unavailable, retrieval falls back to TF-IDF until it is loaded: {reason}")
 
 
 class EmbeddingEngine:
-    def __init__(self, config: Optional[EmbeddingConfig] = None):
+    def __init__(self, config: Optional[EmbeddingConfig] = None, load_model: bool = True):
+        """``load_model=False`` only uses a model that is already in memory and otherwise falls back to TF-IDF,
+        so request threads never import torch; models are loaded by embedding jobs or the startup warmup.
+        With ``config.sidecar_url`` set, sentence-transformers vectors come from the shared embedding sidecar instead."""
         self.config = config or EmbeddingConfig()
+        self.load_model = load_model
         self._tfidf: Optional[TFIDFVectorizer] = None
         self._model = None
         if self.config.provider == "sentence_transformers":
             self._init_sentence_transformers()
 
     def _init_sentence_transformers(self) -> None:
+        model_name = self.config.model or DEFAULT_SENTENCE_TRANSFORMER_MODEL
         try:
-            from sentence_transformers import SentenceTransformer
-
-            model_name = self.config.model or "paraphrase-multilingual-MiniLM-L12-v2"
-            self._model = SentenceTransformer(model_name)
+            if self.config.sidecar_url:
+                self.config.dimension = sidecar_dimension(self.config.sidecar_url, model_name)
+                return
+            if self.load_model:
+                self._model = get_model("sentence_transformers", model_name)
+            else:
+                self._model = loaded_model("sentence_transformers", model_name)
+                if self._model is None:
+                    raise EmbeddingError(f"Embedding 模型尚未加载：{model_name}")
             self.config.dimension = self._model.get_sentence_embedding_dimension()
-        except Exception:
+        except Exception as exc:
+            _log_degraded_once(model_name, exc)
             self.config.provider = "tfidf"
 
-    def compute_embeddings(self, texts: List[str], batch_size: int = 32) -> List[List[float]]:
+    def compute_embeddings(self, texts: List[str], batch_size: Optional[int] = None) -> List[List[float]]:
+        with EMBEDDING_SECONDS.time(self.config.provider):
+            return self._compute_embeddings(texts, batch_size)
+
+    def _compute_embeddings(self, texts: List[str], batch_size: Optional[int]) -> List[List[float]]:
         normalized_texts = [normalize_text(text) for text in texts]
         if self.config.provider == "openai":
-            return self._compute_openai(normalized_texts, batch_size)
+            return self._compute_openai(normalized_texts, batch_size or DEFAULT_MAX_BATCH_SIZE)
+        if self.config.provider == "sentence_transformers" and self.config.sidecar_url:
+            return sidecar_embeddings(self.config.sidecar_url, self.config.model or DEFAULT_SENTENCE_TRANSFORMER_MODEL, normalized_texts)
         if self.config.provider == "sentence_transformers" and self._model is not None:
-            return self._compute_sentence_transformers(normalized_texts, batch_size)
+            return self._compute_sentence_transformers(normalized_texts, batch_size or 32)
         return self._compute_tfidf(normalized_texts)
 
     def compute_single(self, text: str) -> List[float]:
+        key = self._query_cache_key(text)
+        cached = query_embedding_cache.get(key) if key is not None else None
+        if cached is not None:
+            return list(cached)
         results = self.compute_embeddings([text])
-        return results[0] if results else []
+        vector = results[0] if results else []
+        if key is not None and vector:
+            query_embedding_cache.put(key, tuple(vector))
+        return vector
+
+    def _query_cache_key(self, text: str) -> Optional[Tuple[str, str, str, str]]:
+        # TF-IDF vectors depend on the vocabulary this engine instance was fitted on, so they are not shareable.
+        if self.config.provider != "openai" and not (self.config.provider == "sentence_transformers" and (self._model is not None or self.config.sidecar_url)):
+            return None
+        return self.config.provider, self.config.model or "", self.config.base_url or "", text_hash(normalize_text(text))
 
     def _compute_openai(self, texts: List[str], batch_size: int) -> List[List[float]]:
         if not self.config.base_url or not self.config.api_key:
             raise EmbeddingError("OpenAI Embedding 需要配置 base_url 和 api_key")
         model = self.config.model or "text-embedding-ada-002"
-        batches = []
-        for idx in range(0, len(texts), batch_size):
-            batches.extend(openai_embeddings(texts[idx : idx + batch_size], self.config.base_url, self.config.api_key, model=model))
-        return batches
+        return openai_embeddings_batched(texts, self.config.base_url, self.config.api_key, model=model, max_batch_size=batch_size, max_batch_tokens=self.config.max_batch_tokens, max_in_flight=self.config.max_in_flight, max_retries=self.config.max_retries)
 
     def _compute_sentence_transformers(self, texts: List[str], batch_size: int) -> List[List[float]]:
         results: List[List[float]] = []
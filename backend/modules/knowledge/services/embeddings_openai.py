@@ -1,29 +1,112 @@
 from __future__ import annotations
 
-from typing import List
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence, Tuple
 
 import httpx
 
 from .embeddings_config import EmbeddingError
 
+DEFAULT_MAX_BATCH_SIZE = 256
+DEFAULT_MAX_BATCH_TOKENS = 8000
+DEFAULT_MAX_IN_FLIGHT = 4
+DEFAULT_MAX_RETRIES = 3
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+CJK_PATTERN = re.compile(r"[\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af]")
 
-def openai_embeddings(texts: List[str], base_url: str, api_key: str, model: str = "text-embedding-ada-002", timeout_s: float = 60.0) -> List[List[float]]:
+_client: Optional[httpx.Client] = None
+_client_lock = threading.Lock()
+
+
+def shared_client() -> httpx.Client:
+    """Process-wide keep-alive client so embedding batches reuse TCP/TLS connections."""
+    global _client
+    with _client_lock:
+        if _client is None or _client.is_closed:
+            _client = httpx.Client(limits=httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=60.0))
+        return _client
+
+
+def close_shared_client() -> None:
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+
+
+def estimate_tokens(text: str) -> int:
+    cjk_chars = len(CJK_PATTERN.findall(text))
+    return cjk_chars + (len(text) - cjk_chars) // 4 + 1
+
+
+def plan_batches(texts: Sequence[str], max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS, max_batch_size: int = DEFAULT_MAX_BATCH_SIZE) -> List[Tuple[int, int]]:
+    batches: List[Tuple[int, int]] = []
+    start, tokens = 0, 0
+    for idx, text in enumerate(texts):
+        cost = estimate_tokens(text)
+        if idx > start and (tokens + cost > max_batch_tokens or idx - start >= max_batch_size):
+            batches.append((start, idx))
+            start, tokens = idx, 0
+        tokens += cost
+    if start < len(texts):
+        batches.append((start, len(texts)))
+    return batches
+
+
+def _retry_delay(response: Optional[httpx.Response], attempt: int) -> float:
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after and retry_after.strip().isdigit():
+        return min(float(retry_after), 30.0)
+    return min(0.5 * (2**attempt), 8.0)
+
+
+def openai_embeddings(texts: List[str], base_url: str, api_key: str, model: str = "text-embedding-ada-002", timeout_s: float = 60.0, max_retries: int = DEFAULT_MAX_RETRIES) -> List[List[float]]:
     url = base_url.rstrip("/") + "/embeddings"
     headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
     payload = {"model": model, "input": texts}
-    try:
-        with httpx.Client(timeout=timeout_s) as client:
-            response = client.post(url, headers=headers, json=payload)
-        if response.status_code >= 400:
-            raise EmbeddingError(f"Embedding API 请求失败：HTTP {response.status_code}: {response.text}")
-        data = response.json()
-        if "data" not in data:
-            raise EmbeddingError(f"Embedding API 返回格式错误：{data}")
-        embeddings_map = {item["index"]: item["embedding"] for item in data["data"]}
-        return [embeddings_map[i] for i in range(len(texts))]
-    except httpx.TimeoutException as exc:
-        raise EmbeddingError("Embedding API 请求超时") from exc
-    except EmbeddingError:
-        raise
-    except Exception as exc:
-        raise EmbeddingError(f"Embedding 计算失败：{exc}") from exc
+    attempt = 0
+    while True:
+        try:
+            response = shared_client().post(url, headers=headers, json=payload, timeout=timeout_s)
+            if response.status_code in RETRY_STATUS_CODES and attempt < max_retries:
+                time.sleep(_retry_delay(response, attempt))
+                attempt += 1
+                continue
+            if response.status_code >= 400:
+                raise EmbeddingError(f"Embedding API 请求失败：HTTP {response.status_code}: {response.text}")
+            data = response.json()
+            if "data" not in data:
+                raise EmbeddingError(f"Embedding API 返回格式错误：{data}")
+            embeddings_map = {item["index"]: item["embedding"] for item in data["data"]}
+            return [embeddings_map[i] for i in range(len(texts))]
+        except httpx.TransportError as exc:
+            if attempt < max_retries:
+                time.sleep(_retry_delay(None, attempt))
+                attempt += 1
+                continue
+            if isinstance(exc, httpx.TimeoutException):
+                raise EmbeddingError("Embedding API 请求超时") from exc
+            raise EmbeddingError(f"Embedding 计算失败：{exc}") from exc
+        except EmbeddingError:
+            raise
+        except Exception as exc:
+            raise EmbeddingError(f"Embedding 计算失败：{exc}") from exc
+
+
+def openai_embeddings_batched(texts: List[str], base_url: str, api_key: str, model: str = "text-embedding-ada-002", timeout_s: float = 60.0, max_batch_size: int = DEFAULT_MAX_BATCH_SIZE, max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT, max_retries: int = DEFAULT_MAX_RETRIES) -> List[List[float]]:
+    """Embed ``texts`` in token-bounded batches, dispatching up to ``max_in_flight`` batches concurrently."""
+    batches = plan_batches(texts, max_batch_tokens=max_batch_tokens, max_batch_size=max_batch_size)
+
+    def run(bounds: Tuple[int, int]) -> List[List[float]]:
+        return openai_embeddings(texts[bounds[0] : bounds[1]], base_url, api_key, model=model, timeout_s=timeout_s, max_retries=max_retries)
+
+    if len(batches) <= 1 or max_in_flight <= 1:
+        results = [run(bounds) for bounds in batches]
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_in_flight, len(batches)), thread_name_prefix="embedding-batch") as pool:
+            results = list(pool.map(run, batches))
+    return [vector for batch in results for vector in batch]
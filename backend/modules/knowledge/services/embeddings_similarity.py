@@ -1,10 +1,88 @@
 from __future__ import annotations
 
+import heapq
 import math
-from typing import List, Tuple
+from typing import List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy ships with sentence-transformers
+    np = None
+
+DEFAULT_CHUNK_SIZE = 16384
 
 
 def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
+    if len(vec1) != len(vec2):
+        raise ValueError("向量维度不匹配")
+    if np is None:
+        return python_cosine_similarity(vec1, vec2)
+    left = np.asarray(vec1, dtype=np.float64)
+    right = np.asarray(vec2, dtype=np.float64)
+    norm = float(np.linalg.norm(left) * np.linalg.norm(right))
+    return float(left @ right) / norm if norm else 0.0
+
+
+def top_k_similar(query_vec: List[float], candidate_vecs: Sequence[Sequence[float]], top_k: int = 5, chunk_size: Optional[int] = None) -> List[Tuple[int, float]]:
+    if top_k <= 0 or len(candidate_vecs) == 0:
+        return []
+    if np is None:
+        return python_top_k_similar(query_vec, candidate_vecs, top_k)
+    query = _unit_vector(query_vec)
+    chunk_size = chunk_size or len(candidate_vecs)
+    best_idx = np.zeros(0, dtype=np.int64)
+    best_scores = np.zeros(0, dtype=np.float32)
+    for start in range(0, len(candidate_vecs), chunk_size):
+        scores = _candidate_matrix(candidate_vecs[start : start + chunk_size], len(query)) @ query
+        top = top_k_indices(scores, top_k)
+        best_idx = np.concatenate([best_idx, top + start])
+        best_scores = np.concatenate([best_scores, scores[top]])
+        if best_idx.size > top_k:
+            keep = top_k_indices(best_scores, top_k)
+            best_idx, best_scores = best_idx[keep], best_scores[keep]
+    order = np.argsort(-best_scores, kind="stable")
+    return [(int(best_idx[idx]), float(best_scores[idx])) for idx in order]
+
+
+def similarity_matrix(query_vecs: Sequence[Sequence[float]], candidate_vecs: Sequence[Sequence[float]], chunk_size: Optional[int] = None) -> List[List[float]]:
+    if len(query_vecs) == 0 or len(candidate_vecs) == 0:
+        return [[] for _ in query_vecs]
+    if np is None:
+        return [[python_cosine_similarity(query, candidate) for candidate in candidate_vecs] for query in query_vecs]
+    queries = normalize_rows(np.asarray(query_vecs, dtype=np.float32))
+    chunk_size = chunk_size or len(candidate_vecs)
+    blocks = [queries @ _candidate_matrix(candidate_vecs[start : start + chunk_size], queries.shape[1]).T for start in range(0, len(candidate_vecs), chunk_size)]
+    return np.concatenate(blocks, axis=1).tolist()
+
+
+def normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k_indices(scores, top_k: int):
+    """Indices of the ``top_k`` largest scores, highest first (ties keep input order)."""
+    if scores.size <= top_k:
+        return np.argsort(-scores, kind="stable")
+    top = np.argpartition(-scores, top_k - 1)[:top_k]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+def _unit_vector(vec: Sequence[float]):
+    query = np.asarray(vec, dtype=np.float32).reshape(-1)
+    norm = float(np.linalg.norm(query))
+    return query / norm if norm else query
+
+
+def _candidate_matrix(candidate_vecs: Sequence[Sequence[float]], dimension: int):
+    matrix = np.asarray(candidate_vecs, dtype=np.float32)
+    if matrix.ndim != 2 or matrix.shape[1] != dimension:
+        raise ValueError("向量维度不匹配")
+    return normalize_rows(matrix)
+
+
+def python_cosine_similarity(vec1: Sequence[float], vec2: Sequence[float]) -> float:
     if len(vec1) != len(vec2):
         raise ValueError("向量维度不匹配")
     dot_product = sum(a * b for a, b in zip(vec1, vec2))
@@ -15,7 +93,6 @@ def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
     return dot_product / (norm1 * norm2)
 
 
-def top_k_similar(query_vec: List[float], candidate_vecs: List[List[float]], top_k: int = 5) -> List[Tuple[int, float]]:
-    similarities = [(idx, cosine_similarity(query_vec, vec)) for idx, vec in enumerate(candidate_vecs)]
-    similarities.sort(key=lambda item: item[1], reverse=True)
-    return similarities[:top_k]
+def python_top_k_similar(query_vec: Sequence[float], candidate_vecs: Sequence[Sequence[float]], top_k: int = 5) -> List[Tuple[int, float]]:
+    similarities = ((idx, python_cosine_similarity(query_vec, vec)) for idx, vec in enumerate(candidate_vecs))
+    return heapq.nlargest(top_k, similarities, key=lambda item: item[1])
@@ -7,6 +7,11 @@ from typing import Dict, List
 from .embeddings_config import EmbeddingError, normalize_text
 
 
+def tokenize(text: str) -> List[str]:
+    tokens = re.findall(r"[\u4e00-\u9fa5]|[a-zA-Z]+", normalize_text(text))
+    return [token.lower() for token in tokens if token]
+
+
 class TFIDFVectorizer:
     def __init__(self, max_features: int = 768):
         self.max_features = max_features
@@ -15,8 +20,7 @@ class TFIDFVectorizer:
         self._fitted = False
 
     def _tokenize(self, text: str) -> List[str]:
-        tokens = re.findall(r"[\u4e00-\u9fa5]|[a-zA-Z]+", normalize_text(text))
-        return [token.lower() for token in tokens if token]
+        return tokenize(text)
 
     def fit(self, documents: List[str]) -> "TFIDFVectorizer":
         doc_freq: Dict[str, int] = {}
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import re
+import threading
+import weakref
+from typing import Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import bindparam, column, func, literal_column, table, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from ....core.tenant import owner_or_public
+from ....db import models
+
+TERM_PATTERN = re.compile(r"[\u4e00-\u9fff]+|[a-z0-9_]+")
+CJK_PATTERN = re.compile(r"[\u4e00-\u9fff]")
+LEXICAL_BACKFILL_BATCH = 500
+MAX_QUERY_TERMS = 64
+
+SQLITE_TABLE = "worldbook_fts"
+POSTGRES_TABLE = "worldbook_lexical"
+# Relative BM25 weights of the title, tags and content columns.
+SQLITE_BM25 = f"-bm25({SQLITE_TABLE}, 3.0, 2.0, 1.0)"
+
+_sqlite_fts = table(SQLITE_TABLE, column("rowid"))
+_postgres_lexical = table(POSTGRES_TABLE, column("entry_pk"), column("document"))
+_available: "weakref.WeakKeyDictionary[Engine, bool]" = weakref.WeakKeyDictionary()
+_available_lock = threading.Lock()
+
+
+def lexical_terms(text_value: Optional[str]) -> List[str]:
+    """Tokenize like ``query_terms``, but split CJK runs into overlapping character bigrams."""
+    terms: List[str] = []
+    for run in TERM_PATTERN.findall((text_value or "").lower()):
+        if CJK_PATTERN.match(run) and len(run) > 1:
+            terms.extend(run[idx : idx + 2] for idx in range(len(run) - 1))
+        else:
+            terms.append(run)
+    return terms
+
+
+def _field_terms(value: Optional[str]) -> str:
+    return " ".join(lexical_terms(value))
+
+
+def _engine(bind) -> Engine:
+    return bind.engine if isinstance(bind, Connection) else bind
+
+
+def _create_index(conn: Connection) -> bool:
+    dialect = conn.dialect.name
+    try:
+        if dialect == "sqlite":
+            conn.execute(text(f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_TABLE} USING fts5(title, tags, content, tokenize = \"unicode61 tokenchars '_'\")"))
+        elif dialect == "postgresql":
+            conn.execute(text(f"CREATE TABLE IF NOT EXISTS {POSTGRES_TABLE} (entry_pk INTEGER PRIMARY KEY, document TSVECTOR NOT NULL)"))
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{POSTGRES_TABLE}_document ON {POSTGRES_TABLE} USING GIN (document)"))
+        else:
+            return False
+    except DBAPIError as exc:
+        print(f"[LEXICAL] full-text index unavailable on {dialect}: {exc}")
+        return False
+    return True
+
+
+def lexical_index_available(db: Session) -> bool:
+    engine = _engine(db.get_bind())
+    with _available_lock:
+        cached = _available.get(engine)
+    if cached is not None:
+        return cached
+    dialect = engine.dialect.name
+    if dialect == "sqlite":
+        exists = db.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": SQLITE_TABLE}).first() is not None
+    elif dialect == "postgresql":
+        exists = db.execute(text("SELECT to_regclass(:name)"), {"name": POSTGRES_TABLE}).scalar() is not None
+    else:
+        exists = False
+    with _available_lock:
+        _available[engine] = exists
+    return exists
+
+
+def ensure_lexical_index(engine: Engine) -> int:
+    """Create the full-text table if the database supports it and index entries it does not hold yet."""
+    with engine.begin() as conn:
+        created = _create_index(conn)
+    with _available_lock:
+        _available[engine] = created
+    if not created:
+        return 0
+    indexed = 0
+    while True:
+        with Session(bind=engine) as db:
+            entries = db.query(models.WorldbookEntry).filter(~models.WorldbookEntry.id.in_(_indexed_ids(engine))).order_by(models.WorldbookEntry.id).limit(LEXICAL_BACKFILL_BATCH).all()
+            if not entries:
+                break
+            update_lexical_index(db, upserted=entries)
+            db.commit()
+            indexed += len(entries)
+    if indexed:
+        print(f"[LEXICAL] indexed {indexed} worldbook entries")
+    return indexed
+
+
+def _indexed_ids(engine: Engine):
+    if engine.dialect.name == "sqlite":
+        return _sqlite_fts.select().with_only_columns(_sqlite_fts.c.rowid).scalar_subquery()
+    return _postgres_lexical.select().with_only_columns(_postgres_lexical.c.entry_pk).scalar_subquery()
+
+
+def update_lexical_index(db: Session, upserted: Sequence[models.WorldbookEntry] = (), removed: Iterable[int] = ()) -> None:
+    """Stage index changes keyed by ``WorldbookEntry.id``; the caller commits with its own writes."""
+    if not lexical_index_available(db):
+        return
+    entries = [entry for entry in upserted if entry.id is not None]
+    stale_ids = list({*removed, *(entry.id for entry in entries)})
+    if not stale_ids:
+        return
+    postgres = db.get_bind().dialect.name == "postgresql"
+    if postgres:
+        db.execute(text(f"DELETE FROM {POSTGRES_TABLE} WHERE entry_pk IN :ids").bindparams(bindparam("ids", expanding=True)), {"ids": stale_ids})
+    else:
+        db.execute(text(f"DELETE FROM {SQLITE_TABLE} WHERE rowid IN :ids").bindparams(bindparam("ids", expanding=True)), {"ids": stale_ids})
+    if not entries:
+        return
+    rows = [{"id": entry.id, "title": _field_terms(entry.title), "tags": _field_terms((entry.tags or "").replace(",", " ")), "content": _field_terms(entry.content)} for entry in entries]
+    if postgres:
+        db.execute(text(f"INSERT INTO {POSTGRES_TABLE} (entry_pk, document) VALUES (:id, setweight(to_tsvector('simple', :title), 'A') || setweight(to_tsvector('simple', :tags), 'B') || setweight(to_tsvector('simple', :content), 'C'))"), rows)
+    else:
+        db.execute(text(f"INSERT INTO {SQLITE_TABLE} (rowid, title, tags, content) VALUES (:id, :title, :tags, :content)"), rows)
+
+
+def search_lexical(db: Session, query: str, top_k: int, user_id: Optional[str] = None, worldbook_id: Optional[str] = None, category: Optional[str] = None, enabled_only: bool = False, disabled_categories: Optional[Set[str]] = None) -> Optional[List[Tuple[models.WorldbookEntry, float]]]:
+    """BM25-ranked (entry, score) pairs, best first; ``None`` when no full-text index is available."""
+    if not lexical_index_available(db):
+        return None
+    terms = list(dict.fromkeys(lexical_terms(query)))[:MAX_QUERY_TERMS]
+    if not terms or top_k <= 0:
+        return []
+    entry = models.WorldbookEntry
+    if db.get_bind().dialect.name == "postgresql":
+        ts_query = func.to_tsquery("simple", " | ".join(terms))
+        score = func.ts_rank_cd(_postgres_lexical.c.document, ts_query)
+        rows = db.query(entry, score.label("score")).select_from(_postgres_lexical).join(entry, entry.id == _postgres_lexical.c.entry_pk).filter(_postgres_lexical.c.document.op("@@")(ts_query))
+    else:
+        score = literal_column(SQLITE_BM25)
+        match = " OR ".join(f'"{term}"' for term in terms)
+        rows = db.query(entry, score.label("score")).select_from(_sqlite_fts).join(entry, entry.id == _sqlite_fts.c.rowid).filter(text(f"{SQLITE_TABLE} MATCH :match")).params(match=match)
+    rows = owner_or_public(rows, entry, user_id)
+    if worldbook_id:
+        rows = rows.filter(entry.worldbook_id == worldbook_id)
+    if category:
+        rows = rows.filter(entry.category == category)
+    if enabled_only:
+        rows = rows.filter(entry.is_enabled == True)
+    if disabled_categories:
+        rows = rows.filter(entry.category_key.notin_(disabled_categories))
+    return [(row, float(value)) for row, value in rows.order_by(score.desc()).limit(top_k).all()]
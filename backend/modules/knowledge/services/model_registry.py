@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import threading
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .embeddings_config import EmbeddingError
+
+ModelKey = Tuple[str, str]
+
+
+def _load_sentence_transformer(model_name: str) -> Any:
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(model_name)
+
+
+MODEL_LOADERS: Dict[str, Callable[[str], Any]] = {"sentence_transformers": _load_sentence_transformer}
+
+_models: Dict[ModelKey, Any] = {}
+_failures: Dict[ModelKey, str] = {}
+_load_seconds: Dict[ModelKey, float] = {}
+_key_locks: Dict[ModelKey, threading.Lock] = {}
+_warming: Set[ModelKey] = set()
+_registry_lock = threading.Lock()
+
+
+def get_model(provider: str, model_name: str) -> Any:
+    """Return the process-wide model for (provider, model), loading it once per process."""
+    key = (provider, model_name)
+    model = _models.get(key)
+    if model is not None:
+        return model
+    with _registry_lock:
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+    with key_lock:
+        if key in _models:
+            return _models[key]
+        if key in _failures:
+            raise EmbeddingError(_failures[key])
+        loader = MODEL_LOADERS.get(provider)
+        if loader is None:
+            raise EmbeddingError(f"未知的 Embedding 模型提供方：{provider}")
+        started = perf_counter()
+        try:
+            model = loader(model_name)
+        except Exception as exc:
+            _failures[key] = f"Embedding 模型加载失败：{provider}/{model_name}: {exc}"
+            raise EmbeddingError(_failures[key]) from exc
+        _load_seconds[key] = perf_counter() - started
+        _models[key] = model
+        print(f"[EMBEDDING] loaded {provider}/{model_name} in {_load_seconds[key]:.2f}s")
+        return model
+
+
+def loaded_model(provider: str, model_name: str) -> Optional[Any]:
+    """The model if some earlier warmup or worker already loaded it; never imports anything."""
+    return _models.get((provider, model_name))
+
+
+def warmup_in_background(specs: Iterable[ModelKey]) -> List[ModelKey]:
+    """Load models on a daemon thread, at most once per key, so request threads never import ML frameworks."""
+    with _registry_lock:
+        pending = [key for key in dict.fromkeys(specs) if key not in _models and key not in _failures and key not in _warming]
+        _warming.update(pending)
+    if pending:
+        threading.Thread(target=_warmup_and_release, args=(pending,), name="embedding-warmup", daemon=True).start()
+    return pending
+
+
+def _warmup_and_release(specs: List[ModelKey]) -> None:
+    try:
+        warmup_models(specs)
+    finally:
+        with _registry_lock:
+            _warming.difference_update(specs)
+
+
+def warmup_models(specs: Iterable[ModelKey]) -> Dict[ModelKey, bool]:
+    results: Dict[ModelKey, bool] = {}
+    for provider, model_name in specs:
+        try:
+            get_model(provider, model_name)
+            results[(provider, model_name)] = True
+        except EmbeddingError as exc:
+            print(f"[EMBEDDING] warmup failed: {exc}")
+            results[(provider, model_name)] = False
+    return results
+
+
+def model_load_seconds() -> Dict[str, float]:
+    return {f"{provider}/{model_name}": seconds for (provider, model_name), seconds in _load_seconds.items()}
+
+
+def reset_models() -> None:
+    with _registry_lock:
+        _models.clear()
+        _failures.clear()
+        _load_seconds.clear()
+        _key_locks.clear()
+        _warming.clear()
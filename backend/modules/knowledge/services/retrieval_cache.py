@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+RETRIEVAL_CACHE_SIZE = 512
+RETRIEVAL_CACHE_TTL_S = 600.0
+QUERY_EMBEDDING_CACHE_SIZE = 1024
+QUERY_EMBEDDING_TTL_S = 24 * 3600.0
+
+
+class TtlLruCache:
+    """Thread-safe LRU cache whose entries also expire ``ttl_s`` seconds after being stored."""
+
+    def __init__(self, max_size: int, ttl_s: float):
+        self.max_size = max_size
+        self.ttl_s = ttl_s
+        self.hits = 0
+        self.misses = 0
+        self._items: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[0] < now:
+                if item is not None:
+                    del self._items[key]
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl_s, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._items), "hits": self.hits, "misses": self.misses}
+
+
+story_results_cache = TtlLruCache(RETRIEVAL_CACHE_SIZE, RETRIEVAL_CACHE_TTL_S)
+query_embedding_cache = TtlLruCache(QUERY_EMBEDDING_CACHE_SIZE, QUERY_EMBEDDING_TTL_S)
+
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    return {"story_results": story_results_cache.stats(), "query_embeddings": query_embedding_cache.stats()}
+
+
+# Process-local counters for immediate invalidation in the writing worker. Other workers notice changes through
+# RAGRetriever.entries_stamp, which story_cache_key also includes.
+_versions: Dict[str, int] = {}
+_all_version = 0
+_change_count = 0
+_versions_lock = threading.Lock()
+
+
+def worldbook_version(worldbook_id: Optional[str]) -> Tuple[int, int]:
+    """Version pair that changes whenever entries visible to a ``worldbook_id`` scope may have changed.
+
+    Retrievals without a worldbook scope span every worldbook, so they follow the count of all changes.
+    """
+    with _versions_lock:
+        return (_all_version, _versions.get(worldbook_id, 0)) if worldbook_id else (_change_count, 0)
+
+
+def invalidate_retrieval_cache(worldbook_id: Optional[str] = None) -> None:
+    """Retire cached retrievals over ``worldbook_id`` (every cached retrieval when None)."""
+    global _all_version, _change_count
+    with _versions_lock:
+        _change_count += 1
+        if worldbook_id:
+            _versions[worldbook_id] = _versions.get(worldbook_id, 0) + 1
+        else:
+            _all_version += 1
@@ -5,49 +5,94 @@ from typing import Any, Dict, List, Optional, Set, Tuple
 
 from sqlalchemy.orm import Session
 
-from .embeddings_config import EmbeddingConfig
+from ....config import settings
+from .embeddings_config import DEFAULT_SENTENCE_TRANSFORMER_MODEL, EmbeddingConfig, text_hash
+from .retrieval_cache import story_results_cache, worldbook_version
 from .retriever import RAGRetriever
 
 
-def create_retriever(db: Session, user_id: Optional[str] = None, worldbook_id: Optional[str] = None, disabled_categories: Optional[Set[str]] = None) -> RAGRetriever:
+def create_retriever(db: Session, user_id: Optional[str] = None, worldbook_id: Optional[str] = None, disabled_categories: Optional[Set[str]] = None, index_backend: Optional[str] = None, ann_nprobe: Optional[int] = None, load_model: bool = False) -> RAGRetriever:
+    """``index_backend`` is "exact" or "ivf" (approximate; ``ann_nprobe`` trades recall for latency); both default to settings.
+
+    Request paths keep ``load_model=False``: until the startup warmup (``NOVEL_EMBEDDING_WARMUP``, on by default) or an
+    embedding job has loaded the model they get TF-IDF, and never import torch themselves. Embedding jobs pass True.
+    With ``NOVEL_EMBEDDING_SIDECAR_URL`` set, neither loads a model: vectors come from the embedding sidecar.
+    """
+    options = {"user_id": user_id, "worldbook_id": worldbook_id, "disabled_categories": disabled_categories, "index_backend": index_backend or settings.vector_index_backend, "ann_nprobe": ann_nprobe or settings.ann_nprobe, "load_model": load_model}
     try:
-        retriever = RAGRetriever(db, EmbeddingConfig(provider="sentence_transformers", model="paraphrase-multilingual-MiniLM-L12-v2"), user_id=user_id, worldbook_id=worldbook_id, disabled_categories=disabled_categories)
+        retriever = RAGRetriever(db, EmbeddingConfig(provider="sentence_transformers", model=DEFAULT_SENTENCE_TRANSFORMER_MODEL, sidecar_url=settings.embedding_sidecar_url or None), **options)
         _ = retriever.engine
         return retriever
     except Exception:
-        return RAGRetriever(db, EmbeddingConfig(provider="tfidf"), user_id=user_id, worldbook_id=worldbook_id, disabled_categories=disabled_categories)
+        return RAGRetriever(db, EmbeddingConfig(provider="tfidf"), **options)
 
 
-def hybrid_search(retriever: RAGRetriever, query: str, top_k: int = 8, semantic_weight: float = 0.6, importance_weight: float = 0.3, recency_weight: float = 0.1, category_filter: Optional[str] = None) -> List[Tuple[Any, float]]:
+def hybrid_search(retriever: RAGRetriever, query: str, top_k: int = 8, semantic_weight: float = 0.4, lexical_weight: float = 0.2, importance_weight: float = 0.3, recency_weight: float = 0.1, category_filter: Optional[str] = None) -> List[Tuple[Any, float]]:
+    """Fuse vector similarity and BM25, each normalized by its best hit, with importance and recency."""
     semantic_results = retriever.semantic_search(query, top_k=top_k * 2, category_filter=category_filter)
-    if not semantic_results:
+    lexical_results = retriever.lexical_search(query, top_k=top_k * 2, category_filter=category_filter)
+    if lexical_results is None:
+        semantic_weight, lexical_weight, lexical_results = semantic_weight + lexical_weight, 0.0, []
+    if not semantic_results and not lexical_results:
         return []
-    max_semantic = max(score for _, score in semantic_results) or 1.0
+    max_semantic = max((score for _, score in semantic_results), default=0.0) or 1.0
+    max_lexical = max((score for _, score in lexical_results), default=0.0) or 1.0
+    entries: Dict[Any, Any] = {}
+    semantic_scores: Dict[Any, float] = {}
+    lexical_scores: Dict[Any, float] = {}
+    for entry, score in semantic_results:
+        entries.setdefault(entry.id, entry)
+        semantic_scores[entry.id] = score / max_semantic
+    for entry, score in lexical_results:
+        entries.setdefault(entry.id, entry)
+        lexical_scores[entry.id] = score / max_lexical
     now = datetime.utcnow()
     scored = []
-    for entry, semantic_similarity in semantic_results:
+    for key, entry in entries.items():
         normalized_recency = max(0, 1 - ((now - entry.updated_at).days if entry.updated_at else 15) / 30)
-        combined = semantic_weight * (semantic_similarity / max_semantic) + importance_weight * (entry.importance or 0.5) + recency_weight * normalized_recency
+        combined = semantic_weight * semantic_scores.get(key, 0.0) + lexical_weight * lexical_scores.get(key, 0.0) + importance_weight * (entry.importance or 0.5) + recency_weight * normalized_recency
         scored.append((entry, combined))
     scored.sort(key=lambda item: item[1], reverse=True)
     return scored[:top_k]
 
 
+def story_result(entry: Any, score: float) -> Dict[str, Any]:
+    return {
+        "worldbook_id": entry.worldbook_id,
+        "entry_id": entry.entry_id,
+        "title": entry.title,
+        "category": entry.category,
+        "content": entry.content[:800],
+        "importance": entry.importance,
+        "canonical": entry.canonical,
+        "relevance_score": round(score, 4),
+    }
+
+
+def story_cache_key(retriever: RAGRetriever, recent_context: str, top_k: int, use_hybrid: bool, category_filter: Optional[str]) -> Tuple[Any, ...]:
+    scope = (retriever.user_id, retriever.worldbook_id, tuple(sorted(retriever.disabled_categories)), retriever.model_key(), retriever.index_backend)
+    # worldbook_version only sees this process's invalidations; the entries stamp catches writes from other workers.
+    return scope + (text_hash(recent_context), top_k, use_hybrid, category_filter, worldbook_version(retriever.worldbook_id), retriever.entries_stamp())
+
+
+def retrieve_story_entries(retriever: RAGRetriever, recent_context: str, top_k: int = 8, use_hybrid: bool = True, category_filter: Optional[str] = None) -> List[Tuple[Any, float]]:
+    """Ranked (entry, score) pairs; entries are already scoped to the retriever's owner, worldbook and enabled filters.
+
+    Rankings are cached per recent-context fingerprint, so a reroll of the same turn only reloads its entries.
+    """
+    key = story_cache_key(retriever, recent_context, top_k, use_hybrid, category_filter)
+    cached = story_results_cache.get(key)
+    if cached is not None:
+        scored = retriever.load_scored(cached)
+        if scored is not None:
+            return scored
+    scored = hybrid_search(retriever, recent_context, top_k=top_k, category_filter=category_filter) if use_hybrid else retriever.semantic_search(recent_context, top_k=top_k, category_filter=category_filter)
+    story_results_cache.put(key, [(entry.id, entry.entry_id, score) for entry, score in scored])
+    return scored
+
+
 def retrieve_for_story(retriever: RAGRetriever, recent_context: str, top_k: int = 8, use_hybrid: bool = True, category_filter: Optional[str] = None) -> List[Dict[str, Any]]:
-    results = hybrid_search(retriever, recent_context, top_k=top_k, category_filter=category_filter) if use_hybrid else retriever.semantic_search(recent_context, top_k=top_k, category_filter=category_filter)
-    return [
-        {
-            "worldbook_id": entry.worldbook_id,
-            "entry_id": entry.entry_id,
-            "title": entry.title,
-            "category": entry.category,
-            "content": entry.content[:800],
-            "importance": entry.importance,
-            "canonical": entry.canonical,
-            "relevance_score": round(score, 4),
-        }
-        for entry, score in results
-    ]
+    return [story_result(entry, score) for entry, score in retrieve_story_entries(retriever, recent_context, top_k=top_k, use_hybrid=use_hybrid, category_filter=category_filter)]
 
 
 def retrieve_worldbook_context(db: Session, query: str, top_k: int = 8, user_id: Optional[str] = None, worldbook_id: Optional[str] = None, disabled_categories: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
@@ -1,84 +1,160 @@
 from __future__ import annotations
 
-import json
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Set, Tuple
 
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from ....db import models
 from ....core.tenant import owner_or_public
+from ...system.services.metrics import RETRIEVAL_CANDIDATES
+from .ann_index import ANN_BACKENDS, DEFAULT_NPROBE, IvfIndex, new_vector_index
+from .embedding_store import content_key, lookup_embeddings, save_embeddings
+from .embeddings_codec import encode_embedding, load_stored_embedding
 from .embeddings_config import EmbeddingConfig, EmbeddingError, text_hash
 from .embeddings_engine import EmbeddingEngine
 from .embeddings_similarity import top_k_similar
+from .lexical_index import search_lexical
+from .tfidf_index import load_tfidf_index
+from .vector_index import IndexKey, VectorIndex, get_vector_index, store_vector_index, vector_index_available
+
+EMBEDDING_LOOKUP_CHUNK = 500
+
+
+def entry_text(entry: models.WorldbookEntry) -> str:
+    return f"{entry.title} {entry.content}"
 
 
 class RAGRetriever:
-    def __init__(self, db: Session, embedding_config: Optional[EmbeddingConfig] = None, user_id: Optional[str] = None, worldbook_id: Optional[str] = None, disabled_categories: Optional[Set[str]] = None):
+    def __init__(self, db: Session, embedding_config: Optional[EmbeddingConfig] = None, user_id: Optional[str] = None, worldbook_id: Optional[str] = None, disabled_categories: Optional[Set[str]] = None, index_backend: str = "exact", ann_nprobe: int = DEFAULT_NPROBE, load_model: bool = True):
+        if index_backend not in ANN_BACKENDS:
+            raise ValueError(f"未知的向量索引类型：{index_backend}")
         self.db = db
         self.embedding_config = embedding_config or EmbeddingConfig()
         self.user_id = user_id
         self.worldbook_id = worldbook_id
         self.disabled_categories = set(disabled_categories or set())
+        self.index_backend = index_backend
+        self.ann_nprobe = ann_nprobe
+        self.load_model = load_model
         self._engine: Optional[EmbeddingEngine] = None
 
     @property
     def engine(self) -> EmbeddingEngine:
         if self._engine is None:
-            self._engine = EmbeddingEngine(self.embedding_config)
+            self._engine = EmbeddingEngine(self.embedding_config, load_model=self.load_model)
         return self._engine
 
     def _entry_query(self):
         query = owner_or_public(self.db.query(models.WorldbookEntry), models.WorldbookEntry, self.user_id)
         return query.filter(models.WorldbookEntry.worldbook_id == self.worldbook_id) if self.worldbook_id else query
 
+    def entries_stamp(self) -> Tuple[int, Optional[datetime]]:
+        """(count, latest updated_at) of the entries in scope; any insert, edit or delete from any worker changes it."""
+        count, latest = self._entry_query().with_entities(func.count(models.WorldbookEntry.id), func.max(models.WorldbookEntry.updated_at)).one()
+        return count, latest
+
     def _embedding_query(self, entry: models.WorldbookEntry):
         return self.db.query(models.WorldbookEmbedding).filter(models.WorldbookEmbedding.entry_id == entry.entry_id, models.WorldbookEmbedding.user_id == entry.user_id, models.WorldbookEmbedding.worldbook_id == entry.worldbook_id)
 
-    def _entry_enabled(self, entry: models.WorldbookEntry) -> bool:
-        meta = json.loads(entry.meta_json) if entry.meta_json else {}
-        category_name = (entry.category or "").strip()
-        return meta.get("enabled", True) is not False and not bool(meta.get("disable") or meta.get("disabled")) and category_name not in self.disabled_categories
+    def _enabled_query(self, category_filter: Optional[str] = None):
+        query = self._entry_query().filter(models.WorldbookEntry.is_enabled == True)
+        if self.disabled_categories:
+            query = query.filter(models.WorldbookEntry.category_key.notin_(self.disabled_categories))
+        return query.filter(models.WorldbookEntry.category == category_filter) if category_filter else query
 
     def _filtered_entries(self, category_filter: Optional[str] = None) -> List[models.WorldbookEntry]:
-        query = self._entry_query()
-        if category_filter:
-            query = query.filter(models.WorldbookEntry.category == category_filter)
-        return [entry for entry in query.all() if self._entry_enabled(entry)]
+        return self._enabled_query(category_filter).all()
 
     def _get_embedding_cache(self, entry: models.WorldbookEntry) -> Optional[Tuple[List[float], str, int]]:
         cache = self._embedding_query(entry).first()
         if not cache:
             return None
         try:
-            return json.loads(cache.embedding_json), cache.embedding_model, cache.dimension
+            return load_stored_embedding(cache.embedding_blob, cache.embedding_dtype, cache.dimension, cache.embedding_json), cache.embedding_model, cache.dimension
         except Exception:
             return None
 
-    def _save_embedding_cache(self, entry: models.WorldbookEntry, embedding: List[float], content_hash: str) -> None:
-        cache = self._embedding_query(entry).first()
-        payload = {"embedding_json": json.dumps(embedding, ensure_ascii=False), "content_hash": content_hash, "embedding_model": self.embedding_config.provider, "dimension": len(embedding), "updated_at": datetime.utcnow()}
+    def _embedding_rows(self, entries: List[models.WorldbookEntry]) -> Dict[Tuple[str, Optional[str], str], models.WorldbookEmbedding]:
+        entry_ids = list(dict.fromkeys(entry.entry_id for entry in entries))
+        rows: Dict[Tuple[str, Optional[str], str], models.WorldbookEmbedding] = {}
+        for start in range(0, len(entry_ids), EMBEDDING_LOOKUP_CHUNK):
+            for row in self.db.query(models.WorldbookEmbedding).filter(models.WorldbookEmbedding.entry_id.in_(entry_ids[start : start + EMBEDDING_LOOKUP_CHUNK])).all():
+                rows[(row.entry_id, row.user_id, row.worldbook_id)] = row
+        return rows
+
+    def _store_embedding(self, entry: models.WorldbookEntry, embedding: List[float], content_hash: str, cache: Optional[models.WorldbookEmbedding]) -> None:
+        dtype = self.embedding_config.storage_dtype
+        payload = {"embedding_json": None, "embedding_blob": encode_embedding(embedding, dtype), "embedding_dtype": dtype, "content_hash": content_hash, "embedding_model": self.embedding_config.provider, "dimension": len(embedding), "updated_at": datetime.utcnow()}
         if cache:
             for key, value in payload.items():
                 setattr(cache, key, value)
         else:
             self.db.add(models.WorldbookEmbedding(user_id=entry.user_id, worldbook_id=entry.worldbook_id, entry_id=entry.entry_id, **payload))
+
+    def _save_embedding_cache(self, entry: models.WorldbookEntry, embedding: List[float], content_hash: str) -> None:
+        self._store_embedding(entry, embedding, content_hash, self._embedding_query(entry).first())
         self.db.commit()
 
+    def compute_entry_embeddings(self, entries: List[models.WorldbookEntry], use_cache: bool = True, strict: bool = True) -> Dict[str, List[float]]:
+        rows = self._embedding_rows(entries)
+        vectors: Dict[str, List[float]] = {}
+        stale: Dict[str, models.WorldbookEntry] = {}
+        for entry in entries:
+            cache = rows.get((entry.entry_id, entry.user_id, entry.worldbook_id))
+            if use_cache and cache is not None and cache.content_hash == text_hash(entry_text(entry)):
+                try:
+                    vectors[entry.entry_id] = load_stored_embedding(cache.embedding_blob, cache.embedding_dtype, cache.dimension, cache.embedding_json)
+                    continue
+                except Exception:
+                    pass
+            stale[entry.entry_id] = entry
+        if stale:
+            contents = [entry_text(entry) for entry in stale.values()]
+            try:
+                computed = self._content_embeddings(contents)
+            except EmbeddingError:
+                if strict:
+                    raise
+                return vectors
+            for entry, content, embedding in zip(stale.values(), contents, computed):
+                self._store_embedding(entry, embedding, text_hash(content), rows.get((entry.entry_id, entry.user_id, entry.worldbook_id)))
+                vectors[entry.entry_id] = embedding
+            entry_ids = [entry.entry_id for entry in entries]
+            self.db.commit()
+            self._reload_entries(entry_ids)
+        return vectors
+
+    def _reload_entries(self, entry_ids: List[str]) -> None:
+        """Refresh entries expired by a commit in bulk rather than one SELECT per attribute access."""
+        for start in range(0, len(entry_ids), EMBEDDING_LOOKUP_CHUNK):
+            self.db.query(models.WorldbookEntry).filter(models.WorldbookEntry.entry_id.in_(entry_ids[start : start + EMBEDDING_LOOKUP_CHUNK])).all()
+
+    def _content_embeddings(self, contents: List[str]) -> List[List[float]]:
+        """Embed ``contents`` through the shared content store, computing each distinct text once."""
+        engine = self.engine
+        if self.embedding_config.provider == "tfidf":
+            return engine.compute_embeddings(contents)
+        keys = [content_key(content) for content in contents]
+        model_key = self.model_key()
+        known = lookup_embeddings(self.db, model_key, keys)
+        pending = {key: content for key, content in zip(keys, contents) if key not in known}
+        if pending:
+            fresh = dict(zip(pending, engine.compute_embeddings(list(pending.values()))))
+            save_embeddings(self.db, model_key, fresh, self.embedding_config.storage_dtype)
+            known.update(fresh)
+        return [known[key] for key in keys]
+
     def compute_entry_embedding(self, entry: models.WorldbookEntry, use_cache: bool = True) -> List[float]:
-        cached = self._get_embedding_cache(entry) if use_cache else None
-        content = f"{entry.title} {entry.content}"
-        if cached and self._embedding_query(entry).first().content_hash == text_hash(content):
-            return cached[0]
-        embedding = self.engine.compute_single(content)
-        self._save_embedding_cache(entry, embedding, text_hash(content))
-        return embedding
+        return self.compute_entry_embeddings([entry], use_cache=use_cache)[entry.entry_id]
 
     def compute_missing_embeddings(self, limit: int = 100) -> int:
-        entries = [entry for entry in self._filtered_entries() if self._embedding_query(entry).first() is None][:limit]
-        for entry in entries:
-            self.compute_entry_embedding(entry, use_cache=False)
-        return len(entries)
+        entries = self._filtered_entries()
+        rows = self._embedding_rows(entries)
+        missing = [entry for entry in entries if (entry.entry_id, entry.user_id, entry.worldbook_id) not in rows][:limit]
+        self.compute_entry_embeddings(missing, use_cache=False)
+        return len(missing)
 
     def compute_batch_embeddings(self, texts: List[str], max_dim: int = 500) -> List[List[float]]:
         if self.embedding_config.provider == "tfidf":
@@ -87,29 +163,75 @@ class RAGRetriever:
             tfidf = TFIDFVectorizer(max_features=max_dim)
             normalized_texts = [text.lower().strip() for text in texts]
             return tfidf.fit_transform(normalized_texts)
-        return [self.engine.compute_single(text) for text in texts]
+        return self.engine.compute_embeddings(texts)
 
     def semantic_search(self, query: str, top_k: int = 5, min_similarity: float = 0.0, category_filter: Optional[str] = None) -> List[Tuple[models.WorldbookEntry, float]]:
         candidates = self._filtered_entries(category_filter=category_filter)
+        RETRIEVAL_CANDIDATES.observe(len(candidates))
         if not candidates:
             return []
+        if self.embedding_config.provider == "tfidf" and self.worldbook_id and (tfidf_index := load_tfidf_index(self.db, self.worldbook_id)) is not None:
+            by_id = {entry.entry_id: entry for entry in candidates}
+            return [(by_id[entry_id], score) for entry_id, score in tfidf_index.search(query, top_k, allowed=set(by_id), min_similarity=min_similarity)]
         if self.embedding_config.provider == "tfidf":
-            contents = [f"{entry.title} {entry.content}" for entry in candidates]
+            contents = [entry_text(entry) for entry in candidates]
             vectors = self.engine.compute_embeddings(contents + [query])
             query_vec, candidate_vecs = vectors[-1], vectors[:-1]
         else:
             query_vec = self.engine.compute_single(query)
+            index = self._vector_index(candidates)
+            if index is not None:
+                by_id = {entry.entry_id: entry for entry in candidates}
+                options = {"nprobe": self.ann_nprobe} if isinstance(index, IvfIndex) else {}
+                return [(by_id[entry_id], score) for entry_id, score in index.search(query_vec, top_k, allowed=set(by_id), min_similarity=min_similarity, **options)]
             candidate_vecs, candidates = self._semantic_candidate_vectors(candidates)
-        similarities = top_k_similar(query_vec, candidate_vecs, top_k=len(candidate_vecs))
+        similarities = top_k_similar(query_vec, candidate_vecs, top_k=top_k)
         return [(candidates[idx], score) for idx, score in similarities if score >= min_similarity][:top_k]
 
+    def lexical_search(self, query: str, top_k: int = 5, category_filter: Optional[str] = None) -> Optional[List[Tuple[models.WorldbookEntry, float]]]:
+        """BM25 matches under the same scope as ``semantic_search``; ``None`` when the database has no full-text index."""
+        return search_lexical(self.db, query, top_k, user_id=self.user_id, worldbook_id=self.worldbook_id, category=category_filter, enabled_only=True, disabled_categories=self.disabled_categories)
+
+    def load_scored(self, ranked: List[Tuple[int, str, float]]) -> Optional[List[Tuple[models.WorldbookEntry, float]]]:
+        """Reload cached (pk, entry_id, score) rankings with one query; rows that left the scope are dropped.
+
+        Returns None when a primary key now belongs to a different entry, so the caller re-ranks.
+        """
+        if not ranked:
+            return []
+        by_pk = {entry.id: entry for entry in self._enabled_query().filter(models.WorldbookEntry.id.in_([pk for pk, _, _ in ranked])).all()}
+        if any(pk in by_pk and by_pk[pk].entry_id != entry_id for pk, entry_id, _ in ranked):
+            return None
+        return [(by_pk[pk], score) for pk, _, score in ranked if pk in by_pk]
+
     def _semantic_candidate_vectors(self, candidates: List[models.WorldbookEntry]) -> Tuple[List[List[float]], List[models.WorldbookEntry]]:
-        vectors: List[List[float]] = []
-        filtered: List[models.WorldbookEntry] = []
-        for candidate in candidates:
-            try:
-                vectors.append(self.compute_entry_embedding(candidate, use_cache=True))
-                filtered.append(candidate)
-            except EmbeddingError:
-                continue
-        return vectors, filtered
+        computed = self.compute_entry_embeddings(candidates, use_cache=True, strict=False)
+        filtered = [candidate for candidate in candidates if candidate.entry_id in computed]
+        return [computed[candidate.entry_id] for candidate in filtered], filtered
+
+    def model_key(self) -> str:
+        return f"{self.embedding_config.provider}:{self.embedding_config.model or ''}"
+
+    def _vector_index_key(self) -> IndexKey:
+        model_key = self.model_key() if self.index_backend == "exact" else f"{self.model_key()}#{self.index_backend}"
+        return self.user_id, self.worldbook_id, model_key
+
+    def _vector_index(self, candidates: List[models.WorldbookEntry]) -> Optional[VectorIndex]:
+        if not vector_index_available():
+            return None
+        key = self._vector_index_key()
+        stamp = self.entries_stamp()
+        index = get_vector_index(key, stamp)
+        missing_ids = set(index.missing([entry.entry_id for entry in candidates])) if index is not None else {entry.entry_id for entry in candidates}
+        if not missing_ids:
+            return index
+        vectors, filtered = self._semantic_candidate_vectors([entry for entry in candidates if entry.entry_id in missing_ids])
+        if not vectors:
+            return index
+        try:
+            index = index or new_vector_index(self.index_backend, len(vectors[0]), key, nprobe=self.ann_nprobe)
+            index.add([entry.entry_id for entry in filtered], vectors)
+        except ValueError:
+            return None
+        store_vector_index(key, index, stamp)
+        return index
@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import json
+import threading
+import zlib
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ....db import models
+from .embeddings_tfidf import tokenize
+from .embeddings_similarity import np, top_k_indices
+from .vector_index import vector_index_available
+
+
+class SparseTfidfIndex:
+    """TF-IDF document vectors in CSR form (rows = entries, columns = vocabulary terms).
+
+    Rows hold max-normalized term frequencies; IDF weights and row norms are derived from
+    the document frequencies on demand, so entries can be added or removed without a refit.
+    """
+
+    def __init__(self) -> None:
+        self.vocabulary: Dict[str, int] = {}
+        self.doc_freq = np.zeros(0, dtype=np.int64)
+        self.entry_ids: List[str] = []
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int64)
+        self.data = np.zeros(0, dtype=np.float32)
+        self._weights = None
+        self._rows: Optional[Dict[str, int]] = None
+
+    def __len__(self) -> int:
+        return len(self.entry_ids)
+
+    def _term_frequencies(self, text: str, grow: bool) -> Tuple[List[int], List[float]]:
+        counts = Counter(tokenize(text))
+        if grow:
+            for token in counts:
+                self.vocabulary.setdefault(token, len(self.vocabulary))
+        counts = {self.vocabulary[token]: count for token, count in counts.items() if token in self.vocabulary}
+        max_tf = max(counts.values()) if counts else 1
+        columns = sorted(counts)
+        return columns, [counts[column] / max_tf for column in columns]
+
+    def remove(self, entry_ids: Iterable[str]) -> int:
+        removed = set(entry_ids)
+        keep_rows = [row for row, entry_id in enumerate(self.entry_ids) if entry_id not in removed]
+        if len(keep_rows) == len(self.entry_ids):
+            return 0
+        lengths = np.diff(self.indptr)
+        keep_mask = np.repeat(np.isin(np.arange(len(self.entry_ids)), keep_rows), lengths)
+        dropped = np.bincount(self.indices[~keep_mask], minlength=len(self.doc_freq))
+        self.doc_freq = self.doc_freq - dropped
+        self.indices = self.indices[keep_mask]
+        self.data = self.data[keep_mask]
+        self.indptr = np.concatenate([[0], np.cumsum(lengths[keep_rows])]).astype(np.int64)
+        removed_count = len(self.entry_ids) - len(keep_rows)
+        self.entry_ids = [self.entry_ids[row] for row in keep_rows]
+        self._weights = None
+        self._rows = None
+        return removed_count
+
+    def upsert(self, documents: Sequence[Tuple[str, str]]) -> None:
+        self.remove(entry_id for entry_id, _ in documents)
+        new_indices: List[int] = []
+        new_data: List[float] = []
+        lengths: List[int] = []
+        for entry_id, text in documents:
+            columns, values = self._term_frequencies(text, grow=True)
+            self.entry_ids.append(entry_id)
+            new_indices.extend(columns)
+            new_data.extend(values)
+            lengths.append(len(columns))
+        added_indices = np.asarray(new_indices, dtype=np.int64)
+        self.doc_freq = np.concatenate([self.doc_freq, np.zeros(len(self.vocabulary) - len(self.doc_freq), dtype=np.int64)]) + np.bincount(added_indices, minlength=len(self.vocabulary))
+        self.indices = np.concatenate([self.indices, added_indices])
+        self.data = np.concatenate([self.data, np.asarray(new_data, dtype=np.float32)])
+        self.indptr = np.concatenate([self.indptr, self.indptr[-1] + np.cumsum(np.asarray(lengths, dtype=np.int64))])
+        self._weights = None
+        self._rows = None
+
+    def _row_map(self) -> Dict[str, int]:
+        if self._rows is None:
+            self._rows = {entry_id: row for row, entry_id in enumerate(self.entry_ids)}
+        return self._rows
+
+    def _idf(self):
+        return np.log((len(self.entry_ids) + 1) / (self.doc_freq + 1)) + 1
+
+    def _row_weights(self):
+        if self._weights is None:
+            idf = self._idf()
+            weighted = self.data * idf[self.indices]
+            rows = np.repeat(np.arange(len(self.entry_ids)), np.diff(self.indptr))
+            norms = np.sqrt(np.bincount(rows, weights=weighted * weighted, minlength=len(self.entry_ids)))
+            self._weights = (idf, weighted, rows, norms)
+        return self._weights
+
+    def search(self, query: str, top_k: int, allowed: Optional[Set[str]] = None, min_similarity: float = 0.0) -> List[Tuple[str, float]]:
+        if not self.entry_ids or top_k <= 0:
+            return []
+        idf, weighted, rows, norms = self._row_weights()
+        columns, values = self._term_frequencies(query, grow=False)
+        query_vec = np.zeros(len(self.vocabulary), dtype=np.float64)
+        query_vec[columns] = np.asarray(values, dtype=np.float64) * idf[columns]
+        query_norm = float(np.linalg.norm(query_vec))
+        dots = np.bincount(rows, weights=weighted * query_vec[self.indices], minlength=len(self.entry_ids))
+        denominator = norms * query_norm
+        scores = np.divide(dots, denominator, out=np.zeros_like(dots), where=denominator > 0)
+        row_map = self._row_map()
+        positions = np.fromiter((row_map[entry_id] for entry_id in allowed if entry_id in row_map), dtype=np.int64) if allowed is not None else np.arange(len(self.entry_ids))
+        if positions.size == 0:
+            return []
+        scoped = scores[positions]
+        return [(self.entry_ids[positions[idx]], float(scoped[idx])) for idx in top_k_indices(scoped, top_k) if scoped[idx] >= min_similarity]
+
+    def to_payload(self) -> bytes:
+        vocabulary = sorted(self.vocabulary, key=self.vocabulary.get)
+        document = {"vocabulary": vocabulary, "doc_freq": self.doc_freq.tolist(), "entry_ids": self.entry_ids, "indptr": self.indptr.tolist(), "indices": self.indices.tolist(), "data": self.data.tolist()}
+        return zlib.compress(json.dumps(document, ensure_ascii=False).encode("utf-8"))
+
+    @classmethod
+    def from_payload(cls, payload: bytes) -> "SparseTfidfIndex":
+        document = json.loads(zlib.decompress(payload).decode("utf-8"))
+        index = cls()
+        index.vocabulary = {token: idx for idx, token in enumerate(document["vocabulary"])}
+        index.doc_freq = np.asarray(document["doc_freq"], dtype=np.int64)
+        index.entry_ids = list(document["entry_ids"])
+        index.indptr = np.asarray(document["indptr"], dtype=np.int64)
+        index.indices = np.asarray(document["indices"], dtype=np.int64)
+        index.data = np.asarray(document["data"], dtype=np.float32)
+        return index
+
+
+def entry_document(entry: models.WorldbookEntry) -> Tuple[str, str]:
+    return entry.entry_id, f"{entry.title} {entry.content}"
+
+
+# Keyed by (version, updated_at): a dropped and rebuilt index restarts at version 1.
+Stamp = Tuple[int, Optional[datetime]]
+_cache: Dict[str, Tuple[Stamp, SparseTfidfIndex]] = {}
+_cache_lock = threading.Lock()
+
+
+def _index_stamp(db: Session, worldbook_id: str) -> Optional[Stamp]:
+    row = db.query(models.WorldbookTfidfIndex.version, models.WorldbookTfidfIndex.updated_at).filter(models.WorldbookTfidfIndex.worldbook_id == worldbook_id).first()
+    return (row.version, row.updated_at) if row is not None else None
+
+
+def _index_payload(db: Session, worldbook_id: str) -> Optional[Tuple[Stamp, bytes]]:
+    row = db.query(models.WorldbookTfidfIndex.version, models.WorldbookTfidfIndex.updated_at, models.WorldbookTfidfIndex.payload).filter(models.WorldbookTfidfIndex.worldbook_id == worldbook_id).first()
+    return ((row.version, row.updated_at), row.payload) if row is not None else None
+
+
+def _cache_index(worldbook_id: str, stamp: Stamp, index: SparseTfidfIndex) -> None:
+    with _cache_lock:
+        _cache[worldbook_id] = (stamp, index)
+
+
+def _insert_index(db: Session, worldbook_id: str, index: SparseTfidfIndex) -> bool:
+    """Persist a freshly built index; False when another worker inserted one first."""
+    updated_at = datetime.utcnow()
+    db.add(models.WorldbookTfidfIndex(worldbook_id=worldbook_id, version=1, doc_count=len(index), payload=index.to_payload(), updated_at=updated_at))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return False
+    _cache_index(worldbook_id, (1, updated_at), index)
+    return True
+
+
+def _replace_index(db: Session, worldbook_id: str, index: SparseTfidfIndex, version: int) -> bool:
+    """Compare-and-swap on ``version``. On conflict another writer saved a different change on top of the
+    same version, so the index is dropped and the next search rebuilds it from the entries."""
+    updated_at = datetime.utcnow()
+    updated = (
+        db.query(models.WorldbookTfidfIndex)
+        .filter(models.WorldbookTfidfIndex.worldbook_id == worldbook_id, models.WorldbookTfidfIndex.version == version)
+        .update({"version": version + 1, "doc_count": len(index), "payload": index.to_payload(), "updated_at": updated_at}, synchronize_session=False)
+    )
+    if not updated:
+        db.query(models.WorldbookTfidfIndex).filter(models.WorldbookTfidfIndex.worldbook_id == worldbook_id).delete(synchronize_session=False)
+    db.commit()
+    with _cache_lock:
+        _cache.pop(worldbook_id, None)
+    if updated:
+        _cache_index(worldbook_id, (version + 1, updated_at), index)
+    return bool(updated)
+
+
+def load_tfidf_index(db: Session, worldbook_id: str) -> Optional[SparseTfidfIndex]:
+    """Return the persisted index for a worldbook, building and saving it on first use.
+
+    While the in-process copy is current only the version stamp is read; the payload is fetched on a miss."""
+    if not vector_index_available():
+        return None
+    stamp = _index_stamp(db, worldbook_id)
+    with _cache_lock:
+        cached = _cache.get(worldbook_id)
+    if stamp is not None and cached is not None and cached[0] == stamp:
+        return cached[1]
+    stored = _index_payload(db, worldbook_id) if stamp is not None else None
+    if stored is not None:
+        index = SparseTfidfIndex.from_payload(stored[1])
+        _cache_index(worldbook_id, stored[0], index)
+        return index
+    index = SparseTfidfIndex()
+    index.upsert([entry_document(entry) for entry in db.query(models.WorldbookEntry).filter(models.WorldbookEntry.worldbook_id == worldbook_id).all()])
+    # Losing the insert race is fine: the other worker built the same index from the same entries.
+    _insert_index(db, worldbook_id, index)
+    return index
+
+
+def _group_by_worldbook(items: Iterable[Tuple[Optional[str], object]]) -> Dict[str, List[object]]:
+    grouped: Dict[str, List[object]] = {}
+    for worldbook_id, item in items:
+        if worldbook_id:
+            grouped.setdefault(worldbook_id, []).append(item)
+    return grouped
+
+
+def update_tfidf_indexes(db: Session, upserted: Sequence[models.WorldbookEntry] = (), removed: Sequence[Tuple[Optional[str], str]] = ()) -> None:
+    """Apply entry changes to already-persisted indexes; worldbooks without an index stay lazy."""
+    if not vector_index_available():
+        return
+    documents = _group_by_worldbook((entry.worldbook_id, entry_document(entry)) for entry in upserted)
+    removals = _group_by_worldbook(removed)
+    for worldbook_id in set(documents) | set(removals):
+        stored = _index_payload(db, worldbook_id)
+        if stored is None:
+            continue
+        index = SparseTfidfIndex.from_payload(stored[1])
+        index.remove(removals.get(worldbook_id, []))
+        index.upsert(documents.get(worldbook_id, []))
+        _replace_index(db, worldbook_id, index, stored[0][0])
+
+
+def drop_tfidf_index(db: Session, worldbook_id: Optional[str] = None) -> int:
+    query = db.query(models.WorldbookTfidfIndex)
+    if worldbook_id:
+        query = query.filter(models.WorldbookTfidfIndex.worldbook_id == worldbook_id)
+    deleted = query.delete(synchronize_session=False)
+    db.commit()
+    with _cache_lock:
+        for key in [key for key in _cache if worldbook_id is None or key == worldbook_id]:
+            del _cache[key]
+    return deleted
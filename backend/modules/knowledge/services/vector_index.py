@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from .embeddings_similarity import normalize_rows, np, top_k_indices
+
+IndexKey = Tuple[Optional[str], Optional[str], str]
+# (entry count, latest updated_at) of the index's scope, read from the database so every worker sees changes.
+Stamp = Tuple[int, Any]
+
+MAX_CACHED_INDEXES = 32
+
+
+class VectorIndex:
+    """Dense float32 matrix of L2-normalized entry vectors with an entry_id -> row map."""
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        self.entry_ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.matrix = np.zeros((0, dimension), dtype=np.float32)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entry_ids)
+
+    def missing(self, entry_ids: Sequence[str]) -> List[str]:
+        return [entry_id for entry_id in entry_ids if entry_id not in self.rows]
+
+    def add(self, entry_ids: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        if not entry_ids:
+            return
+        block = normalize_rows(np.asarray(vectors, dtype=np.float32).reshape(len(entry_ids), -1))
+        if block.shape[1] != self.dimension:
+            raise ValueError("向量维度不匹配")
+        with self._lock:
+            appended_ids: List[str] = []
+            appended_rows = []
+            for entry_id, row in zip(entry_ids, block):
+                if entry_id in self.rows:
+                    self.matrix[self.rows[entry_id]] = row
+                    continue
+                self.rows[entry_id] = len(self.entry_ids) + len(appended_ids)
+                appended_ids.append(entry_id)
+                appended_rows.append(row)
+            if appended_rows:
+                self.matrix = np.ascontiguousarray(np.vstack([self.matrix, np.stack(appended_rows)]))
+                self.entry_ids = self.entry_ids + appended_ids
+
+    def search(self, query_vec: Sequence[float], top_k: int, allowed: Optional[Set[str]] = None, min_similarity: float = 0.0) -> List[Tuple[str, float]]:
+        with self._lock:
+            matrix, entry_ids, rows = self.matrix, self.entry_ids, self.rows
+        if not entry_ids or top_k <= 0:
+            return []
+        query = np.asarray(query_vec, dtype=np.float32).reshape(-1)
+        if query.shape[0] != self.dimension:
+            raise ValueError("向量维度不匹配")
+        norm = float(np.linalg.norm(query))
+        scores = matrix @ (query / norm) if norm > 0 else np.zeros(len(entry_ids), dtype=np.float32)
+        positions = np.fromiter((rows[entry_id] for entry_id in allowed if entry_id in rows), dtype=np.int64) if allowed is not None else np.arange(len(entry_ids))
+        if positions.size == 0:
+            return []
+        scoped = scores[positions]
+        return [(entry_ids[positions[idx]], float(scoped[idx])) for idx in top_k_indices(scoped, top_k) if scoped[idx] >= min_similarity]
+
+
+_indexes: "OrderedDict[IndexKey, Tuple[Stamp, VectorIndex]]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def vector_index_available() -> bool:
+    return np is not None
+
+
+def get_vector_index(key: IndexKey, stamp: Stamp) -> Optional[VectorIndex]:
+    """The cached index for ``key`` if it was built at ``stamp``; an index from an older stamp is dropped."""
+    with _indexes_lock:
+        cached = _indexes.get(key)
+        if cached is None:
+            return None
+        if cached[0] != stamp:
+            del _indexes[key]
+            return None
+        _indexes.move_to_end(key)
+        return cached[1]
+
+
+def store_vector_index(key: IndexKey, index: VectorIndex, stamp: Stamp) -> None:
+    with _indexes_lock:
+        _indexes[key] = (stamp, index)
+        _indexes.move_to_end(key)
+        while len(_indexes) > MAX_CACHED_INDEXES:
+            _indexes.popitem(last=False)
+
+
+def invalidate_vector_indexes(worldbook_id: Optional[str] = None) -> int:
+    """Drop cached indexes that may contain entries of ``worldbook_id`` (all indexes when None)."""
+    with _indexes_lock:
+        stale = [key for key in _indexes if worldbook_id is None or key[1] in {None, worldbook_id}]
+        for key in stale:
+            del _indexes[key]
+        return len(stale)
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from time import perf_counter
 from typing import Dict, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException
@@ -12,6 +13,8 @@ from ....core.session_state import SessionStateConflictError
 from ....core.tenant import current_user_id, owner_only
 from ....db import models
 from ....db.base import get_db
+from ...knowledge.services.embeddings_openai import estimate_tokens
+from ...system.services.metrics import LLM_CHARS_PER_SECOND, LLM_TOKENS_PER_SECOND, STREAM_DURATION_SECONDS, STREAM_TTFT_SECONDS
 from .schemas import StoryGenerateRequest, StoryGenerateResponse, StoryMeta
 
 router = APIRouter()
@@ -36,7 +39,10 @@ def generate_story(req: StoryGenerateRequest, db: Session = Depends(get_db), cur
 
 
 @router.post("/story/generate_stream")
-def generate_story_stream(req: StoryGenerateRequest, db: Session = Depends(get_db), current_user: Optional[AuthUser] = Depends(get_current_user_sync)):
+async def generate_story_stream(req: StoryGenerateRequest, db: Session = Depends(get_db), current_user: Optional[AuthUser] = Depends(get_current_user_sync)):
+    """Runs on the event loop: DB work hops to the threadpool in short chunks and the model stream is read
+    with httpx.AsyncClient, so concurrent generations are bounded by sockets rather than threadpool size."""
+    started = perf_counter()
     user_id = current_user_id(current_user)
 
     def sse(event: str, data_obj: Dict) -> str:
@@ -44,10 +50,17 @@ def generate_story_stream(req: StoryGenerateRequest, db: Session = Depends(get_d
 
         return f"event: {event}\ndata: {json.dumps(data_obj, ensure_ascii=False)}\n\n"
 
-    def stream():
+    def observe_output(first_delta_at: float, text: str) -> None:
+        elapsed = perf_counter() - first_delta_at
+        if elapsed > 0 and text:
+            LLM_CHARS_PER_SECOND.observe(len(text) / elapsed)
+            LLM_TOKENS_PER_SECOND.observe(estimate_tokens(text) / elapsed)
+
+    async def stream():
         story_buf: List[str] = []
+        first_delta_at: Optional[float] = None
         try:
-            full_text, meta_obj, stream_gen, dev_log_info, agent_state = orchestrator.generate_story_text(db=db, session_id=req.session_id, user_input=req.user_input, force_stream=True, user_id=user_id, reasoning_strength=req.reasoning_strength)
+            full_text, meta_obj, stream_gen, dev_log_info, agent_state = await orchestrator.generate_story_text_async(db=db, session_id=req.session_id, user_input=req.user_input, force_stream=True, user_id=user_id, reasoning_strength=req.reasoning_strength)
             meta_dict = meta_obj.__dict__ if hasattr(meta_obj, "__dict__") else dict(meta_obj)
             meta_dict.setdefault("duration_ms", 0)
             if dev_log_info:
@@ -56,21 +69,29 @@ def generate_story_stream(req: StoryGenerateRequest, db: Session = Depends(get_d
             if stream_gen is None:
                 story_buf.append(full_text)
                 if full_text:
+                    STREAM_TTFT_SECONDS.observe(perf_counter() - started)
                     yield sse("delta", {"text": full_text})
             else:
-                for delta in stream_gen:
+                async for delta in stream_gen:
+                    if first_delta_at is None:
+                        first_delta_at = perf_counter()
+                        STREAM_TTFT_SECONDS.observe(first_delta_at - started)
                     story_buf.append(delta)
                     yield sse("delta", {"text": delta})
             final_text = "".join(story_buf)
+            if first_delta_at is not None:
+                observe_output(first_delta_at, final_text)
             if not orchestrator.is_valid_story_content(final_text):
                 yield sse("empty", {"message": "AI returned empty content"})
                 return
-            finalize_info = orchestrator.finalize_agent_turn(db, req.session_id, req.user_input, final_text, meta_obj, agent_state, user_id=user_id, frontend_duration=req.frontend_duration or 0.0)
+            finalize_info = await orchestrator.finalize_agent_turn_async(db, req.session_id, req.user_input, final_text, meta_obj, agent_state, user_id=user_id, frontend_duration=req.frontend_duration or 0.0)
             yield sse("dev_log", finalize_info["dev_log_info"])
             yield sse("done", {})
         except SessionStateConflictError:
             yield sse("error", {"message": "session belongs to another user scope"})
         except Exception as exc:
             yield sse("error", {"message": str(exc)})
+        finally:
+            STREAM_DURATION_SECONDS.observe(perf_counter() - started)
 
     return StreamingResponse(stream(), media_type="text/event-stream")
@@ -5,7 +5,8 @@ from typing import Any, Dict, Generator, Optional, Tuple
 
 from sqlalchemy.orm import Session
 
-from ....modules.agent.services import prepare_agent_turn
+from ....modules.agent.services import prepare_agent_turn, prepare_agent_turn_async
+from ....modules.agent.services.types import TextStream
 from .types import GenerateMeta
 
 
@@ -14,3 +15,10 @@ def generate_story_text(db: Session, session_id: str, user_input: str, force_str
     turn = prepare_agent_turn(db=db, session_id=session_id, user_input=user_input, force_stream=force_stream, user_id=user_id, reasoning_strength=reasoning_strength)
     turn.meta.duration_ms = turn.meta.duration_ms or int((perf_counter() - started) * 1000)
     return turn.text, turn.meta, turn.stream_gen, turn.dev_log_info, turn.agent_state
+
+
+async def generate_story_text_async(db: Session, session_id: str, user_input: str, force_stream: Optional[bool] = None, user_id: Optional[str] = None, reasoning_strength: Optional[str] = None) -> Tuple[str, GenerateMeta, Optional[TextStream], Dict[str, Any], Dict[str, Any]]:
+    started = perf_counter()
+    turn = await prepare_agent_turn_async(db=db, session_id=session_id, user_input=user_input, force_stream=force_stream, user_id=user_id, reasoning_strength=reasoning_strength)
+    turn.meta.duration_ms = turn.meta.duration_ms or int((perf_counter() - started) * 1000)
+    return turn.text, turn.meta, turn.stream_gen, turn.dev_log_info, turn.agent_state
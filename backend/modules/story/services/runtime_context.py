@@ -4,6 +4,7 @@ import json
 import re
 from typing import Any, Dict, List, Optional, Tuple
 
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
 
 from ....core.session_state import ensure_session_state
@@ -37,12 +38,20 @@ def load_worldbook_runtime_state(db: Session, user_id: Optional[str]) -> Tuple[O
 
 
 def entry_enabled_for_story(entry: models.WorldbookEntry, category_switches: Optional[Dict[str, bool]] = None) -> bool:
-    meta = safe_json_loads(entry.meta_json, {})
-    category_key = f"{entry.worldbook_id}::{(entry.category or '').strip()}"
-    enabled = meta.get("enabled", True) is not False and not bool(meta.get("disable") or meta.get("disabled"))
+    enabled = entry.is_enabled is not False
+    category_key = f"{entry.worldbook_id}::{entry.category_key or ''}"
     return enabled and category_switches.get(category_key, True) is not False if category_switches else enabled
 
 
+def filter_enabled_for_story(query, category_switches: Optional[Dict[str, bool]] = None):
+    """SQL form of ``entry_enabled_for_story`` for a ``WorldbookEntry`` query."""
+    query = query.filter(models.WorldbookEntry.is_enabled == True)
+    disabled = [key.split("::", 1) for key, enabled in (category_switches or {}).items() if enabled is False and "::" in key]
+    if not disabled:
+        return query
+    return query.filter(~or_(*[and_(models.WorldbookEntry.worldbook_id == worldbook_id, models.WorldbookEntry.category_key == category_key) for worldbook_id, category_key in disabled]))
+
+
 def get_or_create_session_state(db: Session, session_id: str, user_id: Optional[str] = None) -> models.SessionState:
     return ensure_session_state(db, session_id, user_id=user_id)
 
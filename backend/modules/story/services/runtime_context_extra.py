@@ -7,32 +7,25 @@ from sqlalchemy.orm import Session
 from ....core.tenant import owner_only, owner_or_public
 from ....db import models
 from .content_parser import extract_story_parts
-from .runtime_context import entry_enabled_for_story, get_or_create_session_state, load_worldbook_runtime_state, pick_main_character
+from .runtime_context import entry_enabled_for_story, filter_enabled_for_story, get_or_create_session_state, load_worldbook_runtime_state, pick_main_character
 
 
 def worldbook_snippets(db: Session, user_id: Optional[str], context_text: Optional[str] = None, limit: int = 8, active_worldbook_id: Optional[str] = None, category_switches: Optional[Dict[str, bool]] = None) -> List[Dict[str, Any]]:
     if context_text:
         try:
-            from ....modules.knowledge.services.retrieval_queries import create_retriever, retrieve_for_story
+            from ....modules.knowledge.services.retrieval_queries import create_retriever, retrieve_story_entries, story_result
 
             disabled = {key.split("::", 1)[1] for key, enabled in (category_switches or {}).items() if active_worldbook_id and key.startswith(f"{active_worldbook_id}::") and enabled is False and "::" in key}
-            results = retrieve_for_story(create_retriever(db, user_id=user_id, worldbook_id=active_worldbook_id, disabled_categories=disabled), context_text, top_k=limit)
-            filtered = []
-            for result in results:
-                query = db.query(models.WorldbookEntry).filter(models.WorldbookEntry.entry_id == result.get("entry_id"))
-                if active_worldbook_id:
-                    query = query.filter(models.WorldbookEntry.worldbook_id == active_worldbook_id)
-                entry = owner_or_public(query, models.WorldbookEntry, user_id).first()
-                if entry and entry_enabled_for_story(entry, category_switches):
-                    filtered.append(result)
+            scored = retrieve_story_entries(create_retriever(db, user_id=user_id, worldbook_id=active_worldbook_id, disabled_categories=disabled), context_text, top_k=limit)
+            filtered = [story_result(entry, score) for entry, score in scored if entry_enabled_for_story(entry, category_switches)]
             if filtered:
                 return filtered
         except Exception:
             pass
-    rows = owner_or_public(db.query(models.WorldbookEntry), models.WorldbookEntry, user_id)
+    rows = filter_enabled_for_story(owner_or_public(db.query(models.WorldbookEntry), models.WorldbookEntry, user_id), category_switches)
     rows = rows.filter(models.WorldbookEntry.worldbook_id == active_worldbook_id) if active_worldbook_id else rows
-    rows = rows.order_by(models.WorldbookEntry.importance.desc(), models.WorldbookEntry.updated_at.desc()).limit(limit * 3).all()
-    return [{"worldbook_id": row.worldbook_id, "entry_id": row.entry_id, "title": row.title, "category": row.category, "content": (row.content or "")[:800]} for row in rows if entry_enabled_for_story(row, category_switches)][:limit]
+    rows = rows.order_by(models.WorldbookEntry.importance.desc(), models.WorldbookEntry.updated_at.desc()).limit(limit).all()
+    return [{"worldbook_id": row.worldbook_id, "entry_id": row.entry_id, "title": row.title, "category": row.category, "content": (row.content or "")[:800]} for row in rows]
 
 
 def dungeon_context(db: Session, state: models.SessionState, user_id: Optional[str]) -> Tuple[Optional[models.Dungeon], Optional[models.DungeonNode]]:
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from ..services.metrics import metrics
+
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _cache_families():
+    from ...knowledge.services.retrieval_cache import cache_stats
+
+    stats = cache_stats()
+    hits = [({"cache": name}, item["hits"]) for name, item in stats.items()]
+    misses = [({"cache": name}, item["misses"]) for name, item in stats.items()]
+    ratios = [({"cache": name}, item["hits"] / (item["hits"] + item["misses"]) if item["hits"] + item["misses"] else 0.0) for name, item in stats.items()]
+    yield "storyteller_cache_hits_total", "counter", "Retrieval cache hits.", hits
+    yield "storyteller_cache_misses_total", "counter", "Retrieval cache misses.", misses
+    yield "storyteller_cache_hit_ratio", "gauge", "Retrieval cache hits / lookups since start.", ratios
+
+
+def _model_families():
+    from ...knowledge.services.model_registry import model_load_seconds
+
+    yield "storyteller_embedding_model_load_seconds", "gauge", "Time taken to load each in-memory embedding model.", [({"model": name}, seconds) for name, seconds in model_load_seconds().items()]
+
+
+def _skill_families():
+    from ...agent.services.profiling import skill_metrics
+
+    snapshot = skill_metrics.snapshot()
+    for key, name, help_text, scale in (
+        ("count", "runs_total", "Agent skill executions.", 1),
+        ("wall_ms", "seconds_total", "Agent skill wall time.", 1000),
+        ("cpu_ms", "cpu_seconds_total", "Agent skill CPU time.", 1000),
+        ("statements", "statements_total", "SQL statements issued by agent skills.", 1),
+    ):
+        yield f"storyteller_agent_skill_{name}", "counter", help_text, [({"skill": skill}, totals[key] / scale) for skill, totals in snapshot.items()]
+
+
+for _collector in (_cache_families, _model_families, _skill_families):
+    metrics.register_collector(_collector)
+
+
+@router.get("/metrics", include_in_schema=False)
+def get_metrics() -> PlainTextResponse:
+    return PlainTextResponse(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
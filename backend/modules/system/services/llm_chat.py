@@ -1,46 +1,88 @@
 from __future__ import annotations
 
 import json
-from typing import Any, Dict, Generator, List, Optional, Tuple
+from typing import Any, AsyncGenerator, Dict, Generator, List, Optional, Tuple
 
 import httpx
 
+from .llm_clients import llm_async_client, llm_client
 from .llm_http import normalize_base_url
 from .llm_models import LLMError
 
 
-def chat_completion(base_url: str, api_key: str, model: str, messages: List[Dict[str, Any]], temperature: float = 0.8, stream: bool = False, timeout_s: float = 60.0) -> Tuple[str, Optional[Generator[str, None, None]]]:
+_DONE = object()
+
+
+def _chat_request(base_url: str, api_key: str, model: str, messages: List[Dict[str, Any]], temperature: float, stream: bool) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
     url = normalize_base_url(base_url) + "/chat/completions"
     headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-    payload: Dict[str, Any] = {"model": model, "messages": messages, "temperature": temperature, "stream": bool(stream)}
+    return url, headers, {"model": model, "messages": messages, "temperature": temperature, "stream": bool(stream)}
+
+
+def _completion_text(response: httpx.Response) -> str:
+    if response.status_code >= 400:
+        raise LLMError(f"生成请求失败: HTTP {response.status_code}: {response.text}")
+    data = response.json()
+    try:
+        return str(data["choices"][0]["message"]["content"])
+    except Exception as exc:
+        raise LLMError(f"解析模型响应失败: {data}") from exc
+
+
+def _stream_delta(line: str) -> Any:
+    """Content of one SSE line, ``_DONE`` at the end marker, or None for keep-alives and unparsable chunks."""
+    if not line:
+        return None
+    chunk = line[len("data:") :].strip() if line.startswith("data:") else line.strip()
+    if chunk == "[DONE]":
+        return _DONE
+    try:
+        content = (json.loads(chunk)["choices"][0].get("delta") or {}).get("content")
+    except Exception:
+        return None
+    return str(content) if content else None
+
+
+def chat_completion(base_url: str, api_key: str, model: str, messages: List[Dict[str, Any]], temperature: float = 0.8, stream: bool = False, timeout_s: float = 60.0) -> Tuple[str, Optional[Generator[str, None, None]]]:
+    url, headers, payload = _chat_request(base_url, api_key, model, messages, temperature, stream)
     if not stream:
-        with httpx.Client(timeout=timeout_s) as client:
-            response = client.post(url, headers=headers, json=payload)
+        response = llm_client(base_url).post(url, headers=headers, json=payload, timeout=timeout_s)
+        return _completion_text(response), None
+    return "", _iter_stream(llm_client(base_url), url, headers, payload, timeout_s)
+
+
+async def chat_completion_async(base_url: str, api_key: str, model: str, messages: List[Dict[str, Any]], temperature: float = 0.8, stream: bool = False, timeout_s: float = 60.0) -> Tuple[str, Optional[AsyncGenerator[str, None]]]:
+    """``chat_completion`` on ``httpx.AsyncClient``: a streaming turn holds a socket, not a threadpool thread."""
+    url, headers, payload = _chat_request(base_url, api_key, model, messages, temperature, stream)
+    if not stream:
+        response = await llm_async_client(base_url).post(url, headers=headers, json=payload, timeout=timeout_s)
+        return _completion_text(response), None
+    return "", _aiter_stream(llm_async_client(base_url), url, headers, payload, timeout_s)
+
+
+def _iter_stream(client: httpx.Client, url: str, headers: Dict[str, str], payload: Dict[str, Any], timeout_s: float) -> Generator[str, None, None]:
+    with client.stream("POST", url, headers=headers, json=payload, timeout=timeout_s) as response:
+        if response.status_code >= 400:
+            raise LLMError(f"流式生成请求失败: HTTP {response.status_code}: {response.read().decode('utf-8', errors='ignore')}")
+        # Read through to the end of the body after [DONE] so the pooled connection can be reused.
+        done = False
+        for line in response.iter_lines():
+            delta = None if done else _stream_delta(line)
+            if delta is _DONE:
+                done = True
+            elif delta:
+                yield delta
+
+
+async def _aiter_stream(client: httpx.AsyncClient, url: str, headers: Dict[str, str], payload: Dict[str, Any], timeout_s: float) -> AsyncGenerator[str, None]:
+    async with client.stream("POST", url, headers=headers, json=payload, timeout=timeout_s) as response:
         if response.status_code >= 400:
-            raise LLMError(f"生成请求失败: HTTP {response.status_code}: {response.text}")
-        data = response.json()
-        try:
-            return str(data["choices"][0]["message"]["content"]), None
-        except Exception as exc:
-            raise LLMError(f"解析模型响应失败: {data}") from exc
-    return "", _iter_stream(url, headers, payload, timeout_s)
-
-
-def _iter_stream(url: str, headers: Dict[str, str], payload: Dict[str, Any], timeout_s: float) -> Generator[str, None, None]:
-    with httpx.Client(timeout=timeout_s) as client:
-        with client.stream("POST", url, headers=headers, json=payload) as response:
-            if response.status_code >= 400:
-                raise LLMError(f"流式生成请求失败: HTTP {response.status_code}: {response.read().decode('utf-8', errors='ignore')}")
-            for line in response.iter_lines():
-                if not line:
-                    continue
-                chunk = line[len("data:") :].strip() if line.startswith("data:") else line.strip()
-                if chunk == "[DONE]":
-                    break
-                try:
-                    obj = json.loads(chunk)
-                    content = (obj["choices"][0].get("delta") or {}).get("content")
-                    if content:
-                        yield str(content)
-                except Exception:
-                    continue
+            raise LLMError(f"流式生成请求失败: HTTP {response.status_code}: {(await response.aread()).decode('utf-8', errors='ignore')}")
+        # Read through to the end of the body after [DONE] so the pooled connection can be reused.
+        done = False
+        async for line in response.aiter_lines():
+            delta = None if done else _stream_delta(line)
+            if delta is _DONE:
+                done = True
+            elif delta:
+                yield delta
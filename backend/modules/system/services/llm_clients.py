@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import threading
+from typing import Dict, Set, Tuple
+
+import httpx
+
+from .llm_http import normalize_base_url
+
+# HTTP/2 multiplexes concurrent turns over one connection; httpx needs the optional h2 package for it.
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+POOL_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=16, keepalive_expiry=90.0)
+DEFAULT_TIMEOUT_S = 60.0
+
+_sync_clients: Dict[str, httpx.Client] = {}
+_async_clients: Dict[str, Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+_closing: Set["asyncio.Task[None]"] = set()
+_lock = threading.Lock()
+
+
+def _client_options() -> Dict[str, object]:
+    return {"http2": HTTP2_AVAILABLE, "limits": POOL_LIMITS, "timeout": DEFAULT_TIMEOUT_S}
+
+
+def llm_client(base_url: str) -> httpx.Client:
+    """Keep-alive client shared by every request to ``base_url``, so a turn's story and character-sync
+    completions reuse one connection instead of each paying a TCP/TLS handshake."""
+    key = normalize_base_url(base_url)
+    with _lock:
+        client = _sync_clients.get(key)
+        if client is None or client.is_closed:
+            client = _sync_clients[key] = httpx.Client(**_client_options())
+        return client
+
+
+def llm_async_client(base_url: str) -> httpx.AsyncClient:
+    """Async counterpart of ``llm_client``; pooled connections belong to one event loop, so a client
+    created under another loop is closed and replaced rather than reused."""
+    key = normalize_base_url(base_url)
+    loop = asyncio.get_running_loop()
+    with _lock:
+        cached = _async_clients.get(key)
+        if cached is None or cached[0] is not loop or cached[1].is_closed:
+            if cached is not None:
+                _discard_async_client(*cached)
+            cached = _async_clients[key] = (loop, httpx.AsyncClient(**_client_options()))
+        return cached[1]
+
+
+async def _aclose_quietly(client: httpx.AsyncClient) -> None:
+    try:
+        await client.aclose()
+    except Exception as exc:
+        print(f"[LLM] failed to close a stale async client: {exc}")
+
+
+def _discard_async_client(owner: asyncio.AbstractEventLoop, client: httpx.AsyncClient) -> None:
+    """Close ``client`` on the loop that owns its connections while that loop still runs; a finished loop
+    cannot run anything, so its client is closed from the current loop instead (best effort)."""
+    if client.is_closed:
+        return
+    if owner.is_running() and owner is not asyncio.get_running_loop():
+        asyncio.run_coroutine_threadsafe(_aclose_quietly(client), owner)
+        return
+    task = asyncio.get_running_loop().create_task(_aclose_quietly(client))
+    _closing.add(task)
+    task.add_done_callback(_closing.discard)
+
+
+async def close_llm_clients() -> None:
+    """Close pooled clients on app shutdown, async ones from other loops included."""
+    with _lock:
+        sync_clients = list(_sync_clients.values())
+        async_clients = list(_async_clients.values())
+        _sync_clients.clear()
+        _async_clients.clear()
+    for client in sync_clients:
+        client.close()
+    loop = asyncio.get_running_loop()
+    for owner, client in async_clients:
+        if owner is loop:
+            await client.aclose()
+        else:
+            _discard_async_client(owner, client)
+    if _closing:
+        await asyncio.gather(*list(_closing))
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import bisect
+import threading
+from time import perf_counter
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+RATE_BUCKETS = (1, 5, 10, 25, 50, 100, 200, 400, 800, 1600)
+COUNT_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 20000)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Iterable[Tuple[str, str]] = ()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus text format; one series per label tuple."""
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float] = LATENCY_BUCKETS, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        self.labels = tuple(labels)
+        self._series: Dict[LabelValues, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        # Layout per series: one counter per bucket, then +Inf, sum and count.
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0.0] * (len(self.buckets) + 3)
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def time(self, *label_values: str) -> "_Timer":
+        return _Timer(self, label_values)
+
+    def snapshot(self) -> Dict[LabelValues, Dict[str, float]]:
+        with self._lock:
+            return {values: {"sum": series[-2], "count": series[-1]} for values, series in self._series.items()}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {values: list(counts) for values, counts in self._series.items()}
+        for values, counts in sorted(series.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, values, [('le', le)])} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, values)} {_format_value(counts[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, values)} {_format_value(counts[-1])}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, label_values: LabelValues):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self) -> "_Timer":
+        self.started = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.histogram.observe(perf_counter() - self.started, *self.label_values)
+
+
+# A collector returns (name, type, help, [(labels, value)]) families computed at scrape time.
+Sample = Tuple[Dict[str, str], float]
+Family = Tuple[str, str, str, List[Sample]]
+Collector = Callable[[], Iterable[Family]]
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._histograms: Dict[str, Histogram] = {}
+        self._collectors: List[Collector] = []
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, help_text: str, buckets: Sequence[float] = LATENCY_BUCKETS, labels: Sequence[str] = ()) -> Histogram:
+        with self._lock:
+            if name not in self._histograms:
+                self._histograms[name] = Histogram(name, help_text, buckets, labels)
+            return self._histograms[name]
+
+    def register_collector(self, collector: Collector) -> None:
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            histograms = list(self._histograms.values())
+            collectors = list(self._collectors)
+        lines: List[str] = []
+        for histogram in histograms:
+            lines.extend(histogram.render())
+        for collector in collectors:
+            try:
+                families = list(collector())
+            except Exception as exc:
+                lines.append(f"# collector {getattr(collector, '__name__', collector)} failed: {type(exc).__name__}")
+                continue
+            for name, kind, help_text, samples in families:
+                lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"])
+                lines.extend(f"{name}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}" for labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+REQUEST_SECONDS = metrics.histogram("storyteller_http_request_duration_seconds", "HTTP request latency by route template.", labels=("method", "route", "status"))
+STREAM_TTFT_SECONDS = metrics.histogram("storyteller_story_stream_ttft_seconds", "Time from request to the first story delta on /story/generate_stream.")
+STREAM_DURATION_SECONDS = metrics.histogram("storyteller_story_stream_duration_seconds", "Total /story/generate_stream duration, finalize included.")
+LLM_CHARS_PER_SECOND = metrics.histogram("storyteller_llm_output_chars_per_second", "Streamed story characters per second after the first delta.", buckets=RATE_BUCKETS)
+LLM_TOKENS_PER_SECOND = metrics.histogram("storyteller_llm_output_tokens_per_second", "Estimated streamed story tokens per second after the first delta.", buckets=RATE_BUCKETS)
+EMBEDDING_SECONDS = metrics.histogram("storyteller_embedding_duration_seconds", "Embedding computation latency by provider.", labels=("provider",))
+RETRIEVAL_CANDIDATES = metrics.histogram("storyteller_retrieval_candidates", "Worldbook entries considered per semantic search.", buckets=COUNT_BUCKETS)
+DB_POOL_WAIT_SECONDS = metrics.histogram("storyteller_db_pool_checkout_wait_seconds", "Time spent waiting for a database connection from the pool.", buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0))
+
+
+_timed_pool_classes: Dict[type, type] = {}
+
+
+def timed_pool_class(pool_class: type) -> type:
+    """A subclass of ``pool_class`` timing its public ``connect()``, i.e. how long ``engine.connect()`` waits for a
+    pooled connection (plus connect time when the pool grows). Pool events fire only after checkout, so they cannot."""
+    timed = _timed_pool_classes.get(pool_class)
+    if timed is None:
+
+        def connect(self):
+            started = perf_counter()
+            try:
+                return pool_class.connect(self)
+            finally:
+                DB_POOL_WAIT_SECONDS.observe(perf_counter() - started)
+
+        timed = _timed_pool_classes[pool_class] = type(f"Timed{pool_class.__name__}", (pool_class,), {"connect": connect})
+    return timed
+
+
+def route_template(scope) -> str:
+    """The matched route's path template; "unmatched" when no route ran.
+
+    Included routers keep their prefix off ``route.path``, so the prefix is the part of the request path before
+    the suffix the route's own pattern matches."""
+    route = scope.get("route")
+    pattern = getattr(route, "path_regex", None)
+    if pattern is None:
+        return "unmatched" if route is None else getattr(route, "path", "unmatched")
+    path = scope["path"]
+    root_path = scope.get("root_path", "")
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    for index, char in enumerate(path):
+        if char == "/" and pattern.match(path[index:]):
+            return path[:index] + route.path
+    return route.path
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware timing every HTTP request through to the last body chunk, so streamed
+    responses count their full duration. Routes are labelled by template to bound cardinality."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = perf_counter()
+        status = [500]
+
+        async def send_with_status(message) -> None:
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUEST_SECONDS.observe(perf_counter() - started, scope["method"], route_template(scope), str(status[0]))
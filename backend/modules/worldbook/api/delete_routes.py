@@ -9,6 +9,10 @@ from ....core.auth import User as AuthUser, get_current_user
 from ....core.tenant import current_user_id, owner_or_public
 from ....db import models
 from ....db.base import get_db
+from ...knowledge.services.lexical_index import update_lexical_index
+from ...knowledge.services.retrieval_cache import invalidate_retrieval_cache
+from ...knowledge.services.tfidf_index import update_tfidf_indexes
+from ...knowledge.services.vector_index import invalidate_vector_indexes
 from .helpers import apply_worldbook_write_filters, normalize_worldbook_id
 
 router = APIRouter()
@@ -24,8 +28,13 @@ def delete_worldbook_category(category: str = Query(...), worldbook_id: Optional
         return {"success": True, "deleted": 0}
     entry_ids = [entry.entry_id for entry in entries]
     apply_worldbook_write_filters(db.query(models.WorldbookEmbedding), models.WorldbookEmbedding, user_id, normalized_worldbook_id).filter(models.WorldbookEmbedding.entry_id.in_(entry_ids)).delete(synchronize_session=False)
+    removed = [(entry.worldbook_id, entry.entry_id) for entry in entries]
+    update_lexical_index(db, removed=[entry.id for entry in entries])
     deleted_count = query.delete(synchronize_session=False)
     db.commit()
+    invalidate_vector_indexes(normalized_worldbook_id)
+    invalidate_retrieval_cache(normalized_worldbook_id)
+    update_tfidf_indexes(db, removed=removed)
     return {"success": True, "deleted": deleted_count, "worldbook_id": normalized_worldbook_id}
 
 
@@ -44,8 +53,13 @@ def delete_all_worldbook_entries(confirm: bool = Query(False), worldbook_id: Opt
     if not entries:
         db.commit()
         return {"success": True, "deleted": 0, "worldbook_id": normalized_worldbook_id}
+    removed = [(entry.worldbook_id, entry.entry_id) for entry in entries]
+    update_lexical_index(db, removed=[entry.id for entry in entries])
     deleted_count = query.delete(synchronize_session=False)
     db.commit()
+    invalidate_vector_indexes(normalized_worldbook_id)
+    invalidate_retrieval_cache(normalized_worldbook_id)
+    update_tfidf_indexes(db, removed=removed)
     return {"success": True, "deleted": deleted_count, "worldbook_id": normalized_worldbook_id}
 
 
@@ -56,6 +70,10 @@ def delete_worldbook_entry(entry_id: str, db: Session = Depends(get_db), current
     if not entry:
         raise HTTPException(status_code=404, detail="worldbook entry not found")
     owner_or_public(db.query(models.WorldbookEmbedding).filter(models.WorldbookEmbedding.entry_id == entry_id), models.WorldbookEmbedding, user_id).delete(synchronize_session=False)
+    update_lexical_index(db, removed=[entry.id])
     db.delete(entry)
     db.commit()
+    invalidate_vector_indexes(entry.worldbook_id)
+    invalidate_retrieval_cache(entry.worldbook_id)
+    update_tfidf_indexes(db, removed=[(entry.worldbook_id, entry_id)])
     return {"success": True, "entry_id": entry_id, "worldbook_id": entry.worldbook_id}
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
+import codecs
 import json
 import re
 import uuid
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
 
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
@@ -12,6 +13,9 @@ from ....core.tenant import owner_only, owner_or_public, resolve_scoped_id
 from ....db import models
 
 WORLDBOOK_ID_PATTERN = re.compile(r"^W[a-z0-9]{7}$")
+STREAM_SEPARATORS = " \t\r\n,[]"
+MAX_STREAM_RECORD_CHARS = 4 * 1024 * 1024
+_STREAM_DECODER = json.JSONDecoder()
 
 
 def query_terms(text: str) -> List[str]:
@@ -93,6 +97,46 @@ def resolve_entry_id(db: Session, preferred_entry_id: str, user_id: Optional[str
     return resolve_scoped_id(db, models.WorldbookEntry, "entry_id", preferred_entry_id, user_id)
 
 
+def resolve_import_targets(db: Session, preferred_ids: Sequence[str], user_id: Optional[str]) -> Dict[str, Tuple[Optional[models.WorldbookEntry], str]]:
+    """Batch form of ``find_writable_entry`` + ``resolve_entry_id``: preferred id -> (writable entry, entry id)."""
+    unique_ids = list(dict.fromkeys(preferred_ids))
+    rows = {row.entry_id: row for row in db.query(models.WorldbookEntry).filter(models.WorldbookEntry.entry_id.in_(unique_ids)).all()} if unique_ids else {}
+    targets: Dict[str, Tuple[Optional[models.WorldbookEntry], str]] = {}
+    scoped: Dict[str, str] = {}
+    for preferred_id in unique_ids:
+        row = rows.get(preferred_id)
+        if row is None:
+            targets[preferred_id] = (None, preferred_id)
+        elif row.user_id is None or row.user_id == user_id:
+            targets[preferred_id] = (row, preferred_id)
+        else:
+            scoped[preferred_id] = f"{preferred_id}__{user_id or 'public'}"
+    if scoped:
+        taken = {entry_id for (entry_id,) in db.query(models.WorldbookEntry.entry_id).filter(models.WorldbookEntry.entry_id.in_(list(scoped.values()))).all()}
+        for preferred_id, candidate in scoped.items():
+            targets[preferred_id] = (None, resolve_entry_id(db, preferred_id, user_id) if candidate in taken else candidate)
+    return targets
+
+
+async def iter_import_records(stream: AsyncIterator[bytes], chunk_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Yield entry dicts in lists of ``chunk_size`` from an NDJSON or JSON-array byte stream."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    batch: List[Dict[str, Any]] = []
+    async for raw in stream:
+        buffer, records = _drain_records(buffer + decoder.decode(raw))
+        batch.extend(records)
+        while len(batch) >= chunk_size:
+            yield batch[:chunk_size]
+            batch = batch[chunk_size:]
+    buffer, records = _drain_records(buffer + decoder.decode(b"", final=True))
+    if buffer.strip(STREAM_SEPARATORS):
+        raise HTTPException(status_code=400, detail="worldbook import stream ends with an incomplete JSON value")
+    batch.extend(records)
+    for start in range(0, len(batch), chunk_size):
+        yield batch[start : start + chunk_size]
+
+
 def _extract_entries_and_id(payload: Any) -> Tuple[Any, Any]:
     if isinstance(payload, dict):
         entries = payload.get("entries")
@@ -124,3 +168,20 @@ def _extract_entries_from_container(container: Any, fallback_category: Optional[
             results.extend(_extract_entries_from_container(value, nested_category))
         return results
     return []
+
+
+def _drain_records(buffer: str) -> Tuple[str, List[Dict[str, Any]]]:
+    records: List[Dict[str, Any]] = []
+    pos = 0
+    while True:
+        while pos < len(buffer) and buffer[pos] in STREAM_SEPARATORS:
+            pos += 1
+        if pos >= len(buffer):
+            return "", records
+        try:
+            value, pos = _STREAM_DECODER.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if len(buffer) - pos > MAX_STREAM_RECORD_CHARS:
+                raise HTTPException(status_code=400, detail="worldbook import stream contains an invalid or oversized JSON value")
+            return buffer[pos:], records
+        records.extend(_extract_entries_from_container(value) if isinstance(value, (dict, list)) else [])
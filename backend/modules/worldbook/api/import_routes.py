@@ -3,53 +3,76 @@ from __future__ import annotations
 import json
 import uuid
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set, Tuple
 
-from fastapi import APIRouter, BackgroundTasks, Body, Depends, Query
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from ....core.auth import User as AuthUser, get_current_user
 from ....core.tenant import current_user_id, owner_only
 from ....db import models
-from ....db.base import SessionLocal, get_db
-from .helpers import extract_meta, extract_tags, find_writable_entry, generate_worldbook_id, parse_entries_payload, resolve_entry_id
+from ....db.base import get_db
+from ...knowledge.services.embedding_jobs import create_embedding_job, run_embedding_job, submit_embedding_job
+from ...knowledge.services.lexical_index import update_lexical_index
+from ...knowledge.services.retrieval_cache import invalidate_retrieval_cache
+from ...knowledge.services.tfidf_index import drop_tfidf_index, update_tfidf_indexes
+from ...knowledge.services.vector_index import invalidate_vector_indexes
+from .helpers import extract_meta, extract_tags, generate_worldbook_id, iter_import_records, normalize_worldbook_id, parse_entries_payload, resolve_import_targets
+from .schemas import WorldbookEmbeddingJobResponse
 
 router = APIRouter()
+IMPORT_CHUNK_SIZE = 500
 
 
 @router.post("/worldbook/import")
-def import_worldbook(payload: Any = Body(...), db: Session = Depends(get_db), background_tasks: BackgroundTasks = None, sync_embeddings: bool = Query(False), current_user: Optional[AuthUser] = Depends(get_current_user)) -> Dict[str, Any]:
+def import_worldbook(payload: Any = Body(...), db: Session = Depends(get_db), sync_embeddings: bool = Query(False), current_user: Optional[AuthUser] = Depends(get_current_user)) -> Dict[str, Any]:
     user_id = current_user_id(current_user)
     entries, requested_worldbook_id = parse_entries_payload(payload)
     worldbook_id = requested_worldbook_id or generate_worldbook_id(db, user_id)
     created = 0
     updated = 0
     entries_to_embed: List[models.WorldbookEntry] = []
-    for raw in entries:
-        if not raw.get("title") or not raw.get("content"):
-            continue
-        preferred_entry_id = raw.get("entry_id") or f"WB_{uuid.uuid4().hex[:10]}"
-        existing = find_writable_entry(db, preferred_entry_id, user_id)
-        entry_id = existing.entry_id if existing else resolve_entry_id(db, preferred_entry_id, user_id)
-        if existing:
-            _update_existing_entry(existing, raw, worldbook_id)
-            entries_to_embed.append(existing)
-            updated += 1
-        else:
-            entry = models.WorldbookEntry(user_id=user_id, worldbook_id=worldbook_id, entry_id=entry_id, category=raw.get("category") or None, tags=extract_tags(raw.get("tags")), title=raw["title"], content=raw["content"], importance=float(raw.get("importance", 0.5)), canonical=bool(raw.get("canonical", False)), meta_json=json.dumps(extract_meta(raw), ensure_ascii=False), created_at=datetime.utcnow(), updated_at=datetime.utcnow())
-            db.add(entry)
-            entries_to_embed.append(entry)
-            created += 1
+    moved_entries: List[Tuple[Optional[str], str]] = []
+    for start in range(0, len(entries), IMPORT_CHUNK_SIZE):
+        chunk_created, chunk_updated, chunk_entries, chunk_moved = _upsert_chunk(db, entries[start : start + IMPORT_CHUNK_SIZE], worldbook_id, user_id)
+        created += chunk_created
+        updated += chunk_updated
+        entries_to_embed.extend(chunk_entries)
+        moved_entries.extend(chunk_moved)
     db.commit()
+    invalidate_vector_indexes(worldbook_id)
+    for touched_worldbook_id in {worldbook_id} | {source for source, _ in moved_entries}:
+        invalidate_retrieval_cache(touched_worldbook_id)
+    update_tfidf_indexes(db, upserted=entries_to_embed, removed=moved_entries)
     entry_ids = [entry.entry_id for entry in entries_to_embed]
-    if entry_ids:
-        if sync_embeddings:
-            _compute_embeddings(entry_ids, user_id)
-        elif background_tasks is not None:
-            background_tasks.add_task(_compute_embeddings, entry_ids, user_id)
-        else:
-            _compute_embeddings(entry_ids, user_id)
-    return {"worldbook_id": worldbook_id, "created_or_updated": created + updated, "created": created, "updated": updated, "embeddings": "queued" if (entry_ids and not sync_embeddings) else "done"}
+    return _import_result(db, worldbook_id, user_id, created, updated, entry_ids, sync_embeddings)
+
+
+@router.post("/worldbook/import/stream")
+async def import_worldbook_stream(request: Request, worldbook_id: Optional[str] = Query(None), sync_embeddings: bool = Query(False), db: Session = Depends(get_db), current_user: Optional[AuthUser] = Depends(get_current_user)) -> Dict[str, Any]:
+    """Import an NDJSON or JSON-array body chunk by chunk; each chunk is resolved, written and committed on its own."""
+    user_id = current_user_id(current_user)
+    target_worldbook_id = normalize_worldbook_id(worldbook_id) or await run_in_threadpool(generate_worldbook_id, db, user_id)
+    created = 0
+    updated = 0
+    entry_ids: List[str] = []
+    touched_worldbooks: Set[str] = set()
+    async for records in iter_import_records(request.stream(), IMPORT_CHUNK_SIZE):
+        chunk_created, chunk_updated, chunk_entry_ids, moved_from = await run_in_threadpool(_commit_chunk, db, records, target_worldbook_id, user_id)
+        created += chunk_created
+        updated += chunk_updated
+        entry_ids.extend(chunk_entry_ids)
+        touched_worldbooks.update(moved_from | ({target_worldbook_id} if chunk_entry_ids else set()))
+    return await run_in_threadpool(_finish_stream_import, db, target_worldbook_id, user_id, created, updated, entry_ids, touched_worldbooks, sync_embeddings)
+
+
+@router.get("/worldbook/embedding_jobs/{job_id}", response_model=WorldbookEmbeddingJobResponse)
+def get_embedding_job(job_id: str, db: Session = Depends(get_db), current_user: Optional[AuthUser] = Depends(get_current_user)) -> WorldbookEmbeddingJobResponse:
+    job = owner_only(db.query(models.WorldbookEmbeddingJob).filter(models.WorldbookEmbeddingJob.job_id == job_id), models.WorldbookEmbeddingJob, current_user_id(current_user)).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="embedding job not found")
+    return WorldbookEmbeddingJobResponse(job_id=job.job_id, worldbook_id=job.worldbook_id, status=job.status, total=job.total, done=job.done, failed=job.failed, error=job.error, created_at=job.created_at, updated_at=job.updated_at, finished_at=job.finished_at)
 
 
 def _update_existing_entry(existing: models.WorldbookEntry, raw: Dict[str, Any], worldbook_id: str) -> None:
@@ -64,18 +87,57 @@ def _update_existing_entry(existing: models.WorldbookEntry, raw: Dict[str, Any],
     existing.updated_at = datetime.utcnow()
 
 
-def _compute_embeddings(entry_ids_local: List[str], owner_id: Optional[str]) -> None:
-    db2 = SessionLocal()
-    try:
-        from ....core.rag import create_retriever
-
-        retriever = create_retriever(db2, user_id=owner_id)
-        for entry_id in entry_ids_local:
-            entry = owner_only(db2.query(models.WorldbookEntry).filter(models.WorldbookEntry.entry_id == entry_id), models.WorldbookEntry, owner_id).first()
-            if entry:
-                try:
-                    retriever.compute_entry_embedding(entry, use_cache=False)
-                except Exception:
-                    continue
-    finally:
-        db2.close()
+def _upsert_chunk(db: Session, records: List[Dict[str, Any]], worldbook_id: str, user_id: Optional[str]) -> Tuple[int, int, List[models.WorldbookEntry], List[Tuple[Optional[str], str]]]:
+    """Insert or update one chunk of records with a single id-resolution query, then flush."""
+    records = [raw for raw in records if raw.get("title") and raw.get("content")]
+    preferred_ids = [raw.get("entry_id") or f"WB_{uuid.uuid4().hex[:10]}" for raw in records]
+    targets = resolve_import_targets(db, preferred_ids, user_id)
+    created = 0
+    updated = 0
+    touched: Dict[str, models.WorldbookEntry] = {}
+    moved_entries: List[Tuple[Optional[str], str]] = []
+    for raw, preferred_entry_id in zip(records, preferred_ids):
+        existing, entry_id = targets[preferred_entry_id]
+        entry = touched.get(entry_id) or existing
+        if entry is not None:
+            if entry_id not in touched and entry.worldbook_id != worldbook_id:
+                moved_entries.append((entry.worldbook_id, entry.entry_id))
+            _update_existing_entry(entry, raw, worldbook_id)
+            updated += 1
+        else:
+            entry = models.WorldbookEntry(user_id=user_id, worldbook_id=worldbook_id, entry_id=entry_id, category=raw.get("category") or None, tags=extract_tags(raw.get("tags")), title=raw["title"], content=raw["content"], importance=float(raw.get("importance", 0.5)), canonical=bool(raw.get("canonical", False)), meta_json=json.dumps(extract_meta(raw), ensure_ascii=False), created_at=datetime.utcnow(), updated_at=datetime.utcnow())
+            db.add(entry)
+            created += 1
+        touched[entry_id] = entry
+    db.flush()
+    update_lexical_index(db, upserted=list(touched.values()))
+    return created, updated, list(touched.values()), moved_entries
+
+
+def _commit_chunk(db: Session, records: List[Dict[str, Any]], worldbook_id: str, user_id: Optional[str]) -> Tuple[int, int, List[str], Set[str]]:
+    created, updated, entries, moved_entries = _upsert_chunk(db, records, worldbook_id, user_id)
+    entry_ids = [entry.entry_id for entry in entries]
+    db.commit()
+    return created, updated, entry_ids, {source for source, _ in moved_entries if source}
+
+
+def _finish_stream_import(db: Session, worldbook_id: str, user_id: Optional[str], created: int, updated: int, entry_ids: List[str], touched_worldbooks: Set[str], sync_embeddings: bool) -> Dict[str, Any]:
+    # Rewriting a persisted TF-IDF index once per chunk is quadratic in the import size;
+    # drop it instead and let the next search rebuild it lazily.
+    for touched_worldbook_id in touched_worldbooks:
+        invalidate_vector_indexes(touched_worldbook_id)
+        invalidate_retrieval_cache(touched_worldbook_id)
+        drop_tfidf_index(db, touched_worldbook_id)
+    return _import_result(db, worldbook_id, user_id, created, updated, entry_ids, sync_embeddings)
+
+
+def _import_result(db: Session, worldbook_id: str, user_id: Optional[str], created: int, updated: int, entry_ids: List[str], sync_embeddings: bool) -> Dict[str, Any]:
+    entry_ids = list(dict.fromkeys(entry_ids))
+    job_id = None
+    if entry_ids:
+        job_id = create_embedding_job(db, entry_ids, user_id, worldbook_id).job_id
+        if sync_embeddings:
+            run_embedding_job(job_id)
+        else:
+            submit_embedding_job(job_id)
+    return {"worldbook_id": worldbook_id, "created_or_updated": created + updated, "created": created, "updated": updated, "embeddings": "queued" if (entry_ids and not sync_embeddings) else "done", "embedding_job_id": job_id}
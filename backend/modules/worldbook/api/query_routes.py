@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import json
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
@@ -10,6 +10,7 @@ from ....core.auth import User as AuthUser, get_current_user
 from ....core.tenant import current_user_id
 from ....db import models
 from ....db.base import get_db
+from ...knowledge.services.lexical_index import search_lexical
 from .helpers import apply_worldbook_filters, normalize_worldbook_id, semantic_match_score
 from .schemas import WorldbookDetailResponse, WorldbookListItem, WorldbookListResponse, WorldbookSemanticSearchItem, WorldbookSemanticSearchRequest, WorldbookSemanticSearchResponse
 
@@ -17,7 +18,7 @@ router = APIRouter()
 
 
 @router.get("/worldbook/list", response_model=WorldbookListResponse)
-def list_worldbook(page: int = Query(1, ge=1), page_size: int = Query(20, ge=1, le=2000), keyword: Optional[str] = Query(None), category: Optional[str] = Query(None), worldbook_id: Optional[str] = Query(None), db: Session = Depends(get_db), current_user: Optional[AuthUser] = Depends(get_current_user)) -> WorldbookListResponse:
+def list_worldbook(page: int = Query(1, ge=1), page_size: int = Query(20, ge=1, le=2000), keyword: Optional[str] = Query(None), category: Optional[str] = Query(None), worldbook_id: Optional[str] = Query(None), enabled: Optional[bool] = Query(None), db: Session = Depends(get_db), current_user: Optional[AuthUser] = Depends(get_current_user)) -> WorldbookListResponse:
     user_id = current_user_id(current_user)
     query = apply_worldbook_filters(db.query(models.WorldbookEntry), user_id, normalize_worldbook_id(worldbook_id))
     if keyword:
@@ -25,6 +26,8 @@ def list_worldbook(page: int = Query(1, ge=1), page_size: int = Query(20, ge=1,
         query = query.filter((models.WorldbookEntry.title.like(like)) | (models.WorldbookEntry.content.like(like)) | (models.WorldbookEntry.tags.like(like)))
     if category:
         query = query.filter(models.WorldbookEntry.category == category)
+    if enabled is not None:
+        query = query.filter(models.WorldbookEntry.is_enabled == enabled)
     total = query.count()
     rows = query.order_by(models.WorldbookEntry.created_at.desc()).offset((page - 1) * page_size).limit(page_size).all()
     items = []
@@ -45,12 +48,22 @@ def get_worldbook_entry(entry_id: str, db: Session = Depends(get_db), current_us
 
 @router.post("/worldbook/semantic_search", response_model=WorldbookSemanticSearchResponse)
 def semantic_search_worldbook(payload: WorldbookSemanticSearchRequest, db: Session = Depends(get_db), current_user: Optional[AuthUser] = Depends(get_current_user)) -> WorldbookSemanticSearchResponse:
-    query = apply_worldbook_filters(db.query(models.WorldbookEntry), current_user_id(current_user), normalize_worldbook_id(payload.worldbook_id))
+    if not payload.query.strip():
+        return WorldbookSemanticSearchResponse(results=[])
+    user_id = current_user_id(current_user)
+    worldbook_id = normalize_worldbook_id(payload.worldbook_id)
+    top_k = max(payload.top_k, 1)
+    hits = search_lexical(db, payload.query, top_k, user_id=user_id, worldbook_id=worldbook_id, category=payload.category)
+    if hits is None:
+        hits = _scan_worldbook(db, payload, user_id, worldbook_id)[:top_k]
+    return WorldbookSemanticSearchResponse(results=[WorldbookSemanticSearchItem(worldbook_id=entry.worldbook_id, entry_id=entry.entry_id, category=entry.category, title=entry.title, content=entry.content, importance=entry.importance, relevance_score=round(score, 4)) for entry, score in hits])
+
+
+def _scan_worldbook(db: Session, payload: WorldbookSemanticSearchRequest, user_id: Optional[str], worldbook_id: Optional[str]) -> List[Tuple[models.WorldbookEntry, float]]:
+    """Substring scoring over every entry, for databases without a full-text index."""
+    query = apply_worldbook_filters(db.query(models.WorldbookEntry), user_id, worldbook_id)
     if payload.category:
         query = query.filter(models.WorldbookEntry.category == payload.category)
-    entries = query.all()
-    if not entries or not payload.query.strip():
-        return WorldbookSemanticSearchResponse(results=[])
-    ranked = [WorldbookSemanticSearchItem(worldbook_id=entry.worldbook_id, entry_id=entry.entry_id, category=entry.category, title=entry.title, content=entry.content, importance=entry.importance, relevance_score=score) for entry in entries if (score := semantic_match_score(payload.query, entry)) > 0]
-    ranked.sort(key=lambda item: item.relevance_score, reverse=True)
-    return WorldbookSemanticSearchResponse(results=ranked[: max(payload.top_k, 1)])
+    ranked = [(entry, score) for entry in query.all() if (score := semantic_match_score(payload.query, entry)) > 0]
+    ranked.sort(key=lambda item: item[1], reverse=True)
+    return ranked
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from datetime import datetime
 from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, Field
@@ -57,3 +58,16 @@ class WorldbookSemanticSearchItem(BaseModel):
 
 class WorldbookSemanticSearchResponse(BaseModel):
     results: List[WorldbookSemanticSearchItem]
+
+
+class WorldbookEmbeddingJobResponse(BaseModel):
+    job_id: str
+    worldbook_id: Optional[str] = None
+    status: str
+    total: int
+    done: int
+    failed: int
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
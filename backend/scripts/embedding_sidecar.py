@@ -0,0 +1,58 @@
+"""
+Run the shared embedding sidecar: one SentenceTransformer copy serving every uvicorn worker.
+
+Concurrent requests are merged into single forward passes. Point the workers at it with
+NOVEL_EMBEDDING_SIDECAR_URL set to the same address.
+
+Usage:
+  python -m backend.scripts.embedding_sidecar
+  python -m backend.scripts.embedding_sidecar --url unix:///tmp/storyteller-embed.sock
+  python -m backend.scripts.embedding_sidecar --url http://127.0.0.1:8765 --max-batch-size 128 --max-wait-ms 10
+"""
+
+from __future__ import annotations
+
+import argparse
+from typing import Dict, List
+
+from backend.modules.knowledge.services.embedding_sidecar import DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_WAIT_MS, create_sidecar_server
+from backend.modules.knowledge.services.embeddings_config import DEFAULT_SENTENCE_TRANSFORMER_MODEL, EmbeddingError
+from backend.modules.knowledge.services.model_registry import get_model, loaded_model
+
+DEFAULT_URL = "http://127.0.0.1:8765"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve sentence-transformers embeddings to local workers.")
+    parser.add_argument("--url", default=DEFAULT_URL, help="http://host:port or unix:///path/to.sock")
+    parser.add_argument("--model", action="append", default=None, help="Model to preload; repeat for several.")
+    parser.add_argument("--max-batch-size", type=int, default=DEFAULT_MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS, help="How long a batch waits for more callers.")
+    args = parser.parse_args()
+
+    models = args.model or [DEFAULT_SENTENCE_TRANSFORMER_MODEL]
+    for model_name in models:
+        get_model("sentence_transformers", model_name)
+
+    def encode(model_name: str, texts: List[str]) -> List[List[float]]:
+        model = loaded_model("sentence_transformers", model_name) if model_name in models else None
+        if model is None:
+            raise EmbeddingError(f"Embedding 服务未加载模型：{model_name}")
+        return model.encode(texts, batch_size=len(texts), convert_to_numpy=True).tolist()
+
+    def dimensions() -> Dict[str, int]:
+        return {name: loaded_model("sentence_transformers", name).get_sentence_embedding_dimension() for name in models}
+
+    server = create_sidecar_server(args.url, encode, dimensions, max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    print(f"embedding sidecar listening on {args.url} ({', '.join(models)})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.batcher.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Apply pending schema migrations and record them in the schema_version table.
+
+Every step is idempotent, so databases created before versioning simply replay them once.
+Run this once per deploy before starting workers; app startup then only checks the version.
+
+Usage:
+  python -m backend.scripts.migrate
+  python -m backend.scripts.migrate --status
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import inspect
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from backend.db.base import Base
+from backend.modules.knowledge.services.lexical_index import ensure_lexical_index
+from backend.scripts.migrate_embedding_blobs import ensure_embedding_blob_columns
+from backend.scripts.migrate_worldbook_flags import migrate_worldbook_flags
+from backend.scripts.migrate_worldbook_ids import run_migration
+from backend.scripts.migrate_worldbook_ids_shared import engine, execute
+from backend.scripts.rebuild_character_templates_table import rebuild_if_needed as rebuild_character_templates_table
+from backend.scripts.rebuild_characters_table import rebuild_if_needed as rebuild_characters_table
+
+VERSION_TABLE = "schema_version"
+# Arbitrary application-wide key for pg_advisory_lock.
+ADVISORY_LOCK_KEY = 73_190_418
+
+
+def _create_tables() -> None:
+    Base.metadata.create_all(bind=engine)
+
+
+def _rebuild_character_tables() -> None:
+    rebuild_characters_table()
+    rebuild_character_templates_table()
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[], object]]] = [
+    (1, "create_tables", _create_tables),
+    (2, "rebuild_character_tables", _rebuild_character_tables),
+    (3, "worldbook_isolation", run_migration),
+    (4, "embedding_blob_columns", ensure_embedding_blob_columns),
+    (5, "worldbook_flag_columns", migrate_worldbook_flags),
+    (6, "create_rebuilt_tables", _create_tables),
+    (7, "worldbook_lexical_index", lambda: ensure_lexical_index(engine)),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version() -> int:
+    if VERSION_TABLE not in inspect(engine).get_table_names():
+        return 0
+    with engine.connect() as conn:
+        return conn.execute(execute(f"SELECT MAX(version) FROM {VERSION_TABLE}")).scalar() or 0
+
+
+@contextmanager
+def _file_lock(path: str) -> Iterator[None]:
+    with open(path, "a+b") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        else:
+            handle.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def _migration_lock() -> Iterator[None]:
+    """Serialize concurrent runners: a Postgres advisory lock, or a lock file next to the SQLite database.
+
+    SQLite's own write lock only covers single statements, so two runners could both read the same version."""
+    if engine.dialect.name == "sqlite":
+        database = engine.url.database
+        if not database or database == ":memory:":
+            yield
+            return
+        with _file_lock(f"{os.path.abspath(database)}.migrate.lock"):
+            yield
+        return
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+    with engine.connect() as conn:
+        conn.execute(execute("SELECT pg_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+        try:
+            yield
+        finally:
+            conn.execute(execute("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+
+
+def migrate(target: Optional[int] = None) -> int:
+    """Apply migrations newer than the recorded version (up to ``target``); returns how many ran."""
+    applied = 0
+    with _migration_lock():
+        # Re-read the version under the lock: another runner may have finished while this one waited.
+        with engine.begin() as conn:
+            conn.execute(execute(f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} (version INTEGER PRIMARY KEY, name VARCHAR(128) NOT NULL, applied_at TIMESTAMP NOT NULL)"))
+        version = current_version()
+        for number, name, step in MIGRATIONS:
+            if number <= version or (target is not None and number > target):
+                continue
+            print(f"apply migration {number:03d} {name}")
+            step()
+            with engine.begin() as conn:
+                conn.execute(execute(f"INSERT INTO {VERSION_TABLE} (version, name, applied_at) VALUES (:version, :name, :applied_at)"), {"version": number, "name": name, "applied_at": datetime.utcnow()})
+            applied += 1
+    print(f"schema version {current_version()} (latest {LATEST_VERSION})")
+    return applied
+
+
+def ensure_schema(auto_migrate: bool = False) -> int:
+    """Startup check: a single version lookup when the schema is current."""
+    version = current_version()
+    if version >= LATEST_VERSION:
+        return version
+    if not auto_migrate:
+        raise RuntimeError(f"数据库结构版本 {version} 低于 {LATEST_VERSION}，请先运行 python -m backend.scripts.migrate，或设置 NOVEL_AUTO_MIGRATE=true 在启动时自动迁移")
+    migrate()
+    return current_version()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations.")
+    parser.add_argument("--status", action="store_true", help="Print the recorded and latest versions without migrating.")
+    parser.add_argument("--target", type=int, default=None, help="Stop after this migration version.")
+    args = parser.parse_args()
+    if args.status:
+        print(f"schema version {current_version()} (latest {LATEST_VERSION})")
+        return
+    migrate(target=args.target)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Convert worldbook embeddings from JSON text to compact binary blobs.
+
+Usage:
+  python -m backend.scripts.migrate_embedding_blobs
+  python -m backend.scripts.migrate_embedding_blobs --dtype float16 --batch-size 1000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+
+from sqlalchemy import inspect
+
+from backend.modules.knowledge.services.embeddings_codec import EMBEDDING_DTYPES, encode_embedding
+from backend.scripts.migrate_worldbook_ids_shared import engine, execute, table_exists
+
+DEFAULT_BATCH_SIZE = 500
+
+SQLITE_TABLE_SQL = "CREATE TABLE worldbook_embeddings_blob (id INTEGER PRIMARY KEY, user_id VARCHAR(32), worldbook_id VARCHAR(8) NOT NULL, entry_id VARCHAR NOT NULL, embedding_json TEXT, embedding_blob BLOB, embedding_dtype VARCHAR(16), content_hash VARCHAR NOT NULL, embedding_model VARCHAR NOT NULL, dimension INTEGER NOT NULL, created_at DATETIME, updated_at DATETIME, FOREIGN KEY(user_id) REFERENCES users (user_id), FOREIGN KEY(entry_id) REFERENCES worldbook (entry_id))"
+COPY_COLUMNS = "id, user_id, worldbook_id, entry_id, embedding_json, content_hash, embedding_model, dimension, created_at, updated_at"
+
+
+def ensure_embedding_blob_columns() -> None:
+    if not table_exists("worldbook_embeddings"):
+        print("skip worldbook_embeddings blob columns: table missing")
+        return
+    info = {column["name"]: column for column in inspect(engine).get_columns("worldbook_embeddings")}
+    if "embedding_blob" in info and "embedding_dtype" in info and info["embedding_json"]["nullable"]:
+        print("skip worldbook_embeddings blob columns")
+        return
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            conn.execute(execute("PRAGMA foreign_keys=OFF"))
+            conn.execute(execute(SQLITE_TABLE_SQL))
+            conn.execute(execute(f"INSERT INTO worldbook_embeddings_blob ({COPY_COLUMNS}) SELECT {COPY_COLUMNS} FROM worldbook_embeddings"))
+            conn.execute(execute("DROP TABLE worldbook_embeddings"))
+            conn.execute(execute("ALTER TABLE worldbook_embeddings_blob RENAME TO worldbook_embeddings"))
+            conn.execute(execute("CREATE INDEX ix_worldbook_embeddings_id ON worldbook_embeddings (id)"))
+            conn.execute(execute("CREATE INDEX ix_worldbook_embeddings_user_id ON worldbook_embeddings (user_id)"))
+            conn.execute(execute("CREATE INDEX ix_worldbook_embeddings_worldbook_id ON worldbook_embeddings (worldbook_id)"))
+            conn.execute(execute("CREATE INDEX ix_worldbook_embeddings_entry_id ON worldbook_embeddings (entry_id)"))
+            conn.execute(execute("CREATE INDEX ix_worldbook_embeddings_content_hash ON worldbook_embeddings (content_hash)"))
+            conn.execute(execute("PRAGMA foreign_keys=ON"))
+        else:
+            conn.execute(execute("ALTER TABLE worldbook_embeddings ADD COLUMN IF NOT EXISTS embedding_blob BYTEA"))
+            conn.execute(execute("ALTER TABLE worldbook_embeddings ADD COLUMN IF NOT EXISTS embedding_dtype VARCHAR(16)"))
+            conn.execute(execute("ALTER TABLE worldbook_embeddings ALTER COLUMN embedding_json DROP NOT NULL"))
+    print("added worldbook_embeddings blob columns")
+
+
+def convert_embedding_rows(dtype: str = "float32", batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    if dtype not in EMBEDDING_DTYPES:
+        raise ValueError(f"dtype must be one of {', '.join(EMBEDDING_DTYPES)}")
+    ensure_embedding_blob_columns()
+    converted = 0
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(execute("SELECT id, embedding_json FROM worldbook_embeddings WHERE id > :last_id AND embedding_blob IS NULL AND embedding_json IS NOT NULL ORDER BY id LIMIT :limit"), {"last_id": last_id, "limit": batch_size}).mappings().all()
+            if not rows:
+                break
+            updates = []
+            for row in rows:
+                try:
+                    vector = json.loads(row["embedding_json"])
+                except ValueError:
+                    continue
+                updates.append({"id": row["id"], "blob": encode_embedding(vector, dtype), "dtype": dtype, "dimension": len(vector)})
+            if updates:
+                conn.execute(execute("UPDATE worldbook_embeddings SET embedding_blob = :blob, embedding_dtype = :dtype, dimension = :dimension, embedding_json = NULL WHERE id = :id"), updates)
+            converted += len(updates)
+            last_id = rows[-1]["id"]
+    print(f"converted worldbook_embeddings: {converted} rows -> {dtype}")
+    return converted
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Convert worldbook embeddings from JSON text to binary blobs.")
+    parser.add_argument("--dtype", default="float32", choices=EMBEDDING_DTYPES, help="Blob element type. Default: float32")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help=f"Rows per transaction. Default: {DEFAULT_BATCH_SIZE}")
+    args = parser.parse_args()
+    convert_embedding_rows(dtype=args.dtype, batch_size=args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
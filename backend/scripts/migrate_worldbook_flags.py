@@ -0,0 +1,76 @@
+"""
+Add and backfill the indexed worldbook is_enabled / category_key columns.
+
+Usage:
+  python -m backend.scripts.migrate_worldbook_flags
+  python -m backend.scripts.migrate_worldbook_flags --batch-size 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+
+from backend.db.models.common import worldbook_category_key, worldbook_meta_enabled
+from backend.scripts.migrate_worldbook_ids_shared import columns, engine, execute, table_exists
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def ensure_worldbook_flag_columns() -> bool:
+    """Add the columns and indexes when missing; returns True when a backfill is needed."""
+    if not table_exists("worldbook"):
+        print("skip worldbook flag columns: table missing")
+        return False
+    existing = set(columns("worldbook"))
+    if {"is_enabled", "category_key"} <= existing:
+        print("skip worldbook flag columns")
+        return False
+    true_literal = "1" if engine.dialect.name == "sqlite" else "TRUE"
+    with engine.begin() as conn:
+        if "is_enabled" not in existing:
+            conn.execute(execute(f"ALTER TABLE worldbook ADD COLUMN is_enabled BOOLEAN NOT NULL DEFAULT {true_literal}"))
+        if "category_key" not in existing:
+            conn.execute(execute("ALTER TABLE worldbook ADD COLUMN category_key VARCHAR NOT NULL DEFAULT ''"))
+        conn.execute(execute("CREATE INDEX IF NOT EXISTS ix_worldbook_is_enabled ON worldbook (is_enabled)"))
+        conn.execute(execute("CREATE INDEX IF NOT EXISTS ix_worldbook_category_key ON worldbook (category_key)"))
+    print("added worldbook flag columns")
+    return True
+
+
+def backfill_worldbook_flags(batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    updated = 0
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(execute("SELECT id, category, meta_json, is_enabled, category_key FROM worldbook WHERE id > :last_id ORDER BY id LIMIT :limit"), {"last_id": last_id, "limit": batch_size}).mappings().all()
+            if not rows:
+                break
+            updates = []
+            for row in rows:
+                is_enabled = worldbook_meta_enabled(row["meta_json"])
+                category_key = worldbook_category_key(row["category"])
+                if bool(row["is_enabled"]) != is_enabled or row["category_key"] != category_key:
+                    updates.append({"id": row["id"], "is_enabled": is_enabled, "category_key": category_key})
+            if updates:
+                conn.execute(execute("UPDATE worldbook SET is_enabled = :is_enabled, category_key = :category_key WHERE id = :id"), updates)
+            updated += len(updates)
+            last_id = rows[-1]["id"]
+    print(f"backfilled worldbook flags: {updated} rows")
+    return updated
+
+
+def migrate_worldbook_flags(batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+    if ensure_worldbook_flag_columns():
+        backfill_worldbook_flags(batch_size=batch_size)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Add and backfill worldbook is_enabled / category_key columns.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help=f"Rows per transaction. Default: {DEFAULT_BATCH_SIZE}")
+    args = parser.parse_args()
+    ensure_worldbook_flag_columns()
+    backfill_worldbook_flags(batch_size=args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
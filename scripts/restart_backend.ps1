@@ -76,6 +76,11 @@ if (-not $NoReload) {
 Write-Step "Starting backend at http://127.0.0.1:${Port}"
 Push-Location $repoRoot
 try {
+    Write-Step "Applying database migrations"
+    & $python -m backend.scripts.migrate
+    if ($LASTEXITCODE -ne 0) {
+        throw "Database migration failed."
+    }
     & $python @args
 } finally {
     Pop-Location
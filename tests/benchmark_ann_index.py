@@ -0,0 +1,69 @@
+"""Benchmark: IVF approximate search vs exact VectorIndex search.
+
+Reports build time, recall@k against exact search and p50/p99 query latency per nprobe.
+
+Usage:
+  python tests/benchmark_ann_index.py
+  python tests/benchmark_ann_index.py --size 200000 --dimension 768 --nprobe 4 8 16 32
+"""
+
+import argparse
+import sys
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from backend.modules.knowledge.services.ann_index import IvfIndex  # noqa: E402
+from backend.modules.knowledge.services.vector_index import VectorIndex  # noqa: E402
+
+
+def _clustered(rng, count, dimension, clusters):
+    centers = rng.normal(size=(clusters, dimension))
+    return (centers[rng.integers(0, clusters, count)] + rng.normal(scale=0.35, size=(count, dimension))).astype(np.float32)
+
+
+def _timed_search(index, queries, top_k, **options):
+    latencies, results = [], []
+    for query in queries:
+        started = perf_counter()
+        results.append({entry_id for entry_id, _ in index.search(query, top_k, **options)})
+        latencies.append((perf_counter() - started) * 1000)
+    return results, np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare IVF approximate search with exact search.")
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=500, help="Topics in the synthetic corpus.")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=8)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    vectors = _clustered(rng, args.size, args.dimension, args.clusters)
+    queries = _clustered(rng, args.queries, args.dimension, args.clusters)
+    ids = [f"e{idx}" for idx in range(args.size)]
+
+    exact = VectorIndex(args.dimension)
+    exact.add(ids, vectors)
+    started = perf_counter()
+    ivf = IvfIndex(args.dimension)
+    ivf.add(ids, vectors)
+    print(f"entries={args.size} dim={args.dimension} lists={len(ivf.centroids) if ivf.centroids is not None else 0} ivf build {perf_counter() - started:.1f}s")
+
+    truth, exact_p50, exact_p99 = _timed_search(exact, queries, args.top_k)
+    print(f"{'backend':>10} {'recall@' + str(args.top_k):>10} {'p50 ms':>8} {'p99 ms':>8}")
+    print(f"{'exact':>10} {1.0:>10.3f} {exact_p50:>8.2f} {exact_p99:>8.2f}")
+    for nprobe in args.nprobe:
+        found, p50, p99 = _timed_search(ivf, queries, args.top_k, nprobe=nprobe)
+        recall = sum(len(hits & expected) for hits, expected in zip(found, truth)) / (args.top_k * len(truth))
+        print(f"{'ivf/' + str(nprobe):>10} {recall:>10.3f} {p50:>8.2f} {p99:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Benchmark: pooled LLM clients vs a fresh httpx.Client per completion.
+
+A turn is one streamed story completion plus the non-streamed character-sync completion.
+The local mock OpenAI server counts accepted connections and can delay each new connection
+to stand in for the TCP/TLS handshake to a remote provider.
+
+Usage:
+  python tests/benchmark_llm_client_pool.py
+  python tests/benchmark_llm_client_pool.py --turns 50 --handshake-ms 40
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from time import perf_counter
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from backend.modules.system.services import llm_chat  # noqa: E402
+from backend.modules.system.services.llm_chat import chat_completion  # noqa: E402
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+        time.sleep(self.server.handshake_s)
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if payload.get("stream"):
+            body = "".join(f"data: {json.dumps({'choices': [{'delta': {'content': f'片段{idx}'}}]})}\n\n" for idx in range(20)) + "data: [DONE]\n\n"
+        else:
+            body = json.dumps({"choices": [{"message": {"content": '{"created":[],"updated":[]}'}}]})
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream" if payload.get("stream") else "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _unpooled_chat_completion(base_url, api_key, model, messages, temperature=0.8, stream=False, timeout_s=60.0):
+    """The previous behaviour: one short-lived client, and so one connection, per completion."""
+    with httpx.Client(timeout=timeout_s) as client:
+        url, headers, payload = llm_chat._chat_request(base_url, api_key, model, messages, temperature, stream)
+        if not stream:
+            return llm_chat._completion_text(client.post(url, headers=headers, json=payload)), None
+        return "", iter(list(llm_chat._iter_stream(client, url, headers, payload, timeout_s)))
+
+
+def _run_turns(server, base_url, turns, completion):
+    server.connections = 0
+    started = perf_counter()
+    for _ in range(turns):
+        _, stream = completion(base_url, "key", "mock", [{"role": "user", "content": "继续"}], stream=True)
+        "".join(stream)
+        completion(base_url, "key", "mock", [{"role": "user", "content": "同步角色"}], temperature=0.2, stream=False)
+    return server.connections, (perf_counter() - started) * 1000 / turns
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare pooled and per-request LLM HTTP clients.")
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--handshake-ms", type=float, default=25.0, help="Delay added to every new connection.")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockOpenAIHandler)
+    server.daemon_threads = True
+    server.handshake_s = args.handshake_ms / 1000.0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    print(f"turns={args.turns} handshake={args.handshake_ms:.0f}ms (2 completions per turn)")
+    print(f"{'client':>10} {'connections':>12} {'conn/turn':>10} {'ms/turn':>9}")
+    for name, completion in (("per-call", _unpooled_chat_completion), ("pooled", chat_completion)):
+        connections, ms_per_turn = _run_turns(server, base_url, args.turns, completion)
+        print(f"{name:>10} {connections:>12} {connections / args.turns:>10.2f} {ms_per_turn:>9.1f}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
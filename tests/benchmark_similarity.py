@@ -0,0 +1,54 @@
+"""Micro-benchmark: NumPy similarity kernels vs the pure-Python fallback.
+
+Usage:
+  python tests/benchmark_similarity.py
+  python tests/benchmark_similarity.py --sizes 1000 10000 --dimension 768
+"""
+
+import argparse
+import random
+import sys
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from backend.modules.knowledge.services.embeddings_similarity import python_top_k_similar, top_k_similar  # noqa: E402
+
+
+def _timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = perf_counter()
+        fn()
+        best = min(best, perf_counter() - started)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare NumPy and pure-Python top-k cosine similarity.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--top-k", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    query = [rng.uniform(-1, 1) for _ in range(args.dimension)]
+    print(f"{'candidates':>10} {'python ms':>12} {'numpy ms':>10} {'numpy(np.ndarray) ms':>22} {'speedup':>8}")
+    for size in args.sizes:
+        candidates = [[rng.uniform(-1, 1) for _ in range(args.dimension)] for _ in range(size)]
+        python_ms = _timed(lambda: python_top_k_similar(query, candidates, args.top_k), 1)
+        numpy_ms = _timed(lambda: top_k_similar(query, candidates, args.top_k), args.repeat)
+        try:
+            import numpy as np
+
+            matrix = np.asarray(candidates, dtype=np.float32)
+            array_ms = _timed(lambda: top_k_similar(query, matrix, args.top_k), args.repeat)
+        except ImportError:
+            array_ms = float("nan")
+        print(f"{size:>10} {python_ms:>12.1f} {numpy_ms:>10.1f} {array_ms:>22.1f} {python_ms / array_ms:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+# Startup would otherwise preload the sentence-transformers model in the background of every app test.
+os.environ.setdefault("NOVEL_EMBEDDING_WARMUP", "false")
+
+# Point the app at a throwaway SQLite file before backend.config is imported, so tests never touch the configured database.
+_database_dir = tempfile.mkdtemp(prefix="storyteller-tests-")
+os.environ["NOVEL_DATABASE_URL"] = f"sqlite:///{os.path.join(_database_dir, 'db.sqlite')}"
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+from backend.db.base import Base  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def migrated_database():
+    """Migrate the throwaway database once per run, as a deploy would, and remove it afterwards."""
+    from backend.db.base import engine
+    from backend.scripts.migrate import migrate
+
+    migrate()
+    yield
+    engine.dispose()
+    shutil.rmtree(_database_dir, ignore_errors=True)
+
+
+@pytest.fixture()
+def db_engine():
+    """A fresh in-memory database with every table; StaticPool lets all sessions and threads of a test share it."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture()
+def session_factory(db_engine):
+    return sessionmaker(bind=db_engine, autocommit=False, autoflush=False)
+
+
+@pytest.fixture()
+def db_session(session_factory):
+    db = session_factory()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+class KeywordEngine:
+    """Embedding stub: one dimension per keyword, valued by its count in the text plus ``offset``."""
+
+    def __init__(self, keywords=("dragon", "castle", "river"), offset=0.0):
+        self.keywords = keywords
+        self.offset = offset
+        self.texts = []
+        self.batches = 0
+
+    @property
+    def calls(self):
+        return len(self.texts)
+
+    def compute_single(self, text):
+        return self.compute_embeddings([text])[0]
+
+    def compute_embeddings(self, texts, batch_size=32):
+        self.texts.extend(texts)
+        self.batches += 1
+        return [[float(text.count(keyword)) + self.offset for keyword in self.keywords] for text in texts]
+
+
+def stub_retriever(db, engine, provider="stub", **options):
+    """A RAGRetriever whose embeddings come from ``engine`` instead of a real model."""
+    from backend.modules.knowledge.services.embeddings_config import EmbeddingConfig
+    from backend.modules.knowledge.services.retriever import RAGRetriever
+
+    retriever = RAGRetriever(db, EmbeddingConfig(provider=provider), **options)
+    retriever._engine = engine
+    return retriever
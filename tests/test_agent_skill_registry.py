@@ -0,0 +1,166 @@
+import asyncio
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+import backend.main  # noqa: F401  (loads the story and agent packages in dependency order)
+from backend.core import orchestrator, prompts
+from backend.db import models
+from backend.db.base import Base
+from backend.modules.agent.services import profiling, runner
+from backend.modules.agent.services.profiling import profile_block, skill_metrics
+from backend.modules.agent.services.registry import SkillRegistry
+
+
+def _registry(log):
+    def skill(name, delay=0.0):
+        def run(state):
+            log.append((name, state["db"]))
+            time.sleep(delay)
+            state.setdefault("seen", []).append(name)
+            return state
+
+        return run
+
+    return (
+        SkillRegistry()
+        .register("bind", skill("bind"))
+        .register("history", skill("history", 0.1), depends_on=["bind"])
+        .register("memory", skill("memory", 0.3), depends_on=["bind"])
+        .register("worldbook", skill("worldbook", 0.2), depends_on=["history"])
+        .register("plan", skill("plan"), depends_on=["history", "memory", "worldbook"])
+    )
+
+
+def test_stages_follow_declared_dependencies():
+    registry = _registry([])
+    assert registry.stages(["bind", "history", "memory", "worldbook", "plan"]) == [["bind"], ["history", "memory"], ["worldbook"], ["plan"]]
+    registry.register("bind", lambda state: state, depends_on=["plan"])
+    with pytest.raises(ValueError):
+        registry.stages(["bind", "history", "memory", "worldbook", "plan"])
+
+
+def test_independent_skills_overlap_on_their_own_sessions():
+    calls = []
+    sessions = []
+
+    def session_factory():
+        sessions.append(type("Session", (), {"close": lambda self: None})())
+        return sessions[-1]
+
+    state = {"db": "request-session"}
+    started = time.perf_counter()
+    timings = _registry(calls).run(["bind", "history", "memory", "worldbook", "plan"], state, session_factory=session_factory)
+    elapsed = time.perf_counter() - started
+
+    # worldbook starts once history is done instead of waiting for the whole history/memory stage.
+    assert elapsed < 0.45
+    assert set(state["seen"]) == {"bind", "history", "memory", "worldbook", "plan"}
+    assert state["db"] == "request-session"
+    assert dict(calls)["bind"] == "request-session" and dict(calls)["plan"] == "request-session"
+    assert {dict(calls)["history"], dict(calls)["memory"], dict(calls)["worldbook"]} == set(sessions) and len(sessions) == 3
+    assert list(timings) == ["bind", "history", "memory", "worldbook", "plan"] and timings["memory"].wall_ms >= 300
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_worldbook_overlaps_character_loading(use_async):
+    spans = {}
+    registry = runner.create_registry()
+
+    def timed(name, delay):
+        def run(state):
+            started = time.perf_counter()
+            time.sleep(delay)
+            spans[name] = (started, time.perf_counter())
+            return state
+
+        return run
+
+    for name in runner.PREPARE_SKILLS:
+        registry._skills[name] = timed(name, 0.3 if name == "load_characters" else 0.05)
+    session = type("Session", (), {"close": lambda self: None})
+    if use_async:
+        asyncio.run(registry.run_async(runner.PREPARE_SKILLS, {"db": session()}, session_factory=session))
+    else:
+        registry.run(runner.PREPARE_SKILLS, {"db": session()}, session_factory=session)
+
+    assert spans["load_worldbook"][0] < spans["load_characters"][1]
+    assert spans["plan_turn"][0] >= max(end for end in (spans["load_worldbook"][1], spans["load_characters"][1]))
+
+
+def test_profile_block_counts_only_its_own_thread(session_factory):
+    with session_factory() as db:
+        db.add_all([models.WorldbookEntry(entry_id=f"e{idx}", worldbook_id="Wprof001", title=f"t{idx}", content="c") for idx in range(3)])
+        db.commit()
+
+    def other_thread():
+        with session_factory() as db:
+            db.query(models.WorldbookEntry).all()
+
+    with session_factory() as db, profile_block() as profile:
+        assert len(db.query(models.WorldbookEntry).all()) == 3
+        thread = threading.Thread(target=other_thread)
+        thread.start()
+        thread.join()
+
+    assert profile.statements == 1
+    assert profile.rows == 3
+    assert profile.wall_ms >= profile.cpu_ms >= 0
+
+
+def test_profile_block_counts_rows_as_they_are_fetched(session_factory):
+    with session_factory() as db:
+        db.add_all([models.WorldbookEntry(entry_id=f"e{idx}", worldbook_id="Wprof001", title=f"t{idx}", content="c") for idx in range(3)])
+        db.commit()
+
+    with session_factory() as db, profile_block() as profile:
+        result = db.execute(select(models.WorldbookEntry))
+        assert profile.rows == 0
+        assert len(result.scalars().all()) == 3
+    assert profile.rows == 3
+
+
+def test_profile_block_prefers_the_driver_rowcount():
+    with profile_block() as profile:
+        profiling._count_cursor_rows(None, SimpleNamespace(rowcount=5, description=()), "SELECT", (), None, False)
+        profiling._count_loaded_instance(None, None)
+    assert profile.rows == 5
+
+
+def test_prepared_turn_records_skill_profiles(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'turn.sqlite'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, autocommit=False, autoflush=False)()
+    db.add(models.User(user_id="u1", username="u1", password_hash="hashed", role=models.UserRole.USER, is_active=True))
+    db.add(models.DBPreset(id="preset_u1", user_id="u1", name="preset_u1", version=1, is_active=True, is_default=True, config_json=json.dumps(prompts.create_minimal_preset(name="preset_u1"), ensure_ascii=False)))
+    db.add(models.DBLLMConfig(id="llm_u1", user_id="u1", name="llm_u1", base_url="http://mock-llm.local", api_key="mock-key", stream=False, default_model="mock-model", is_active=True))
+    db.commit()
+    skill_threads = set()
+    original = runner.create_registry
+
+    def tracking_registry():
+        registry = original()
+        for name, fn in list(registry._skills.items()):
+            registry._skills[name] = lambda state, fn=fn: (skill_threads.add(threading.current_thread().name), fn(state))[1]
+        return registry
+
+    monkeypatch.setattr(runner, "create_registry", tracking_registry)
+    monkeypatch.setattr(runner, "chat_completion", lambda **kwargs: ("<正文部分>测试剧情</正文部分>", None))
+    try:
+        text, _, stream, dev_log, _ = orchestrator.generate_story_text(db=db, session_id="S_PAR", user_input="继续剧情", force_stream=False, user_id="u1")
+    finally:
+        db.close()
+
+    assert stream is None and "测试剧情" in text
+    skills = dev_log["developer"]["skills"]
+    assert list(skills) == runner.PREPARE_SKILLS + ["request_model"]
+    assert skills["bind_session"]["statements"] > 0 and skills["bind_session"]["rows"] > 0
+    assert dev_log["developer"]["skillTotals"]["statements"] == sum(item["statements"] for item in skills.values())
+    assert all("durationMs" in entry for entry in dev_log["entries"] if entry["title"] in skills)
+    assert skill_metrics.snapshot()["load_worldbook"]["count"] >= 1
+    assert any(name.startswith("agent-skill") for name in skill_threads)
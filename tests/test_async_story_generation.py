@@ -0,0 +1,92 @@
+import asyncio
+import json
+import threading
+import time
+
+import httpx
+
+import backend.main  # noqa: F401  (loads the story and agent packages in dependency order)
+from backend.modules.agent.services import runner
+from backend.modules.agent.services.registry import SkillRegistry
+from backend.modules.system.services import llm_chat
+
+
+def _sse_body(pieces):
+    lines = [f"data: {json.dumps({'choices': [{'delta': {'content': piece}}]})}" for piece in pieces]
+    return ("\n\n".join(lines + [": keep-alive", "data: [DONE]"]) + "\n\n").encode("utf-8")
+
+
+def _mock_async_client(monkeypatch, handler):
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(llm_chat.httpx, "AsyncClient", lambda **kwargs: real_client(transport=httpx.MockTransport(handler), **kwargs))
+
+
+def test_async_stream_yields_deltas_without_worker_threads(monkeypatch):
+    async def handler(request):
+        await asyncio.sleep(0.2)
+        return httpx.Response(200, content=_sse_body(["<正文部分>", "雨夜", "</正文部分>"]))
+
+    _mock_async_client(monkeypatch, handler)
+
+    async def one_stream():
+        text, stream = await llm_chat.chat_completion_async("http://llm.local", "key", "mock", [{"role": "user", "content": "hi"}], stream=True)
+        return text + "".join([delta async for delta in stream])
+
+    async def run():
+        threads = threading.active_count()
+        started = time.perf_counter()
+        results = await asyncio.gather(*(one_stream() for _ in range(50)))
+        return results, time.perf_counter() - started, threading.active_count() - threads
+
+    results, elapsed, extra_threads = asyncio.run(run())
+
+    assert results == ["<正文部分>雨夜</正文部分>"] * 50
+    assert elapsed < 2.0
+    assert extra_threads == 0
+
+
+def test_async_completion_reports_http_errors(monkeypatch):
+    _mock_async_client(monkeypatch, lambda request: httpx.Response(502, text="bad gateway"))
+
+    async def run():
+        try:
+            await llm_chat.chat_completion_async("http://llm.local", "key", "mock", [], stream=False)
+        except llm_chat.LLMError as exc:
+            return str(exc)
+
+    assert "HTTP 502" in asyncio.run(run())
+
+
+def test_prepare_agent_turn_async_offloads_skills_and_awaits_model(monkeypatch):
+    skill_threads = []
+
+    def skill(state):
+        skill_threads.append(threading.current_thread().name)
+        state.setdefault("runtime", {"llm_cfg": {"base_url": "http://llm.local", "api_key": "key"}, "model": "mock", "reasoning_strength": "low"})
+        state["messages"] = [{"role": "user", "content": state["user_input"]}]
+        return state
+
+    registry = SkillRegistry()
+    for name in runner.PREPARE_SKILLS:
+        registry.register(name, skill)
+    monkeypatch.setattr(runner, "create_registry", lambda: registry)
+
+    async def fake_stream():
+        yield "正文"
+
+    async def fake_completion(**kwargs):
+        assert kwargs["stream"] is True and kwargs["model"] == "mock"
+        return "", fake_stream()
+
+    monkeypatch.setattr(runner, "chat_completion_async", fake_completion)
+
+    async def run():
+        turn = await runner.prepare_agent_turn_async(db=None, session_id="S1", user_input="继续", force_stream=True, user_id=None, reasoning_strength="low")
+        return turn, threading.current_thread().name, [delta async for delta in turn.stream_gen]
+
+    turn, loop_thread, deltas = asyncio.run(run())
+
+    assert deltas == ["正文"]
+    assert len(skill_threads) == len(runner.PREPARE_SKILLS)
+    assert loop_thread not in skill_threads
+    assert turn.dev_log_info["entries"][-1]["title"] == "request_model"
@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+
+from backend.db import models
+from backend.modules.knowledge.services.embedding_store import content_key, gc_embedding_store, lookup_embeddings
+from conftest import KeywordEngine, stub_retriever
+
+
+def _entry(db, worldbook_id, entry_id, content):
+    entry = models.WorldbookEntry(user_id=None, worldbook_id=worldbook_id, entry_id=entry_id, category="lore", title="shared", content=content)
+    db.add(entry)
+    db.commit()
+    return entry
+
+
+def test_identical_content_is_embedded_once_across_worldbooks(db_session):
+    first = [_entry(db_session, "Wstore01", "a1", "the river"), _entry(db_session, "Wstore01", "a2", "the  river")]
+    second = [_entry(db_session, "Wstore02", "b1", "the river\n"), _entry(db_session, "Wstore02", "b2", "a castle")]
+    engine = KeywordEngine()
+
+    first_vectors = stub_retriever(db_session, engine, worldbook_id="Wstore01").compute_entry_embeddings(first)
+    second_vectors = stub_retriever(db_session, engine, worldbook_id="Wstore02").compute_entry_embeddings(second)
+
+    assert len(engine.texts) == 2
+    assert first_vectors["a1"] == first_vectors["a2"] == second_vectors["b1"]
+    assert db_session.query(models.WorldbookEmbedding).count() == 4
+    assert db_session.query(models.EmbeddingContentCache).count() == 2
+    stored = db_session.query(models.EmbeddingContentCache).filter(models.EmbeddingContentCache.text_hash == content_key("shared the river")).one()
+    assert stored.hit_count == 1
+
+
+def test_store_is_scoped_by_model_and_skipped_for_tfidf(db_session):
+    entry = _entry(db_session, "Wstore01", "a1", "the river")
+    stub_retriever(db_session, KeywordEngine(), worldbook_id="Wstore01").compute_entry_embeddings([entry])
+
+    assert lookup_embeddings(db_session, "other:", [content_key("shared the river")]) == {}
+    stub_retriever(db_session, KeywordEngine(), provider="tfidf", worldbook_id="Wstore01").compute_entry_embeddings([entry], use_cache=False)
+    assert db_session.query(models.EmbeddingContentCache).count() == 1
+
+
+def test_gc_removes_idle_vectors(db_session):
+    entry = _entry(db_session, "Wstore01", "a1", "the river")
+    stub_retriever(db_session, KeywordEngine(), worldbook_id="Wstore01").compute_entry_embeddings([entry])
+    db_session.query(models.EmbeddingContentCache).update({models.EmbeddingContentCache.last_used_at: datetime.utcnow() - timedelta(days=45)})
+    db_session.commit()
+
+    assert gc_embedding_store(db_session, max_idle_days=60) == 0
+    assert gc_embedding_store(db_session, max_idle_days=30) == 1
+    assert db_session.query(models.EmbeddingContentCache).count() == 0
@@ -0,0 +1,42 @@
+import threading
+
+import pytest
+
+from backend.modules.knowledge.services import model_registry
+from backend.modules.knowledge.services.embeddings_config import EmbeddingError
+
+
+@pytest.fixture(autouse=True)
+def fake_loader(monkeypatch):
+    loads = []
+
+    def load(model_name):
+        loads.append(model_name)
+        if model_name == "broken":
+            raise OSError("missing weights")
+        return object()
+
+    model_registry.reset_models()
+    monkeypatch.setitem(model_registry.MODEL_LOADERS, "fake", load)
+    yield loads
+    model_registry.reset_models()
+
+
+def test_get_model_loads_once_across_threads(fake_loader):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(model_registry.get_model("fake", "mini"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert fake_loader == ["mini"]
+    assert len({id(model) for model in results}) == 1
+    assert "fake/mini" in model_registry.model_load_seconds()
+
+
+def test_failed_load_is_cached_and_reported_by_warmup(fake_loader):
+    assert model_registry.warmup_models([("fake", "broken"), ("fake", "mini")]) == {("fake", "broken"): False, ("fake", "mini"): True}
+    with pytest.raises(EmbeddingError):
+        model_registry.get_model("fake", "broken")
+    assert fake_loader == ["broken", "mini"]
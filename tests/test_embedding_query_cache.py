@@ -0,0 +1,37 @@
+from backend.modules.knowledge.services import embeddings_engine
+from backend.modules.knowledge.services.embeddings_config import EmbeddingConfig
+from backend.modules.knowledge.services.embeddings_engine import EmbeddingEngine
+from backend.modules.knowledge.services.retrieval_cache import query_embedding_cache
+
+
+def test_query_embeddings_are_cached_per_model_and_text(monkeypatch):
+    calls = []
+
+    def fake_batched(texts, base_url, api_key, model="", **kwargs):
+        calls.append((model, list(texts)))
+        return [[float(len(text)), 1.0] for text in texts]
+
+    monkeypatch.setattr(embeddings_engine, "openai_embeddings_batched", fake_batched)
+    query_embedding_cache.clear()
+    before = query_embedding_cache.stats()
+    engine = EmbeddingEngine(EmbeddingConfig(provider="openai", model="m1", base_url="http://embed", api_key="k"))
+    other_model = EmbeddingEngine(EmbeddingConfig(provider="openai", model="m2", base_url="http://embed", api_key="k"))
+
+    first = engine.compute_single("dragon castle")
+    first.append(99.0)
+    assert engine.compute_single("dragon  castle ") == [13.0, 1.0]
+    assert EmbeddingEngine(engine.config).compute_single("dragon castle") == [13.0, 1.0]
+    other_model.compute_single("dragon castle")
+
+    assert calls == [("m1", ["dragon castle"]), ("m2", ["dragon castle"])]
+    stats = query_embedding_cache.stats()
+    assert (stats["hits"] - before["hits"], stats["misses"] - before["misses"]) == (2, 2)
+
+
+def test_tfidf_query_embeddings_are_not_shared():
+    query_embedding_cache.clear()
+    engine = EmbeddingEngine(EmbeddingConfig(provider="tfidf"))
+    engine.compute_embeddings(["dragon castle", "river"])
+    engine.compute_single("dragon")
+
+    assert len(query_embedding_cache) == 0
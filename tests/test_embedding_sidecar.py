@@ -0,0 +1,73 @@
+import threading
+
+import pytest
+
+from backend.modules.knowledge.services import embedding_sidecar, model_registry
+from backend.modules.knowledge.services.embedding_sidecar import close_sidecar_clients, create_sidecar_server, sidecar_embeddings
+from backend.modules.knowledge.services.embeddings_config import EmbeddingConfig, EmbeddingError
+from backend.modules.knowledge.services.embeddings_engine import EmbeddingEngine
+
+
+class FakeEncoder:
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, model, texts):
+        self.batches.append(list(texts))
+        return [[float(len(text)), 1.0, 0.5] for text in texts]
+
+
+@pytest.fixture(params=["http", "unix"])
+def sidecar(request, tmp_path):
+    encoder = FakeEncoder()
+    address = "http://127.0.0.1:0" if request.param == "http" else f"unix://{tmp_path / 'embed.sock'}"
+    server = create_sidecar_server(address, encoder, lambda: {"mini": 3}, max_batch_size=64, max_wait_ms=50)
+    url = f"http://127.0.0.1:{server.server_address[1]}" if request.param == "http" else address
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield url, encoder
+    finally:
+        server.shutdown()
+        server.server_close()
+        server.batcher.close()
+        close_sidecar_clients()
+
+
+def test_concurrent_callers_share_forward_passes(sidecar):
+    url, encoder = sidecar
+    results = {}
+
+    def call(idx):
+        results[idx] = sidecar_embeddings(url, "mini", ["x" * idx, "y" * (idx + 1)])
+
+    threads = [threading.Thread(target=call, args=(idx,)) for idx in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {idx: [[float(idx), 1.0, 0.5], [float(idx + 1), 1.0, 0.5]] for idx in range(8)}
+    assert sum(len(batch) for batch in encoder.batches) == 16
+    assert len(encoder.batches) < 8
+
+
+def test_engine_uses_sidecar_without_loading_a_local_model(sidecar, monkeypatch):
+    url, _ = sidecar
+    model_registry.reset_models()
+    monkeypatch.setitem(model_registry.MODEL_LOADERS, "sentence_transformers", lambda name: pytest.fail("model loaded in worker"))
+
+    engine = EmbeddingEngine(EmbeddingConfig(provider="sentence_transformers", model="mini", sidecar_url=url), load_model=False)
+
+    assert engine.config.provider == "sentence_transformers"
+    assert engine.config.dimension == 3
+    assert engine.compute_embeddings(["ab", "abcd"]) == [[2.0, 1.0, 0.5], [4.0, 1.0, 0.5]]
+
+
+def test_unreachable_sidecar_falls_back_to_tfidf(tmp_path):
+    engine = EmbeddingEngine(EmbeddingConfig(provider="sentence_transformers", model="mini", sidecar_url=f"unix://{tmp_path / 'missing.sock'}"))
+    assert engine.config.provider == "tfidf"
+    with pytest.raises(EmbeddingError):
+        sidecar_embeddings(f"unix://{tmp_path / 'missing.sock'}", "mini", ["text"])
+    close_sidecar_clients()
+    assert embedding_sidecar._dimensions == {}
@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+from backend.db import models
+from backend.modules.knowledge.services.embeddings_codec import decode_embedding, encode_embedding, load_stored_embedding
+from backend.modules.knowledge.services.embeddings_config import EmbeddingConfig
+from backend.modules.knowledge.services.retriever import RAGRetriever
+
+
+@pytest.mark.parametrize("dtype, tolerance", [("float32", 1e-6), ("float16", 1e-3), ("int8", 1e-2)])
+def test_embedding_codec_round_trip(dtype, tolerance):
+    vector = [0.125, -0.5, 0.75, 0.0, 0.333]
+
+    blob = encode_embedding(vector, dtype)
+
+    assert decode_embedding(blob, dtype, len(vector)) == pytest.approx(vector, abs=tolerance)
+    assert len(blob) < len(json.dumps(vector))
+
+
+def test_load_stored_embedding_falls_back_to_legacy_json():
+    assert load_stored_embedding(None, None, 2, "[0.1, 0.2]") == [0.1, 0.2]
+
+
+def test_retriever_writes_binary_embedding_cache(db_session):
+    entry = models.WorldbookEntry(user_id=None, worldbook_id="Wblob001", entry_id="e_blob", category="lore", title="Title", content="Content", meta_json="{}")
+    db_session.add(entry)
+    db_session.commit()
+    retriever = RAGRetriever(db_session, EmbeddingConfig(provider="stub", storage_dtype="float16"))
+
+    retriever._save_embedding_cache(entry, [0.5, -0.25, 1.0], "hash")
+
+    row = db_session.query(models.WorldbookEmbedding).one()
+    assert row.embedding_json is None
+    assert row.embedding_dtype == "float16"
+    assert len(row.embedding_blob) == 6
+    assert retriever._get_embedding_cache(entry)[0] == [0.5, -0.25, 1.0]
@@ -0,0 +1,98 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from backend.modules.knowledge.services import embeddings_openai
+from backend.modules.knowledge.services.embeddings_config import EmbeddingConfig, EmbeddingError
+from backend.modules.knowledge.services.embeddings_engine import EmbeddingEngine
+
+
+class StubEmbeddingServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubEmbeddingHandler)
+        self.requests = []
+        self.connections = set()
+        self.fail_next = []
+        self.lock = threading.Lock()
+
+
+class StubEmbeddingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.server.lock:
+            self.server.connections.add(self.client_address)
+            self.server.requests.append(len(body["input"]))
+            status = self.server.fail_next.pop(0) if self.server.fail_next else 200
+        if status != 200:
+            payload = b'{"error": "busy"}'
+            self.send_response(status)
+            self.send_header("Retry-After", "0")
+        else:
+            payload = json.dumps({"data": [{"index": idx, "embedding": [float(len(text)), 1.0]} for idx, text in enumerate(body["input"])]}).encode()
+            self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+@pytest.fixture()
+def stub_server():
+    server = StubEmbeddingServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    embeddings_openai.close_shared_client()
+    try:
+        yield server
+    finally:
+        embeddings_openai.close_shared_client()
+        server.shutdown()
+        server.server_close()
+
+
+def _engine(server, **overrides):
+    config = EmbeddingConfig(provider="openai", model="stub-embed", base_url=f"http://127.0.0.1:{server.server_address[1]}/v1", api_key="sk-test", **overrides)
+    return EmbeddingEngine(config)
+
+
+def test_large_import_embeds_in_few_pooled_requests(stub_server):
+    texts = [f"entry number {idx}" for idx in range(3000)]
+
+    vectors = _engine(stub_server, max_in_flight=4).compute_embeddings(texts)
+
+    assert [vector[0] for vector in vectors] == [float(len(text)) for text in texts]
+    assert len(stub_server.requests) == 12
+    assert sum(stub_server.requests) == 3000
+    assert len(stub_server.connections) <= 4
+
+
+def test_retries_rate_limited_and_server_errors(stub_server):
+    stub_server.fail_next = [429, 503]
+
+    vectors = _engine(stub_server).compute_embeddings(["a", "bb"])
+
+    assert vectors == [[1.0, 1.0], [2.0, 1.0]]
+    assert stub_server.requests == [2, 2, 2]
+
+
+def test_gives_up_after_max_retries(stub_server):
+    stub_server.fail_next = [500, 500]
+
+    with pytest.raises(EmbeddingError, match="HTTP 500"):
+        _engine(stub_server, max_retries=1).compute_embeddings(["a"])
+
+
+def test_plan_batches_respects_token_budget():
+    texts = ["龙" * 60, "龙" * 60, "dragon " * 10, "x"]
+
+    assert embeddings_openai.plan_batches(texts, max_batch_tokens=100, max_batch_size=10) == [(0, 1), (1, 4)]
+    assert embeddings_openai.plan_batches(texts, max_batch_tokens=1000, max_batch_size=2) == [(0, 2), (2, 4)]
@@ -0,0 +1,45 @@
+import random
+
+import pytest
+
+from backend.modules.knowledge.services import embeddings_similarity
+from backend.modules.knowledge.services.embeddings_similarity import cosine_similarity, python_cosine_similarity, python_top_k_similar, similarity_matrix, top_k_similar
+
+
+def _vectors(count, dimension, seed):
+    rng = random.Random(seed)
+    return [[rng.uniform(-1, 1) for _ in range(dimension)] for _ in range(count)]
+
+
+def test_numpy_top_k_matches_python_reference_with_chunking():
+    candidates = _vectors(500, 16, seed=1) + [[0.0] * 16]
+    query = _vectors(1, 16, seed=2)[0]
+
+    expected = python_top_k_similar(query, candidates, top_k=10)
+
+    for chunk_size in (None, 7, 128):
+        results = top_k_similar(query, candidates, top_k=10, chunk_size=chunk_size)
+        assert [idx for idx, _ in results] == [idx for idx, _ in expected]
+        assert [score for _, score in results] == pytest.approx([score for _, score in expected], abs=1e-5)
+
+
+def test_similarity_matrix_and_cosine_match_python_reference():
+    queries = _vectors(3, 8, seed=3)
+    candidates = _vectors(20, 8, seed=4)
+
+    matrix = similarity_matrix(queries, candidates, chunk_size=6)
+
+    for row, query in zip(matrix, queries):
+        assert row == pytest.approx([python_cosine_similarity(query, candidate) for candidate in candidates], abs=1e-5)
+    assert cosine_similarity([1.0, 0.0], [0.0, 0.0]) == 0.0
+    with pytest.raises(ValueError):
+        top_k_similar([1.0, 0.0], [[1.0, 0.0, 0.0]])
+
+
+def test_pure_python_fallback_without_numpy(monkeypatch):
+    monkeypatch.setattr(embeddings_similarity, "np", None)
+    candidates = [[1.0, 0.0], [0.0, 1.0], [0.7, 0.7]]
+
+    assert [idx for idx, _ in top_k_similar([1.0, 0.1], candidates, top_k=2)] == [0, 2]
+    assert similarity_matrix([[0.0, 2.0]], candidates)[0] == pytest.approx([0.0, 1.0, 0.7071067811865475])
+    assert cosine_similarity([3.0, 4.0], [3.0, 4.0]) == pytest.approx(1.0)
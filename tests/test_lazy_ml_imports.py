@@ -0,0 +1,109 @@
+import json
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+from backend.config import Settings
+from backend.modules.knowledge.services import embeddings_engine, model_registry
+from backend.modules.knowledge.services.embeddings_config import DEFAULT_SENTENCE_TRANSFORMER_MODEL, EmbeddingConfig
+from backend.modules.knowledge.services.embeddings_engine import EmbeddingEngine
+from backend.modules.knowledge.services.retrieval_queries import create_retriever
+
+HEAVY_MODULES = ("torch", "sentence_transformers", "transformers")
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_importing_app_does_not_import_ml_frameworks():
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import backend.main"], cwd=ROOT, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr[-2000:]
+    imported = {line.rsplit("|", 1)[-1].strip().split(".")[0] for line in result.stderr.splitlines() if line.startswith("import time:")}
+    assert imported and not imported.intersection(HEAVY_MODULES)
+
+
+@pytest.fixture()
+def slow_loader(monkeypatch):
+    release = threading.Event()
+    loads = []
+
+    def load(model_name):
+        loads.append((threading.current_thread().name, model_name))
+        release.wait(5)
+        return type("Model", (), {"get_sentence_embedding_dimension": lambda self: 8})()
+
+    model_registry.reset_models()
+    monkeypatch.setitem(model_registry.MODEL_LOADERS, "sentence_transformers", load)
+    yield loads, release
+    release.set()
+    model_registry.reset_models()
+
+
+def test_request_path_never_loads_a_model_until_explicit_warmup(slow_loader, db_session):
+    loads, release = slow_loader
+    cold = create_retriever(db_session).engine
+    assert cold.config.provider == "tfidf"
+    assert loads == [] and not any(thread.name == "embedding-warmup" for thread in threading.enumerate())
+
+    release.set()
+    model_registry.warmup_in_background([("sentence_transformers", DEFAULT_SENTENCE_TRANSFORMER_MODEL)])
+    for thread in threading.enumerate():
+        if thread.name == "embedding-warmup":
+            thread.join(5)
+    warm = create_retriever(db_session).engine
+
+    assert loads == [("embedding-warmup", DEFAULT_SENTENCE_TRANSFORMER_MODEL)]
+    assert warm.config.provider == "sentence_transformers"
+
+
+def test_degrading_to_tfidf_is_logged_once(slow_loader, monkeypatch, capsys):
+    monkeypatch.setattr(embeddings_engine, "_degraded_models", set())
+    engines = [EmbeddingEngine(EmbeddingConfig(provider="sentence_transformers", model=DEFAULT_SENTENCE_TRANSFORMER_MODEL), load_model=False) for _ in range(3)]
+
+    assert [engine.config.provider for engine in engines] == ["tfidf"] * 3
+    assert capsys.readouterr().out.count("falls back to TF-IDF") == 1
+
+
+def test_startup_warmup_is_on_by_default():
+    assert Settings.model_fields["embedding_warmup"].default is True
+
+
+REQUEST_PATH_RETRIEVAL = """
+import json, sys, threading
+attempts = []
+
+class Spy:
+    def find_spec(self, name, path=None, target=None):
+        if name.split(".")[0] in {heavy!r}:
+            attempts.append(name)
+        return None
+
+sys.meta_path.insert(0, Spy())
+import backend.main
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from backend.db import models
+from backend.db.base import Base
+from backend.modules.knowledge.services.retrieval_queries import create_retriever
+
+engine = create_engine("sqlite://", connect_args={{"check_same_thread": False}}, poolclass=StaticPool)
+Base.metadata.create_all(engine)
+db = sessionmaker(bind=engine)()
+db.add(models.WorldbookEntry(worldbook_id="Wlazy001", entry_id="e1", category="lore", title="dragon", content="red dragon", meta_json=json.dumps({{"enabled": True}})))
+db.commit()
+results = create_retriever(db, worldbook_id="Wlazy001").semantic_search("dragon", top_k=1)
+for thread in threading.enumerate():
+    if thread.name == "embedding-warmup":
+        thread.join(5)
+print(json.dumps({{"results": len(results), "attempts": attempts}}))
+"""
+
+
+def test_request_path_retrieval_does_not_import_ml_frameworks():
+    script = REQUEST_PATH_RETRIEVAL.format(heavy=HEAVY_MODULES)
+    result = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr[-2000:]
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    assert report == {"results": 1, "attempts": []}
@@ -0,0 +1,114 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from backend.modules.system.services import llm_clients
+from backend.modules.system.services.llm_chat import chat_completion, chat_completion_async
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if payload.get("stream"):
+            body = "".join(f"data: {json.dumps({'choices': [{'delta': {'content': piece}}]})}\n\n" for piece in ["夜", "雨"]) + "data: [DONE]\n\n"
+            content_type = "text/event-stream"
+        else:
+            body = json.dumps({"choices": [{"message": {"content": "{}"}}]})
+            content_type = "application/json"
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture()
+def mock_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockOpenAIHandler)
+    server.daemon_threads = True
+    server.connections = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield server, f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        asyncio.run(llm_clients.close_llm_clients())
+        server.shutdown()
+        server.server_close()
+
+
+def test_turns_reuse_one_connection_per_provider(mock_server):
+    server, base_url = mock_server
+    for _ in range(3):
+        _, stream = chat_completion(base_url, "key", "mock", [], stream=True)
+        assert "".join(stream) == "夜雨"
+        assert chat_completion(base_url, "key", "mock", [], stream=False) == ("{}", None)
+
+    assert server.connections == 1
+    assert llm_clients.llm_client(base_url) is llm_clients.llm_client(base_url + "/v1/")
+
+
+def test_async_client_is_pooled_per_event_loop(mock_server):
+    server, base_url = mock_server
+
+    async def turn():
+        _, stream = await chat_completion_async(base_url, "key", "mock", [], stream=True)
+        text = "".join([delta async for delta in stream])
+        content, _ = await chat_completion_async(base_url, "key", "mock", [], stream=False)
+        return text, content
+
+    async def run():
+        results = [await turn() for _ in range(3)]
+        await llm_clients.close_llm_clients()
+        return results
+
+    assert asyncio.run(run()) == [("夜雨", "{}")] * 3
+    assert server.connections == 1
+    assert asyncio.run(run()) == [("夜雨", "{}")] * 3
+    assert server.connections == 2
+
+
+
+async def _pooled_async_client(base_url):
+    client = llm_clients.llm_async_client(base_url)
+    await asyncio.sleep(0.05)  # lets a scheduled close of the replaced client run
+    return client
+
+
+def test_client_from_a_finished_loop_is_closed_when_replaced(mock_server):
+    _, base_url = mock_server
+
+    stale = asyncio.run(_pooled_async_client(base_url))
+    fresh = asyncio.run(_pooled_async_client(base_url))
+
+    assert stale.is_closed and not fresh.is_closed
+
+
+def test_client_of_a_running_loop_is_closed_on_that_loop(mock_server):
+    _, base_url = mock_server
+    owner = asyncio.new_event_loop()
+    thread = threading.Thread(target=owner.run_forever, daemon=True)
+    thread.start()
+    try:
+        stale = asyncio.run_coroutine_threadsafe(_pooled_async_client(base_url), owner).result(5)
+        fresh = asyncio.run(_pooled_async_client(base_url))
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0.05), owner).result(5)
+
+        assert stale.is_closed and not fresh.is_closed
+    finally:
+        owner.call_soon_threadsafe(owner.stop)
+        thread.join(5)
+        owner.close()
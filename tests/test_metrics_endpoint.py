@@ -0,0 +1,109 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import QueuePool
+
+import backend.main  # noqa: F401  (loads the story and agent packages in dependency order)
+from backend.core import orchestrator
+from backend.db.base import get_db
+from backend.modules.system.services import metrics as metrics_module
+from backend.modules.system.services.metrics import Histogram, MetricsRegistry, RequestMetricsMiddleware
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("demo_seconds", "Demo.", buckets=(0.1, 1.0), labels=("route",))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        histogram.observe(value, '/a"b')
+
+    lines = histogram.render()
+
+    assert lines[:2] == ["# HELP demo_seconds Demo.", "# TYPE demo_seconds histogram"]
+    assert 'demo_seconds_bucket{route="/a\\"b",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{route="/a\\"b",le="1"} 3' in lines
+    assert 'demo_seconds_bucket{route="/a\\"b",le="+Inf"} 4' in lines
+    assert 'demo_seconds_sum{route="/a\\"b"} 4.05' in lines
+    assert 'demo_seconds_count{route="/a\\"b"} 4' in lines
+
+
+def test_failing_collector_does_not_break_the_scrape():
+    registry = MetricsRegistry()
+    registry.histogram("ok_seconds", "Ok.").observe(0.2)
+
+    def broken():
+        raise RuntimeError("boom")
+
+    registry.register_collector(broken)
+    registry.register_collector(lambda: [("up", "gauge", "Up.", [({}, 1)])])
+    text = registry.render()
+
+    assert "ok_seconds_count 1" in text and "collector broken failed: RuntimeError" in text
+    assert "# TYPE up gauge\nup 1" in text
+
+
+def test_metrics_endpoint_reports_stream_and_request_timings(monkeypatch):
+    async def fake_generate(**kwargs):
+        async def deltas():
+            for piece in ("<正文部分>", "雨夜", "</正文部分>"):
+                yield piece
+
+        return "", SimpleNamespace(), deltas(), None, {}
+
+    async def fake_finalize(*args, **kwargs):
+        return {"dev_log_info": {}, "segment_id": "seg"}
+
+    monkeypatch.setattr(orchestrator, "generate_story_text_async", fake_generate)
+    monkeypatch.setattr(orchestrator, "finalize_agent_turn_async", fake_finalize)
+    monkeypatch.setattr(orchestrator, "is_valid_story_content", lambda text: True)
+    backend.main.app.dependency_overrides[get_db] = lambda: None
+    ttft_before = sum(item["count"] for item in metrics_module.STREAM_TTFT_SECONDS.snapshot().values())
+    try:
+        client = TestClient(backend.main.app)
+        response = client.post("/api/story/generate_stream", json={"session_id": "S_METRICS", "user_input": "继续"})
+        scrape = client.get("/metrics")
+    finally:
+        backend.main.app.dependency_overrides.pop(get_db, None)
+
+    assert "event: done" in response.text
+    assert scrape.status_code == 200 and scrape.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert sum(item["count"] for item in metrics_module.STREAM_TTFT_SECONDS.snapshot().values()) == ttft_before + 1
+    assert 'storyteller_http_request_duration_seconds_count{method="POST",route="/api/story/generate_stream",status="200"}' in scrape.text
+    assert "# TYPE storyteller_story_stream_duration_seconds histogram" in scrape.text
+    assert "storyteller_llm_output_chars_per_second_count" in scrape.text
+    assert 'storyteller_cache_hit_ratio{cache="story_results"}' in scrape.text
+
+
+@pytest.mark.parametrize(
+    "route_path, request_path, expected",
+    [
+        ("/sessions/{session_id}/segments", "/api/sessions/s/segments", "/api/sessions/{session_id}/segments"),
+        ("/profiles/{profile_id}/toggle", "/api/profiles/t/toggle", "/api/profiles/{profile_id}/toggle"),
+        ("/sessions/{session_id}/segments/{segment_id}", "/api/sessions/S_1/segments/S_1", "/api/sessions/{session_id}/segments/{segment_id}"),
+    ],
+)
+@pytest.mark.parametrize("root_path", ["", "/root"])
+def test_route_template_uses_the_matched_route(route_path, request_path, expected, root_path):
+    router = APIRouter()
+    router.add_api_route(route_path, lambda: {})
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    app.add_middleware(RequestMetricsMiddleware)
+    metrics_module.REQUEST_SECONDS.clear()
+
+    assert TestClient(app, root_path=root_path).get(request_path).status_code == 200
+    assert list(metrics_module.REQUEST_SECONDS.snapshot()) == [("GET", expected, "200")]
+    assert metrics_module.route_template({"path": "/nope"}) == "unmatched"
+
+
+def test_timed_pool_times_connection_checkout(tmp_path):
+    pool_class = metrics_module.timed_pool_class(QueuePool)
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.sqlite'}", poolclass=pool_class)
+    before = sum(item["count"] for item in metrics_module.DB_POOL_WAIT_SECONDS.snapshot().values())
+    for _ in range(3):
+        with engine.connect() as conn:
+            conn.execute(text("select 1"))
+
+    assert metrics_module.timed_pool_class(QueuePool) is pool_class and isinstance(engine.pool, QueuePool)
+    assert sum(item["count"] for item in metrics_module.DB_POOL_WAIT_SECONDS.snapshot().values()) == before + 3
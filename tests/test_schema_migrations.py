@@ -0,0 +1,72 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from backend.config import Settings
+from backend.scripts import migrate
+
+
+@pytest.fixture()
+def fake_migrations(monkeypatch):
+    applied = []
+    monkeypatch.setattr(migrate, "engine", create_engine("sqlite://", poolclass=StaticPool))
+    monkeypatch.setattr(migrate, "MIGRATIONS", [(1, "first", lambda: applied.append(1)), (2, "second", lambda: applied.append(2)), (3, "third", lambda: applied.append(3))])
+    monkeypatch.setattr(migrate, "LATEST_VERSION", 3)
+    return applied
+
+
+def test_migrate_applies_pending_steps_once_in_order(fake_migrations):
+    assert migrate.current_version() == 0
+    assert migrate.migrate(target=2) == 2
+    assert migrate.migrate() == 1
+    assert migrate.migrate() == 0
+
+    assert fake_migrations == [1, 2, 3]
+    with migrate.engine.connect() as conn:
+        assert [row.name for row in conn.execute(text("SELECT name FROM schema_version ORDER BY version"))] == ["first", "second", "third"]
+
+
+def test_ensure_schema_only_checks_when_current(fake_migrations):
+    with pytest.raises(RuntimeError):
+        migrate.ensure_schema(auto_migrate=False)
+    assert migrate.ensure_schema(auto_migrate=True) == 3
+    assert migrate.ensure_schema(auto_migrate=False) == 3
+    assert fake_migrations == [1, 2, 3]
+
+
+def test_auto_migrate_defaults_to_sqlite_only():
+    assert Settings(database_url="sqlite:///./data/db.sqlite").resolved_auto_migrate is True
+    assert Settings(database_url="postgresql+psycopg://u:p@localhost/db").resolved_auto_migrate is False
+    assert Settings(database_url="sqlite:///./data/db.sqlite", auto_migrate=False).resolved_auto_migrate is False
+
+
+def test_startup_failure_names_the_migration_command(fake_migrations):
+    with pytest.raises(RuntimeError, match="python -m backend.scripts.migrate"):
+        migrate.ensure_schema(auto_migrate=False)
+
+
+def test_concurrent_runners_apply_each_version_once(monkeypatch, tmp_path):
+    applied = []
+    monkeypatch.setattr(migrate, "engine", create_engine(f"sqlite:///{tmp_path / 'race.sqlite'}", connect_args={"timeout": 30}))
+    monkeypatch.setattr(migrate, "MIGRATIONS", [(1, "slow", lambda: (time.sleep(0.2), applied.append(1))), (2, "second", lambda: applied.append(2))])
+    monkeypatch.setattr(migrate, "LATEST_VERSION", 2)
+    errors = []
+
+    def run():
+        try:
+            migrate.ensure_schema(auto_migrate=True)
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert applied == [1, 2]
+    assert (tmp_path / "race.sqlite.migrate.lock").exists()
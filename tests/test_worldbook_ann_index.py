@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from backend.modules.knowledge.services import ann_index
+from backend.modules.knowledge.services.ann_index import IvfIndex
+from backend.modules.knowledge.services.retriever import RAGRetriever
+from backend.modules.knowledge.services.vector_index import VectorIndex
+
+
+def _clustered(count, dimension=16, clusters=32, seed=3):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimension))
+    return (centers[rng.integers(0, clusters, count)] + rng.normal(scale=0.1, size=(count, dimension))).astype(np.float32)
+
+
+@pytest.fixture()
+def small_ivf(monkeypatch):
+    monkeypatch.setattr(ann_index, "IVF_MIN_ENTRIES", 256)
+
+
+def test_ivf_recall_tracks_exact_search_and_nprobe(small_ivf, tmp_path):
+    vectors = _clustered(2000)
+    ids = [f"e{idx}" for idx in range(len(vectors))]
+    exact = VectorIndex(vectors.shape[1])
+    exact.add(ids, vectors)
+    ivf = IvfIndex(vectors.shape[1], nprobe=4, path=tmp_path / "index.npz")
+    ivf.add(ids[:100], vectors[:100])
+    assert ivf.centroids is None
+    ivf.add(ids[100:], vectors[100:])
+
+    queries = _clustered(20, seed=11)
+    recall = {}
+    for nprobe in (1, 16):
+        hits = sum(len({entry_id for entry_id, _ in exact.search(query, 10)} & {entry_id for entry_id, _ in ivf.search(query, 10, nprobe=nprobe)}) for query in queries)
+        recall[nprobe] = hits / (10 * len(queries))
+
+    assert recall[16] >= 0.95
+    assert recall[16] >= recall[1]
+    assert IvfIndex(vectors.shape[1], path=tmp_path / "index.npz").centroids.shape == ivf.centroids.shape
+
+
+def test_ivf_respects_allowed_ids_and_updates(small_ivf):
+    vectors = _clustered(1000)
+    ids = [f"e{idx}" for idx in range(len(vectors))]
+    ivf = IvfIndex(vectors.shape[1], nprobe=64)
+    ivf.add(ids, vectors)
+    allowed = set(ids[:600])
+
+    assert all(entry_id in allowed for entry_id, _ in ivf.search(vectors[700], 5, allowed=allowed))
+    ivf.add(["e0"], [vectors[999]])
+    assert {entry_id for entry_id, _ in ivf.search(vectors[999], 2)} == {"e0", "e999"}
+
+
+def test_retriever_rejects_unknown_index_backend():
+    with pytest.raises(ValueError):
+        RAGRetriever(None, index_backend="hnsw")
+
+
+@pytest.mark.parametrize("worldbook_id", ["../../etc/passwd", "a/b\\c", "..", "W\x00:*?"])
+def test_ann_index_path_stays_inside_the_index_dir(worldbook_id):
+    path = ann_index.ann_index_path((None, worldbook_id, "stub:"))
+
+    assert path.parent == ann_index.ANN_INDEX_DIR
+    assert path.name.endswith(".npz") and not path.name.startswith(".")
+    assert ann_index.ann_index_path((None, "Wann0001", "stub:")).name.startswith("Wann0001-")
@@ -2,7 +2,7 @@ import json
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
@@ -105,6 +105,32 @@ def test_cleanup_orphan_worldbook_embeddings_removes_mismatched_rows(db_session)
     assert rows[0].entry_id == "entry_ok"
 
 
+def test_cleanup_orphan_worldbook_embeddings_is_one_scoped_statement(db_session):
+    db_session.add(models.WorldbookEntry(worldbook_id="Wvalid01", entry_id="entry_ok", user_id=None, category="lore", title="Title", content="Content"))
+    db_session.add_all(
+        [
+            models.WorldbookEmbedding(user_id=None, worldbook_id="Wmoved01", entry_id="entry_ok", embedding_json="[0.1]", content_hash="h1", embedding_model="tfidf", dimension=1),
+            models.WorldbookEmbedding(user_id="u_other", worldbook_id="Wghost01", entry_id="entry_gone", embedding_json="[0.2]", content_hash="h2", embedding_model="tfidf", dimension=1),
+            models.WorldbookEmbedding(user_id="u_me", worldbook_id="Wghost01", entry_id="entry_gone", embedding_json="[0.3]", content_hash="h3", embedding_model="tfidf", dimension=1),
+        ]
+    )
+    db_session.commit()
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db_session.get_bind(), "before_cursor_execute", count_statement)
+    try:
+        deleted = cleanup_orphan_worldbook_embeddings(db_session, user_id="u_me")
+    finally:
+        event.remove(db_session.get_bind(), "before_cursor_execute", count_statement)
+
+    assert deleted == 2
+    assert len(statements) == 1 and statements[0].startswith("DELETE") and "embedding_json" not in statements[0]
+    assert [row.user_id for row in db_session.query(models.WorldbookEmbedding).all()] == ["u_other"]
+
+
 def test_delete_worldbook_all_removes_embeddings_by_worldbook_id_even_if_orphaned(client, db_session):
     user = _create_user(db_session, "u_cleanup", "cleanup_user")
     db_session.add(
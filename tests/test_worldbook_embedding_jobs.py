@@ -0,0 +1,163 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from backend.db import models
+from backend.modules.knowledge.services import embedding_jobs
+from backend.modules.knowledge.services.embeddings_config import EmbeddingError
+from backend.modules.knowledge.services.retriever import RAGRetriever
+from backend.modules.worldbook.api.import_routes import get_embedding_job
+from conftest import KeywordEngine, stub_retriever
+
+
+class FlakyEngine(KeywordEngine):
+    def compute_embeddings(self, texts, batch_size=32):
+        if any("boom" in text for text in texts):
+            raise EmbeddingError("backend unavailable")
+        return super().compute_embeddings(texts, batch_size)
+
+
+@pytest.fixture(autouse=True)
+def stub(monkeypatch):
+    engine = FlakyEngine()
+    monkeypatch.setattr(embedding_jobs, "create_retriever", lambda db, user_id=None, **kwargs: stub_retriever(db, engine, user_id=user_id))
+    return engine
+
+
+def _seed(db, count, poisoned=()):
+    ids = []
+    for idx in range(count):
+        entry_id = f"e_{idx:03d}"
+        content = "boom" if idx in poisoned else f"entry {idx}"
+        db.add(models.WorldbookEntry(user_id=None, worldbook_id="Wjobs001", entry_id=entry_id, category="lore", title=f"title {idx}", content=content, meta_json=json.dumps({})))
+        ids.append(entry_id)
+    db.commit()
+    return ids
+
+
+def test_job_embeds_in_batches_and_reports_progress(session_factory):
+    db = session_factory()
+    job = embedding_jobs.create_embedding_job(db, _seed(db, 150), None, "Wjobs001")
+
+    embedding_jobs.run_embedding_job(job.job_id, session_factory=session_factory)
+
+    db.expire_all()
+    status = get_embedding_job(job.job_id, db=db, current_user=None)
+    assert (status.status, status.total, status.done, status.failed) == ("done", 150, 150, 0)
+    assert status.finished_at is not None
+    assert db.query(models.WorldbookEmbedding).count() == 150
+    db.close()
+
+
+def test_failed_batch_is_counted_and_job_continues(session_factory):
+    db = session_factory()
+    job = embedding_jobs.create_embedding_job(db, _seed(db, 100, poisoned={70}), None, "Wjobs001")
+
+    embedding_jobs.run_embedding_job(job.job_id, session_factory=session_factory)
+
+    db.expire_all()
+    status = get_embedding_job(job.job_id, db=db, current_user=None)
+    assert (status.status, status.done, status.failed) == ("done", embedding_jobs.EMBEDDING_JOB_BATCH, 100 - embedding_jobs.EMBEDDING_JOB_BATCH)
+    assert "backend unavailable" in status.error
+    db.close()
+
+
+def test_failure_after_vectors_commit_counts_the_batch_once(session_factory, monkeypatch):
+    db = session_factory()
+    job = embedding_jobs.create_embedding_job(db, _seed(db, 100), None, "Wjobs001")
+    calls = []
+
+    def reload_fails_once(self, entry_ids):
+        calls.append(len(entry_ids))
+        if len(calls) == 1:
+            raise RuntimeError("reload failed")
+
+    monkeypatch.setattr(RAGRetriever, "_reload_entries", reload_fails_once)
+    embedding_jobs.run_embedding_job(job.job_id, session_factory=session_factory)
+
+    db.expire_all()
+    stored = db.query(models.WorldbookEmbeddingJob).one()
+    batch = embedding_jobs.EMBEDDING_JOB_BATCH
+    assert (stored.cursor, stored.done, stored.failed) == (100, 100 - batch, batch)
+    assert calls == [batch, 100 - batch]
+    db.close()
+
+
+def test_interrupted_job_resumes_from_cursor(session_factory, monkeypatch, stub):
+    db = session_factory()
+    job = embedding_jobs.create_embedding_job(db, _seed(db, 100), None, "Wjobs001")
+    job.status, job.cursor, job.done = "running", 64, 64
+    job.updated_at = datetime.utcnow() - timedelta(hours=1)
+    db.commit()
+    submitted = []
+    monkeypatch.setattr(embedding_jobs, "submit_embedding_job", submitted.append)
+
+    assert embedding_jobs.resume_embedding_jobs(db) == 1
+    embedding_jobs.run_embedding_job(submitted[0], session_factory=session_factory)
+
+    db.expire_all()
+    assert stub.calls == 36
+    assert db.query(models.WorldbookEmbeddingJob).one().done == 100
+    db.close()
+
+
+def test_job_left_running_by_a_quick_restart_is_reclaimed_once_stale(session_factory, monkeypatch, stub):
+    db = session_factory()
+    job = embedding_jobs.create_embedding_job(db, _seed(db, 10), None, "Wjobs001")
+    job.status = "running"
+    db.commit()
+    submitted = []
+    monkeypatch.setattr(embedding_jobs, "submit_embedding_job", submitted.append)
+
+    assert embedding_jobs.resume_embedding_jobs(db) == 0
+    assert not embedding_jobs._claim(db, job.job_id)
+
+    job.updated_at = datetime.utcnow() - embedding_jobs.STALE_RUNNING_AFTER - timedelta(seconds=1)
+    db.commit()
+    assert embedding_jobs.resume_embedding_jobs(db) == 1
+    embedding_jobs.run_embedding_job(job.job_id, session_factory=session_factory)
+    embedding_jobs.run_embedding_job(job.job_id, session_factory=session_factory)
+
+    db.expire_all()
+    assert (db.query(models.WorldbookEmbeddingJob).one().status, stub.calls) == ("done", 10)
+    assert submitted == [job.job_id] and embedding_jobs.resume_embedding_jobs(db) == 0
+    db.close()
+
+
+def test_sweeper_resubmits_claimable_jobs_until_shutdown(monkeypatch):
+    sweeps = []
+    monkeypatch.setattr(embedding_jobs, "SessionLocal", lambda: type("Session", (), {"close": lambda self: None})())
+    monkeypatch.setattr(embedding_jobs, "resume_embedding_jobs", lambda db: sweeps.append(db) or 0)
+
+    embedding_jobs.start_embedding_sweeper(interval=0.01)
+    deadline = datetime.utcnow() + timedelta(seconds=5)
+    while len(sweeps) < 2 and datetime.utcnow() < deadline:
+        embedding_jobs._stopping.wait(0.01)
+    embedding_jobs.shutdown_embedding_worker()
+
+    assert len(sweeps) >= 2 and not embedding_jobs._sweeper.is_alive()
+
+
+def test_deleted_entries_are_not_counted_as_done(session_factory):
+    db = session_factory()
+    job = embedding_jobs.create_embedding_job(db, _seed(db, 10) + ["gone_1", "gone_2"], None, "Wjobs001")
+
+    embedding_jobs.run_embedding_job(job.job_id, session_factory=session_factory)
+
+    db.expire_all()
+    stored = db.query(models.WorldbookEmbeddingJob).one()
+    assert (stored.status, stored.total, stored.done, stored.failed) == ("done", 12, 10, 0)
+    db.close()
+
+
+def test_embedding_job_status_is_owner_scoped(session_factory):
+    db = session_factory()
+    db.add(models.User(user_id="owner", username="owner", password_hash="x"))
+    job = embedding_jobs.create_embedding_job(db, [], "owner", "Wjobs001")
+
+    with pytest.raises(HTTPException) as exc:
+        get_embedding_job(job.job_id, db=db, current_user=None)
+    assert exc.value.status_code == 404
+    db.close()
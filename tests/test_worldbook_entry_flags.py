@@ -0,0 +1,55 @@
+import json
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from backend.db import models
+from backend.modules.knowledge.services.embeddings_config import EmbeddingConfig
+from backend.modules.knowledge.services.retriever import RAGRetriever
+from backend.modules.story.services.runtime_context import filter_enabled_for_story
+from backend.scripts import migrate_worldbook_flags, migrate_worldbook_ids_shared
+
+
+def _entry(entry_id, category, meta, worldbook_id="Wflags01"):
+    return models.WorldbookEntry(user_id=None, worldbook_id=worldbook_id, entry_id=entry_id, category=category, title=entry_id, content=entry_id, meta_json=json.dumps(meta))
+
+
+def test_flags_follow_meta_and_category_writes(db_session):
+    entry = _entry("e1", " lore ", {"enabled": True})
+    db_session.add(entry)
+    db_session.commit()
+    assert (entry.is_enabled, entry.category_key) == (True, "lore")
+
+    entry.meta_json = json.dumps({"disabled": True})
+    entry.category = "place"
+    db_session.commit()
+    row = db_session.execute(text("SELECT is_enabled, category_key FROM worldbook WHERE entry_id = 'e1'")).one()
+    assert (bool(row[0]), row[1]) == (False, "place")
+
+
+def test_enabled_filters_run_in_sql(db_session):
+    db_session.add_all([_entry("on", "lore", {}), _entry("off", "lore", {"enabled": False}), _entry("muted", "place", {}), _entry("other", "place", {}, worldbook_id="Wflags02")])
+    db_session.commit()
+    retriever = RAGRetriever(db_session, EmbeddingConfig(provider="stub"), worldbook_id="Wflags01", disabled_categories={"place"})
+
+    assert [entry.entry_id for entry in retriever._filtered_entries()] == ["on"]
+    story_rows = filter_enabled_for_story(db_session.query(models.WorldbookEntry), {"Wflags01::place": False, "Wflags01::lore": True}).order_by(models.WorldbookEntry.entry_id).all()
+    assert [entry.entry_id for entry in story_rows] == ["on", "other"]
+
+
+def test_migration_adds_and_backfills_columns(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.sqlite'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE worldbook (id INTEGER PRIMARY KEY, category VARCHAR, meta_json TEXT)"))
+        conn.execute(text("INSERT INTO worldbook (category, meta_json) VALUES (' lore ', '{\"disable\": true}'), (NULL, NULL), ('place', 'not json')"))
+    monkeypatch.setattr(migrate_worldbook_flags, "engine", engine)
+    monkeypatch.setattr(migrate_worldbook_ids_shared, "engine", engine)
+
+    migrate_worldbook_flags.migrate_worldbook_flags(batch_size=2)
+    migrate_worldbook_flags.migrate_worldbook_flags(batch_size=2)
+
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT is_enabled, category_key FROM worldbook ORDER BY id")).all()
+        indexes = {row[1] for row in conn.execute(text("PRAGMA index_list('worldbook')"))}
+    assert [(bool(enabled), key) for enabled, key in rows] == [(False, "lore"), (True, ""), (True, "place")]
+    assert {"ix_worldbook_is_enabled", "ix_worldbook_category_key"} <= indexes
@@ -0,0 +1,82 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.db import models
+from backend.db.base import get_db
+from backend.main import app
+from backend.modules.knowledge.services.embeddings_config import EmbeddingConfig
+from backend.modules.knowledge.services.lexical_index import ensure_lexical_index, lexical_terms, search_lexical, update_lexical_index
+from backend.modules.knowledge.services.retriever import RAGRetriever
+from backend.modules.worldbook.api import import_routes
+
+
+@pytest.fixture()
+def db_session(db_engine, db_session):
+    ensure_lexical_index(db_engine)
+    return db_session
+
+
+@pytest.fixture()
+def client(db_session, monkeypatch):
+    def override_get_db():
+        yield db_session
+
+    monkeypatch.setattr(import_routes, "submit_embedding_job", lambda job_id: None)
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
+
+
+def _entry(entry_id, title, content, worldbook_id="Wlex0001", enabled=True, category="lore", tags=None):
+    return models.WorldbookEntry(user_id=None, worldbook_id=worldbook_id, entry_id=entry_id, category=category, tags=tags, title=title, content=content, meta_json=json.dumps({"enabled": enabled}))
+
+
+def test_lexical_terms_use_cjk_bigrams_and_latin_words():
+    assert lexical_terms("龙之谷 Dragon_Lair 7") == ["龙之", "之谷", "dragon_lair", "7"]
+    assert lexical_terms("龙") == ["龙"]
+
+
+def test_startup_backfills_existing_entries(db_engine, session_factory):
+    db = session_factory()
+    db.add_all([_entry("E1", "Red dragon", "sleeps under the mountain"), _entry("E2", "River", "flows to the sea")])
+    db.commit()
+
+    assert ensure_lexical_index(db_engine) == 2
+    assert ensure_lexical_index(db_engine) == 0
+    assert [entry.entry_id for entry, _ in search_lexical(db, "dragon", top_k=5)] == ["E1"]
+    db.close()
+
+
+def test_search_route_ranks_by_bm25_and_follows_imports_and_deletes(client, db_session):
+    payload = {
+        "worldbook_id": "Wlex0001",
+        "entries": [
+            {"entry_id": "E_title", "title": "龙之谷", "content": "山谷深处的古老传说"},
+            {"entry_id": "E_body", "title": "旅店", "content": "旅人谈起龙之谷的往事"},
+            {"entry_id": "E_none", "title": "river", "content": "quiet village"},
+        ],
+    }
+    assert client.post("/api/worldbook/import", json=payload).status_code == 200
+
+    results = client.post("/api/worldbook/semantic_search", json={"query": "龙之谷", "top_k": 5}).json()["results"]
+    assert [item["entry_id"] for item in results] == ["E_title", "E_body"]
+
+    updated = {"worldbook_id": "Wlex0001", "entries": [{"entry_id": "E_none", "title": "龙之谷 river", "content": "quiet village"}]}
+    assert client.post("/api/worldbook/import", json=updated).status_code == 200
+    assert client.delete("/api/worldbook/E_title").status_code == 200
+
+    results = client.post("/api/worldbook/semantic_search", json={"query": "龙之谷", "top_k": 5}).json()["results"]
+    assert {item["entry_id"] for item in results} == {"E_body", "E_none"}
+
+
+def test_hybrid_retriever_respects_enabled_and_category_switches(db_session):
+    db_session.add_all([_entry("E_on", "Dragon roost", "dragon eggs"), _entry("E_off", "Dragon cave", "dragon bones", enabled=False), _entry("E_muted", "Dragon lord", "dragon king", category="Secrets")])
+    db_session.flush()
+    update_lexical_index(db_session, upserted=db_session.query(models.WorldbookEntry).all())
+    db_session.commit()
+    retriever = RAGRetriever(db_session, EmbeddingConfig(provider="tfidf"), worldbook_id="Wlex0001", disabled_categories={"Secrets"})
+
+    assert [entry.entry_id for entry, _ in retriever.lexical_search("dragon", top_k=5)] == ["E_on"]
@@ -0,0 +1,104 @@
+import json
+
+import pytest
+from sqlalchemy import event
+
+from backend.db import models
+from backend.modules.knowledge.services import retrieval_cache
+from backend.modules.knowledge.services.retrieval_cache import TtlLruCache, invalidate_retrieval_cache, story_results_cache
+from backend.modules.knowledge.services.retrieval_queries import retrieve_story_entries
+from backend.modules.knowledge.services.vector_index import invalidate_vector_indexes
+from conftest import KeywordEngine, stub_retriever
+
+
+@pytest.fixture()
+def db_session(db_session):
+    story_results_cache.clear()
+    invalidate_vector_indexes()
+    for idx in range(6):
+        db_session.add(models.WorldbookEntry(user_id=None, worldbook_id="Wcache01", entry_id=f"e_{idx}", category="lore", title=f"dragon {idx}", content="castle" * idx, meta_json=json.dumps({"enabled": True})))
+    db_session.commit()
+    yield db_session
+    story_results_cache.clear()
+    invalidate_vector_indexes()
+
+
+def test_reroll_skips_retrieval_and_reloads_entries_once(db_session):
+    engine = KeywordEngine(("dragon", "castle"), offset=0.1)
+    hits = story_results_cache.stats()["hits"]
+    first = retrieve_story_entries(stub_retriever(db_session, engine, worldbook_id="Wcache01"), "dragon castle", top_k=3)
+    calls = engine.calls
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db_session.get_bind(), "before_cursor_execute", count_statement)
+    try:
+        second = retrieve_story_entries(stub_retriever(db_session, engine, worldbook_id="Wcache01"), "dragon castle", top_k=3)
+    finally:
+        event.remove(db_session.get_bind(), "before_cursor_execute", count_statement)
+
+    assert [(entry.entry_id, score) for entry, score in second] == [(entry.entry_id, score) for entry, score in first]
+    assert engine.calls == calls
+    assert len(statements) == 2  # the entries stamp for the cache key, then one reload of the cached entries
+    assert story_results_cache.stats()["hits"] == hits + 1
+
+
+def test_cache_key_and_invalidation(db_session):
+    engine = KeywordEngine(("dragon", "castle"), offset=0.1)
+    hits = story_results_cache.stats()["hits"]
+    retrieve_story_entries(stub_retriever(db_session, engine, worldbook_id="Wcache01"), "dragon castle", top_k=3)
+
+    retrieve_story_entries(stub_retriever(db_session, engine, worldbook_id="Wcache01", disabled_categories={"lore"}), "dragon castle", top_k=3)
+    retrieve_story_entries(stub_retriever(db_session, engine, worldbook_id="Wcache01"), "dragon castle again", top_k=3)
+    invalidate_retrieval_cache("Wother01")
+    retrieve_story_entries(stub_retriever(db_session, engine, worldbook_id="Wcache01"), "dragon castle", top_k=3)
+    assert story_results_cache.stats()["hits"] == hits + 1
+
+    invalidate_retrieval_cache("Wcache01")
+    retrieve_story_entries(stub_retriever(db_session, engine, worldbook_id="Wcache01"), "dragon castle", top_k=3)
+    assert story_results_cache.stats()["hits"] == hits + 1
+
+
+def test_cached_rankings_drop_entries_that_left_the_scope(db_session):
+    engine = KeywordEngine(("dragon", "castle"), offset=0.1)
+    first = retrieve_story_entries(stub_retriever(db_session, engine, worldbook_id="Wcache01"), "dragon castle", top_k=3)
+    removed = first[0][0]
+    removed.meta_json = json.dumps({"enabled": False})
+    db_session.commit()
+
+    second = retrieve_story_entries(stub_retriever(db_session, engine, worldbook_id="Wcache01"), "dragon castle", top_k=3)
+
+    # The edit moves the entries stamp, so the rankings are recomputed without the disabled entry.
+    assert [entry.entry_id for entry, _ in second[:2]] == [entry.entry_id for entry, _ in first[1:]]
+    assert removed.entry_id not in [entry.entry_id for entry, _ in second]
+
+
+def test_cached_rankings_follow_edits_from_another_worker(db_session):
+    engine = KeywordEngine(("dragon", "castle"), offset=0.1)
+    first = retrieve_story_entries(stub_retriever(db_session, engine, worldbook_id="Wcache01"), "dragon castle", top_k=1)
+    assert first[0][0].entry_id == "e_1"
+
+    # Another worker rewrites an entry; this process's invalidation counters never move.
+    db_session.query(models.WorldbookEntry).filter_by(entry_id="e_1").update({"content": "castle" * 9}, synchronize_session=False)
+    db_session.commit()
+    invalidate_vector_indexes()
+
+    second = retrieve_story_entries(stub_retriever(db_session, engine, worldbook_id="Wcache01"), "dragon castle", top_k=1)
+    assert second[0][0].entry_id != "e_1"
+
+
+def test_ttl_lru_cache_expires_and_evicts(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(retrieval_cache.time, "monotonic", lambda: now[0])
+    cache = TtlLruCache(max_size=2, ttl_s=10)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    now[0] += 11
+    assert cache.get("a") is None
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 2}
@@ -0,0 +1,47 @@
+import json
+
+import pytest
+from sqlalchemy import event
+
+from backend.db import models
+from backend.modules.knowledge.services import retrieval_queries
+from backend.modules.knowledge.services.vector_index import invalidate_vector_indexes
+from backend.modules.story.services.runtime_context_extra import worldbook_snippets
+from conftest import KeywordEngine, stub_retriever
+
+
+@pytest.fixture(autouse=True)
+def stub_retrieval(monkeypatch):
+    engine = KeywordEngine(("dragon", "castle"), offset=0.1)
+    monkeypatch.setattr(retrieval_queries, "create_retriever", lambda db, **options: stub_retriever(db, engine, **options))
+    invalidate_vector_indexes()
+    yield
+    invalidate_vector_indexes()
+
+
+def _seed(db):
+    for idx in range(12):
+        category = "location" if idx % 3 == 0 else "lore"
+        db.add(models.WorldbookEntry(user_id=None, worldbook_id="Wsnip001", entry_id=f"e_{idx:02d}", category=category, title=f"dragon {idx}", content="castle" * (idx % 4), importance=0.5, meta_json=json.dumps({"enabled": idx != 4})))
+    db.commit()
+
+
+def test_worldbook_snippets_do_not_requery_each_result(db_session):
+    _seed(db_session)
+    switches = {"Wsnip001::location": False}
+    worldbook_snippets(db_session, None, context_text="dragon castle", limit=5, active_worldbook_id="Wsnip001", category_switches=switches)
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db_session.get_bind(), "before_cursor_execute", count_statement)
+    try:
+        snippets = worldbook_snippets(db_session, None, context_text="dragon castle", limit=5, active_worldbook_id="Wsnip001", category_switches=switches)
+    finally:
+        event.remove(db_session.get_bind(), "before_cursor_execute", count_statement)
+
+    assert len(snippets) == 5
+    assert all(item["category"] == "lore" and item["entry_id"] != "e_04" for item in snippets)
+    assert len(statements) == 2  # the entries stamp for the cache key, then one reload of the cached entries
+
@@ -0,0 +1,76 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from backend.db import models
+from backend.db.base import get_db
+from backend.main import app
+from backend.modules.worldbook.api import import_routes
+from backend.modules.worldbook.api.helpers import iter_import_records
+
+
+@pytest.fixture()
+def client(db_session, monkeypatch):
+    def override_get_db():
+        yield db_session
+
+    monkeypatch.setattr(import_routes, "submit_embedding_job", lambda job_id: None)
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
+
+
+def _collect(pieces, chunk_size):
+    async def stream():
+        for piece in pieces:
+            yield piece
+
+    async def run():
+        return [chunk async for chunk in iter_import_records(stream(), chunk_size)]
+
+    return asyncio.run(run())
+
+
+def test_iter_import_records_handles_split_ndjson_and_arrays():
+    ndjson = "\n".join(json.dumps({"title": f"t{idx}", "content": "龙"}, ensure_ascii=False) for idx in range(5)).encode("utf-8")
+    array = json.dumps([{"title": "a", "content": "b"}, {"lore": [{"title": "c", "content": "d"}]}]).encode("utf-8")
+
+    split_chunks = _collect([ndjson[i : i + 7] for i in range(0, len(ndjson), 7)], chunk_size=2)
+    array_chunks = _collect([array[:10], array[10:]], chunk_size=10)
+
+    assert [len(chunk) for chunk in split_chunks] == [2, 2, 1]
+    assert split_chunks[2][0] == {"title": "t4", "content": "龙", "category": None}
+    assert [(item["title"], item["category"]) for item in array_chunks[0]] == [("a", None), ("c", "lore")]
+    with pytest.raises(HTTPException):
+        _collect([b'{"title": "a", "content": '], chunk_size=2)
+
+
+def test_stream_import_resolves_ids_once_per_chunk(client, db_session, monkeypatch):
+    monkeypatch.setattr(import_routes, "IMPORT_CHUNK_SIZE", 50)
+    db_session.add(models.WorldbookEntry(user_id=None, worldbook_id="Wold0001", entry_id="E_005", category="lore", title="old", content="old"))
+    db_session.commit()
+    body = "\n".join(json.dumps({"entry_id": f"E_{idx:03d}", "title": f"title {idx}", "content": f"content {idx}"}) for idx in range(120)) + "\n" + json.dumps({"entry_id": "E_005", "title": "again", "content": "twice"})
+    lookups = []
+
+    def count_lookup(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM worldbook" in statement and "worldbook.entry_id IN" in statement:
+            lookups.append(statement)
+
+    event.listen(db_session.get_bind(), "before_cursor_execute", count_lookup)
+    try:
+        response = client.post("/api/worldbook/import/stream?worldbook_id=Wnew0001", content=iter([body.encode("utf-8")[:1000], body.encode("utf-8")[1000:]]))
+    finally:
+        event.remove(db_session.get_bind(), "before_cursor_execute", count_lookup)
+
+    assert response.status_code == 200
+    payload = response.json()
+    assert (payload["created"], payload["updated"]) == (119, 2)
+    assert len(lookups) == 3
+    assert db_session.query(models.WorldbookEntry).filter(models.WorldbookEntry.worldbook_id == "Wnew0001").count() == 120
+    assert db_session.query(models.WorldbookEntry).filter(models.WorldbookEntry.entry_id == "E_005").one().content == "twice"
+    assert db_session.query(models.WorldbookEmbeddingJob).one().total == 120
@@ -0,0 +1,128 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from backend.core.auth import create_access_token, get_password_hash
+from backend.db import models
+from backend.db.base import get_db
+from backend.main import app
+from backend.modules.knowledge.services.embeddings_config import EmbeddingConfig
+from backend.modules.knowledge.services.retriever import RAGRetriever
+from backend.modules.knowledge.services import tfidf_index
+from backend.modules.knowledge.services.tfidf_index import SparseTfidfIndex, drop_tfidf_index, load_tfidf_index, update_tfidf_indexes
+
+
+@pytest.fixture()
+def db_session(db_session):
+    yield db_session
+    drop_tfidf_index(db_session)
+
+
+@pytest.fixture()
+def client(db_session):
+    def override_get_db():
+        yield db_session
+
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
+
+
+def _add_entry(db, entry_id, title, content, worldbook_id="Wtfidf01", user_id=None):
+    db.add(models.WorldbookEntry(user_id=user_id, worldbook_id=worldbook_id, entry_id=entry_id, category="lore", title=title, content=content, meta_json=json.dumps({"enabled": True})))
+    db.commit()
+
+
+def test_incremental_updates_match_full_rebuild():
+    documents = [("a", "red dragon guards the castle"), ("b", "river flows past the castle"), ("c", "dragon dragon fire"), ("d", "quiet river village")]
+    incremental = SparseTfidfIndex()
+    incremental.upsert(documents[:2])
+    incremental.upsert(documents[2:] + [("a", "stale text")])
+    incremental.upsert([documents[0]])
+    incremental.remove(["b"])
+    rebuilt = SparseTfidfIndex()
+    rebuilt.upsert([documents[0], documents[2], documents[3]])
+
+    restored = SparseTfidfIndex.from_payload(incremental.to_payload())
+
+    for index in (incremental, restored):
+        results = index.search("dragon castle", top_k=3)
+        expected = rebuilt.search("dragon castle", top_k=3)
+        assert [entry_id for entry_id, _ in results] == [entry_id for entry_id, _ in expected]
+        assert [score for _, score in results] == pytest.approx([score for _, score in expected])
+
+
+def test_tfidf_semantic_search_uses_persisted_index(db_session):
+    _add_entry(db_session, "e_dragon", "dragon", "a red dragon sleeps")
+    _add_entry(db_session, "e_river", "river", "the river is wide")
+    _add_entry(db_session, "e_other", "dragon", "other worldbook dragon", worldbook_id="Wtfidf02")
+    retriever = RAGRetriever(db_session, EmbeddingConfig(provider="tfidf"), worldbook_id="Wtfidf01")
+
+    results = retriever.semantic_search("dragon", top_k=2, min_similarity=0.01)
+
+    assert [entry.entry_id for entry, _ in results] == ["e_dragon"]
+    row = db_session.query(models.WorldbookTfidfIndex).one()
+    assert (row.worldbook_id, row.doc_count) == ("Wtfidf01", 2)
+
+
+def test_import_and_delete_update_existing_index(client, db_session):
+    user = models.User(user_id="u_tfidf", username="tfidf_user", password_hash=get_password_hash("p@ssw0rd"), role=models.UserRole.USER, is_active=True)
+    db_session.add(user)
+    db_session.commit()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'u_tfidf'})}"}
+    _add_entry(db_session, "e_seed", "seed", "castle walls", user_id="u_tfidf")
+    assert len(load_tfidf_index(db_session, "Wtfidf01")) == 1
+
+    resp = client.post("/api/worldbook/import?sync_embeddings=true", headers=headers, json={"worldbook_id": "Wtfidf01", "entries": [{"entry_id": "e_new", "title": "dragon", "content": "dragon lair"}]})
+    assert resp.status_code == 200
+    assert load_tfidf_index(db_session, "Wtfidf01").search("dragon", top_k=1)[0][0] == "e_new"
+
+    assert client.delete("/api/worldbook/e_new", headers=headers).status_code == 200
+    index = load_tfidf_index(db_session, "Wtfidf01")
+    assert index.entry_ids == ["e_seed"]
+    assert db_session.query(models.WorldbookTfidfIndex).one().version == 3
+
+
+def test_current_index_is_served_without_reading_the_payload(db_session):
+    _add_entry(db_session, "e_dragon", "dragon", "a red dragon sleeps")
+    index = load_tfidf_index(db_session, "Wtfidf01")
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db_session.get_bind(), "before_cursor_execute", listener)
+    try:
+        assert load_tfidf_index(db_session, "Wtfidf01") is index
+    finally:
+        event.remove(db_session.get_bind(), "before_cursor_execute", listener)
+
+    assert len(statements) == 1 and "payload" not in statements[0]
+
+
+def test_concurrent_update_drops_index_instead_of_losing_a_change(db_session):
+    _add_entry(db_session, "e_seed", "seed", "castle walls")
+    load_tfidf_index(db_session, "Wtfidf01")
+    _add_entry(db_session, "e_first", "dragon", "dragon lair")
+    update_tfidf_indexes(db_session, upserted=[db_session.query(models.WorldbookEntry).filter_by(entry_id="e_first").one()])
+    _add_entry(db_session, "e_second", "river", "river bank")
+    stale = SparseTfidfIndex()
+    stale.upsert([("e_seed", "seed castle walls"), ("e_second", "river river bank")])
+
+    # A writer that read version 1 before the first update landed must not overwrite it.
+    assert tfidf_index._replace_index(db_session, "Wtfidf01", stale, version=1) is False
+    assert db_session.query(models.WorldbookTfidfIndex).count() == 0
+    assert sorted(load_tfidf_index(db_session, "Wtfidf01").entry_ids) == ["e_first", "e_second", "e_seed"]
+
+
+def test_first_use_build_tolerates_a_concurrent_insert(db_session, monkeypatch):
+    _add_entry(db_session, "e_dragon", "dragon", "a red dragon sleeps")
+    other = SparseTfidfIndex()
+    other.upsert([("e_dragon", "dragon a red dragon sleeps")])
+    assert tfidf_index._insert_index(db_session, "Wtfidf01", other)
+    monkeypatch.setattr(tfidf_index, "_index_stamp", lambda db, worldbook_id: None)
+
+    index = load_tfidf_index(db_session, "Wtfidf01")
+
+    assert index.entry_ids == ["e_dragon"]
+    assert db_session.query(models.WorldbookTfidfIndex).one().version == 1
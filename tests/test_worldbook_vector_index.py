@@ -0,0 +1,102 @@
+import json
+
+import pytest
+from sqlalchemy import event
+
+from backend.db import models
+from backend.modules.knowledge.services import vector_index
+from backend.modules.knowledge.services.vector_index import VectorIndex, invalidate_vector_indexes
+from conftest import KeywordEngine, stub_retriever
+
+
+@pytest.fixture(autouse=True)
+def fresh_vector_indexes():
+    invalidate_vector_indexes()
+    yield
+    invalidate_vector_indexes()
+
+
+def _add_entry(db, entry_id, title, content, category="lore", enabled=True):
+    db.add(models.WorldbookEntry(user_id=None, worldbook_id="Wvector1", entry_id=entry_id, category=category, title=title, content=content, meta_json=json.dumps({"enabled": enabled}, ensure_ascii=False)))
+    db.commit()
+
+
+def test_vector_index_top_k_matches_cosine_order():
+    index = VectorIndex(3)
+    index.add(["a", "b", "c"], [[1.0, 0.0, 0.0], [0.6, 0.8, 0.0], [0.0, 0.0, 5.0]])
+
+    results = index.search([2.0, 0.0, 0.0], top_k=2)
+
+    assert [entry_id for entry_id, _ in results] == ["a", "b"]
+    assert results[0][1] == pytest.approx(1.0)
+    assert results[1][1] == pytest.approx(0.6)
+    assert index.search([1.0, 0.0, 0.0], top_k=5, allowed={"c"}) == [("c", 0.0)]
+
+
+def test_semantic_search_builds_index_once_and_respects_filters(db_session):
+    _add_entry(db_session, "e_dragon", "dragon", "a red dragon")
+    _add_entry(db_session, "e_castle", "castle", "an old castle", category="location")
+    _add_entry(db_session, "e_off", "dragon", "sleeping dragon", enabled=False)
+    engine = KeywordEngine()
+
+    first = stub_retriever(db_session, engine, worldbook_id="Wvector1").semantic_search("dragon", top_k=2)
+    calls_after_build = engine.calls
+    second = stub_retriever(db_session, engine, worldbook_id="Wvector1").semantic_search("dragon", top_k=2)
+    filtered = stub_retriever(db_session, engine, worldbook_id="Wvector1", disabled_categories={"lore"}).semantic_search("castle", top_k=2)
+
+    assert [entry.entry_id for entry, _ in first] == ["e_dragon", "e_castle"]
+    assert [entry.entry_id for entry, _ in second] == ["e_dragon", "e_castle"]
+    assert engine.calls - calls_after_build == 2
+    assert [entry.entry_id for entry, _ in filtered] == ["e_castle"]
+
+
+def test_invalidate_vector_indexes_drops_matching_worldbook(db_session):
+    _add_entry(db_session, "e_dragon", "dragon", "a red dragon")
+    retriever = stub_retriever(db_session, KeywordEngine(), worldbook_id="Wvector1")
+    retriever.semantic_search("dragon", top_k=1)
+    stamp = retriever.entries_stamp()
+
+    assert vector_index.get_vector_index((None, "Wvector1", "stub:"), stamp) is not None
+    assert invalidate_vector_indexes("Wother01") == 0
+    assert invalidate_vector_indexes("Wvector1") == 1
+    assert vector_index.get_vector_index((None, "Wvector1", "stub:"), stamp) is None
+
+
+def test_index_is_rebuilt_after_an_edit_from_another_worker(db_session):
+    _add_entry(db_session, "e_a", "beast", "a dragon")
+    _add_entry(db_session, "e_b", "place", "a castle")
+    engine = KeywordEngine()
+    assert stub_retriever(db_session, engine, worldbook_id="Wvector1").semantic_search("river", top_k=1, min_similarity=0.5) == []
+
+    # Another worker edits the entry; nothing in this process is told to invalidate.
+    db_session.query(models.WorldbookEntry).filter_by(entry_id="e_b").update({"content": "a river"}, synchronize_session=False)
+    db_session.commit()
+
+    results = stub_retriever(db_session, engine, worldbook_id="Wvector1").semantic_search("river", top_k=1, min_similarity=0.5)
+    assert [entry.entry_id for entry, _ in results] == ["e_b"]
+
+
+def test_semantic_search_loads_embedding_cache_without_n_plus_one(db_session):
+    for idx in range(30):
+        _add_entry(db_session, f"e_{idx:02d}", f"dragon {idx}", "castle" if idx % 2 else "river")
+    engine = KeywordEngine()
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db_session.get_bind(), "before_cursor_execute", count_statement)
+    try:
+        results = stub_retriever(db_session, engine, worldbook_id="Wvector1").compute_entry_embeddings(db_session.query(models.WorldbookEntry).all())
+        first_pass = [statement for statement in statements if "worldbook_embeddings" in statement]
+        statements.clear()
+        cached = stub_retriever(db_session, engine, worldbook_id="Wvector1").compute_entry_embeddings(db_session.query(models.WorldbookEntry).all())
+        second_pass = [statement for statement in statements if "worldbook_embeddings" in statement]
+    finally:
+        event.remove(db_session.get_bind(), "before_cursor_execute", count_statement)
+
+    assert len(results) == len(cached) == 30
+    assert engine.calls == 30
+    assert engine.batches == 1
+    assert sum(1 for statement in first_pass if statement.lstrip().upper().startswith("SELECT")) == 1
+    assert len(second_pass) == 1